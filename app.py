@@ -1,11 +1,16 @@
 """Aplicação principal Sonholândia"""
 import logging
+from collections.abc import Mapping
+
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 
 from config import Config
-from models import init_db
+from models import init_db, init_app as init_db_app
 from routes import auth_bp, main_bp, dreams_bp, api_bp
 from routes.oauth import init_oauth, set_oauth
+from utils.interpretations import init_app as init_interpretations
+from utils.translator import init_app as init_translations
 from utils import setup_ssl
 
 # Configuração de logging
@@ -18,12 +23,26 @@ logger = logging.getLogger(__name__)
 # Configura SSL
 setup_ssl()
 
+class JSONProvider(DefaultJSONProvider):
+    """Serializa também mapeamentos que não são dict (ex: visões de significados em cache)"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+
 # Cria aplicação Flask
 app = Flask(__name__, static_folder='static', template_folder='templates')
+app.json = JSONProvider(app)
 app.config.from_object(Config)
 
 # Inicializa banco de dados
 init_db()
+init_db_app(app)
+init_interpretations(app)
+init_translations(app)
 
 # Inicializa OAuth
 oauth = init_oauth(app)
@@ -9,6 +9,59 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key_change_in_production")
     DATABASE = os.getenv("DATABASE", "users.db")
     
+    # Pool de conexões SQLite (por processo/worker)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5.0))
+    DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", 128))
+    
+    # PRAGMAs do SQLite
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+    DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", -20000))  # negativo = KiB
+    
+    # Fila de escrita única (agrupa escritas pequenas em uma transação)
+    DB_WRITE_QUEUE = os.getenv("DB_WRITE_QUEUE", "False").lower() == "true"
+    DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 100))
+    DB_WRITE_BATCH_WINDOW_MS = float(os.getenv("DB_WRITE_BATCH_WINDOW_MS", 5))
+    DB_WRITE_MAX_PENDING = int(os.getenv("DB_WRITE_MAX_PENDING", 10000))
+    DB_WRITE_TIMEOUT = float(os.getenv("DB_WRITE_TIMEOUT", 5.0))
+    
+    # Buffer de histórico (eventos gravados em lote)
+    HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", 500))
+    HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", 200))
+    HISTORY_BUFFER_MAX = int(os.getenv("HISTORY_BUFFER_MAX", 10000))
+    
+    # Cache em memória (utils.cache)
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 2048))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    
+    # Cache compartilhado entre workers (L2): 'sqlite' ou 'memory' (desativado)
+    # Os valores do L2 são objetos pickle: quem puder escrever em CACHE_DIR
+    # consegue executar código na aplicação. O diretório deve pertencer só ao
+    # usuário da aplicação (o padrão fica na pasta instance/ do projeto).
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+    CACHE_DIR = os.path.abspath(os.getenv("CACHE_DIR", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'cache')))
+    CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", 1.0))  # segundos
+    CACHE_FLIGHT_TIMEOUT = float(os.getenv("CACHE_FLIGHT_TIMEOUT", 30.0))  # espera por cálculo em andamento
+    
+    # Feed
+    FEED_PER_PAGE = int(os.getenv("FEED_PER_PAGE", 10))
+    FEED_COUNT_TTL = int(os.getenv("FEED_COUNT_TTL", 60))  # segundos
+    DREAM_STATS_TTL = int(os.getenv("DREAM_STATS_TTL", 60))  # contadores de /api/dream-stats
+    FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", 3600))  # HTML dos cards do feed
+    MEMBERSHIP_TTL = int(os.getenv("MEMBERSHIP_TTL", 600))  # curtidas/favoritos do usuário em cache
+    
+    # Páginas estáticas (sobre, blog, termos...): HTML em cache e validação por ETag
+    STATIC_PAGE_TTL = int(os.getenv("STATIC_PAGE_TTL", 24 * 3600))  # páginas estáticas renderizadas
+    STATIC_PAGE_MAX_AGE = int(os.getenv("STATIC_PAGE_MAX_AGE", 3600))  # Cache-Control do navegador
+    
+    # Rotas administrativas (/admin/*): e-mails autorizados, separados por vírgula
+    ADMIN_EMAILS = frozenset(
+        email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip())
+    
     # OAuth Google
     GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
@@ -26,8 +79,44 @@ class Config:
     RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
     RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST")
     
+    # Dicionário local de símbolos (TSV: idioma, símbolo, significado)
+    SYMBOLS_FILE = os.getenv("SYMBOLS_FILE", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'dream_symbols.tsv'))
+    
+    # Catálogos de textos da interface (<idioma>.json)
+    I18N_DIR = os.getenv("I18N_DIR", os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'i18n'))
+    
+    # Cache persistente de significados (dream_meanings_cache)
+    MEANING_CACHE_TTL = int(os.getenv("MEANING_CACHE_TTL", 30 * 24 * 3600))  # 30 dias
+    MEANING_NEGATIVE_TTL = int(os.getenv("MEANING_NEGATIVE_TTL", 24 * 3600))  # 1 dia
+    MEANING_MEMORY_ENTRIES = int(os.getenv("MEANING_MEMORY_ENTRIES", 5000))  # registros em memória por processo
+    
+    # Busca concorrente de significados (/api/dream-meaning/<id>)
+    MEANING_LOOKUP_WORKERS = int(os.getenv("MEANING_LOOKUP_WORKERS", 8))
+    MEANING_MAX_EXTERNAL_CALLS = int(os.getenv("MEANING_MAX_EXTERNAL_CALLS", 4))
+    MEANING_REQUEST_DEADLINE = float(os.getenv("MEANING_REQUEST_DEADLINE", 10.0))  # segundos
+    
+    # Interpretação em segundo plano ao postar/editar (0 workers desativa)
+    INTERPRETATION_WORKERS = int(os.getenv("INTERPRETATION_WORKERS", 2))
+    INTERPRETATION_POLL_INTERVAL = float(os.getenv("INTERPRETATION_POLL_INTERVAL", 30))  # segundos
+    INTERPRETATION_MAX_ATTEMPTS = int(os.getenv("INTERPRETATION_MAX_ATTEMPTS", 3))
+    INTERPRETATION_DEADLINE = float(os.getenv("INTERPRETATION_DEADLINE", 60.0))  # por job (busca no idioma do sonho)
+    
+    # Clientes HTTP dos serviços externos (utils.http)
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))  # conexões keep-alive por host
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.0))  # segundos
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+    HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.3))
+    HTTP_BREAKER_FAILURES = int(os.getenv("HTTP_BREAKER_FAILURES", 5))  # falhas seguidas que abrem o circuito
+    HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", 30.0))  # segundos até a chamada de teste
+    RAPIDAPI_TIMEOUT = float(os.getenv("RAPIDAPI_TIMEOUT", 8.0))
+    API_EMAIL_TIMEOUT = float(os.getenv("API_EMAIL_TIMEOUT", 5.0))
+    TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", 5.0))
+    
     # Translation Service
     TRANSLATION_API_URL = os.getenv("TRANSLATION_API_URL", "http://localhost:5000/api/translate")
+    TRANSLATION_BATCH_CHARS = int(os.getenv("TRANSLATION_BATCH_CHARS", 4500))  # limite por chamada em lote
     
     # Email (para recuperação de senha)
     MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com")
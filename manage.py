@@ -0,0 +1,155 @@
+"""Comandos de manutenção do banco de dados
+
+Uso:
+    python manage.py rebuild-counters
+    python manage.py rebuild-search
+    python manage.py rebuild-tags
+    python manage.py warm-meanings [--limit 100] [--lang pt en]
+    python manage.py rebuild-keywords
+    python manage.py keyword-benchmark [--limit 500]
+    python manage.py check-translations
+"""
+import argparse
+import os
+import sys
+
+# Adiciona o diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models import init_db, rebuild_dream_counters, rebuild_search_index, rebuild_dream_tags, rebuild_keyword_df
+
+
+def rebuild_counters(args):
+    """Recalcula os contadores de curtidas, favoritos e comentários"""
+    print("🔄 Recalculando contadores dos sonhos...")
+    fixed = rebuild_dream_counters()
+    print(f"✅ Contadores verificados ({fixed} sonhos corrigidos)")
+
+
+def rebuild_search(args):
+    """Reconstrói o índice de busca textual (FTS5) dos sonhos"""
+    print("🔄 Reconstruindo índice de busca...")
+    total = rebuild_search_index()
+    print(f"✅ Índice de busca reconstruído ({total} sonhos indexados)")
+
+
+def rebuild_tags(args):
+    """Reconstrói as tabelas tags/dream_tags a partir do JSON em dreams.tags"""
+    print("🔄 Migrando tags dos sonhos...")
+    migrated = rebuild_dream_tags()
+    print(f"✅ Tags migradas ({migrated} sonhos)")
+
+
+def warm_meanings(args):
+    """Pré-carrega o cache de significados com as palavras-chave mais frequentes"""
+    from utils.dream_meanings import warm_meaning_cache
+
+    print(f"🔄 Pré-carregando significados ({', '.join(args.lang)})...")
+    result = warm_meaning_cache(limit=args.limit, languages=args.lang)
+    print(f"✅ {result['keywords']} palavras-chave: {result['lookups']} buscadas, "
+          f"{result['cached']} já estavam em cache")
+
+
+def rebuild_keywords(args):
+    """Recalcula a frequência de documentos (keyword_df) usada no ranking de palavras-chave"""
+    print("🔄 Recalculando frequência dos termos...")
+    terms = rebuild_keyword_df()
+    print(f"✅ Frequências recalculadas ({terms} termos)")
+
+
+def _legacy_keywords(dream_text):
+    # Extração anterior: split por espaço, 30 stopwords e as 5 primeiras palavras
+    stopwords = {'o', 'a', 'de', 'para', 'com', 'em', 'que', 'e', 'é', 'do', 'da',
+                 'ou', 'na', 'no', 'um', 'uma', 'os', 'as', 'dos', 'das', 'por', 'foi',
+                 'seja', 'seu', 'sua', 'como', 'se', 'não', 'ele', 'ela', 'eu', 'eu'}
+    words = [word.strip('.,!?;:') for word in dream_text.lower().split()]
+    return list(dict.fromkeys(w for w in words if w not in stopwords and len(w) > 3))[:5]
+
+
+def keyword_benchmark(args):
+    """Compara buscas de significado por sonho entre a extração antiga e a atual"""
+    from models import get_db
+    from utils.keywords import extract_keywords
+    from utils.symbols import get_symbol_dictionary, normalize_symbol
+
+    conn = get_db()
+    rows = conn.execute('SELECT title, description FROM dreams ORDER BY id DESC LIMIT ?',
+                        (args.limit,)).fetchall()
+    conn.close()
+    if not rows:
+        print("⚠️ Nenhum sonho no banco para comparar")
+        return
+
+    symbols = get_symbol_dictionary()
+    for label, extract in (('Antiga', _legacy_keywords), ('Atual', extract_keywords)):
+        lookups = local = 0
+        distinct = set()
+        for row in rows:
+            keywords = extract(f"{row['title']} {row['description']}")
+            unknown = [keyword for keyword in keywords if symbols.get(keyword)[0] is None]
+            lookups += len(keywords)
+            local += len(keywords) - len(unknown)
+            distinct.update(normalize_symbol(keyword) for keyword in unknown)
+        external = lookups - local
+        print(f"📊 {label}: {lookups / len(rows):.2f} buscas/sonho, "
+              f"{local / len(rows):.2f} no dicionário local, "
+              f"{external / len(rows):.2f} externas/sonho sem cache, "
+              f"{len(distinct) / len(rows):.2f} externas/sonho com cache "
+              f"({len(rows)} sonhos)")
+
+
+def check_translations(args):
+    """Aponta chaves ausentes nos catálogos de textos (data/i18n) em relação ao português"""
+    from utils.translator import CATALOG_FALLBACKS, find_missing_translations
+
+    incomplete = 0
+    for lang, report in find_missing_translations().items():
+        if not report['catalog']:
+            print(f"ℹ️ {lang}: sem catálogo (usa {' → '.join(CATALOG_FALLBACKS)})")
+            continue
+        if report['missing']:
+            incomplete += 1
+            print(f"⚠️ {lang}: {len(report['missing'])} chaves ausentes: {', '.join(report['missing'])}")
+        else:
+            print(f"✅ {lang}: completo")
+        if report['extra']:
+            print(f"   {lang}: chaves que não existem em pt: {', '.join(report['extra'])}")
+    if incomplete:
+        sys.exit(1)
+
+
+COMMANDS = {
+    'rebuild-counters': rebuild_counters,
+    'rebuild-search': rebuild_search,
+    'rebuild-tags': rebuild_tags,
+    'warm-meanings': warm_meanings,
+    'rebuild-keywords': rebuild_keywords,
+    'keyword-benchmark': keyword_benchmark,
+    'check-translations': check_translations,
+}
+
+
+def add_arguments(subparsers):
+    """Registra os subcomandos e seus argumentos"""
+    parsers = {name: subparsers.add_parser(name, help=command.__doc__)
+               for name, command in COMMANDS.items()}
+    parsers['warm-meanings'].add_argument('--limit', type=int, default=100,
+                                          help='Quantidade de palavras-chave mais frequentes')
+    parsers['warm-meanings'].add_argument('--lang', nargs='+', default=['pt'],
+                                          help='Idiomas a pré-carregar (ex: pt en es)')
+    parsers['keyword-benchmark'].add_argument('--limit', type=int, default=500,
+                                              help='Quantidade de sonhos mais recentes a comparar')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manutenção do banco de dados da Sonholândia')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_arguments(subparsers)
+
+    args = parser.parse_args()
+    try:
+        init_db()
+        COMMANDS[args.command](args)
+    except Exception as e:
+        print(f"❌ Erro ao executar '{args.command}': {e}")
+        sys.exit(1)
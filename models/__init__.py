@@ -1,22 +1,114 @@
 """Modelos de banco de dados"""
+import json
+import logging
+import re
 import sqlite3
 import os
 from datetime import datetime, timedelta
 import secrets
+from concurrent.futures import Future
+
+from flask import g, has_app_context
 
 from config import Config
+from utils.cache import cache_result, CACHE_DURATION
+from utils.keywords import document_terms
+from .pool import get_pool, configure_connection
+from .writer import get_writer
+
+logger = logging.getLogger(__name__)
+
+_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
 
 def get_db():
-    """Obtém conexão com o banco de dados"""
+    """
+    Obtém conexão com o banco de dados.
+
+    Dentro de um contexto de aplicação, a conexão é emprestada do pool uma
+    única vez por requisição e devolvida no teardown (close() não tem efeito).
+    Fora dele (scripts, init_db), abre uma conexão avulsa que deve ser fechada.
+    """
+    if has_app_context():
+        if 'db' not in g:
+            g.db = get_pool().acquire()
+        return g.db
+
     conn = sqlite3.connect(Config.DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return configure_connection(conn)
+
+def release_db(exception=None):
+    """Devolve ao pool a conexão emprestada pela requisição atual"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    """Registra o ciclo de vida das conexões na aplicação Flask"""
+    app.teardown_appcontext(release_db)
+
+def get_pool_stats():
+    """Retorna métricas do pool de conexões (hits, misses, esperas)"""
+    return get_pool().stats()
+
+def submit_write(work) -> Future:
+    """
+    Agenda uma escrita no banco.
+
+    Com DB_WRITE_QUEUE habilitado, a escrita vai para a thread de escrita única
+    e é gravada junto com as demais do lote; caso contrário é executada e
+    commitada na conexão da requisição atual.
+    
+    Args:
+        work: callable que recebe um cursor, ou uma string SQL sem parâmetros
+    
+    Returns:
+        Future resolvido (com o retorno de `work`) após o commit
+    """
+    if isinstance(work, str):
+        sql = work
+        work = lambda cursor: cursor.execute(sql)
+
+    if Config.DB_WRITE_QUEUE:
+        return get_writer().submit(work)
+
+    future = Future()
+    if has_app_context():
+        _run_inline(get_db(), work, future)
+    else:
+        # Threads de segundo plano e scripts: conexão emprestada do pool
+        with get_pool().connection() as conn:
+            _run_inline(conn, work, future)
+    return future
+
+def _run_inline(conn, work, future):
+    try:
+        result = work(conn.cursor())
+        conn.commit()
+        future.set_result(result)
+    except Exception as e:
+        conn.rollback()
+        future.set_exception(e)
+
+def run_write(work, timeout=None):
+    """Executa uma escrita e aguarda o commit, propagando erros"""
+    return submit_write(work).result(timeout or Config.DB_WRITE_TIMEOUT)
+
+def get_writer_stats():
+    """Retorna métricas da fila de escrita única"""
+    if not Config.DB_WRITE_QUEUE:
+        return {'enabled': False}
+    return get_writer().stats()
 
 def init_db():
     """Inicializa o banco de dados com todas as tabelas necessárias"""
     conn = sqlite3.connect(Config.DATABASE)
     cursor = conn.cursor()
     
+    # WAL: leitores não bloqueiam o escritor (modo persistente no arquivo)
+    journal_mode = Config.DB_JOURNAL_MODE.upper()
+    if journal_mode in _JOURNAL_MODES:
+        cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+    
     # Tabela de usuários
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -53,12 +145,21 @@ def init_db():
             dream_type TEXT NOT NULL,
             tags TEXT,
             image_path TEXT,
+            like_count INTEGER NOT NULL DEFAULT 0,
+            favorite_count INTEGER NOT NULL DEFAULT 0,
+            comment_count INTEGER NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
     ''')
     
+    # Contadores desnormalizados (bancos criados antes das colunas existirem)
+    counters_added = False
+    for column in ('like_count', 'favorite_count', 'comment_count'):
+        if _add_column_if_missing(cursor, 'dreams', column, 'INTEGER NOT NULL DEFAULT 0'):
+            counters_added = True
+    
     # Tabela de curtidas
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS likes (
@@ -111,9 +212,103 @@ def init_db():
         )
     ''')
     
+    # Tags normalizadas (dreams.tags continua guardando o JSON para exibição)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dream_tags'")
+    dream_tags_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dream_tags (
+            dream_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (tag_id, dream_id),
+            FOREIGN KEY (dream_id) REFERENCES dreams(id) ON DELETE CASCADE,
+            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    
+    # Cache persistente de significados por (palavra normalizada, idioma).
+    # meaning NULL registra um resultado negativo (palavra desconhecida).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dream_meanings_cache (
+            normalized_word TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            word TEXT NOT NULL,
+            meaning TEXT,
+            source TEXT NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (normalized_word, lang)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Interpretações pré-calculadas: um job por sonho (version muda a cada edição)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS interpretation_jobs (
+            dream_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1,
+            status TEXT NOT NULL DEFAULT 'pending',
+            steps_total INTEGER NOT NULL DEFAULT 0,
+            steps_done INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (dream_id) REFERENCES dreams(id) ON DELETE CASCADE
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dream_interpretations (
+            dream_id INTEGER NOT NULL,
+            lang TEXT NOT NULL,
+            keywords TEXT NOT NULL,
+            meanings TEXT NOT NULL,
+            statuses TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (dream_id, lang),
+            FOREIGN KEY (dream_id) REFERENCES dreams(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    
+    # Memória de tradução: (hash do texto, origem, destino) -> tradução
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS translation_memory (
+            text_hash TEXT NOT NULL,
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            text TEXT NOT NULL,
+            translated TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (text_hash, source, target)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Frequência de documentos de cada termo (IDF da extração de palavras-chave)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'keyword_df'")
+    keyword_df_exists = cursor.fetchone() is not None
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS keyword_df (
+            term TEXT PRIMARY KEY,
+            df INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    
     # Índices para melhor performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_dreams_user_id ON dreams(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dreams_created_at ON dreams(created_at DESC)')
+    # (created_at, id) atende a paginação por cursor do feed sem ordenação extra
+    cursor.execute('PRAGMA index_info(idx_dreams_created_at)')
+    if len(cursor.fetchall()) == 1:
+        cursor.execute('DROP INDEX idx_dreams_created_at')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dreams_created_at ON dreams(created_at DESC, id DESC)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_likes_dream ON likes(dream_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_likes_user ON likes(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_dream ON favorites(dream_id)')
@@ -122,13 +317,416 @@ def init_db():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_comments_user ON comments(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_user ON history(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_dream ON history(dream_id)')
+    # Atende a deduplicação do histórico (mesma ação no mesmo sonho na última hora)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_dedup ON history(user_id, dream_id, action_type, created_at)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dreams_tags ON dreams(tags)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dream_tags_dream ON dream_tags(dream_id, position)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_interpretation_jobs_status ON interpretation_jobs(status, updated_at)')
+    # Substituído por dream_tags: um índice no JSON nunca atende LIKE '%"tag"%'
+    cursor.execute('DROP INDEX IF EXISTS idx_dreams_tags')
+    
+    # Triggers que mantêm os contadores de dreams exatos
+    for table, column in _COUNTER_TABLES.items():
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE dreams SET {column} = {column} + 1 WHERE id = NEW.dream_id;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE dreams SET {column} = {column} - 1 WHERE id = OLD.dream_id;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_count_update AFTER UPDATE OF dream_id ON {table}
+            WHEN OLD.dream_id <> NEW.dream_id
+            BEGIN
+                UPDATE dreams SET {column} = {column} - 1 WHERE id = OLD.dream_id;
+                UPDATE dreams SET {column} = {column} + 1 WHERE id = NEW.dream_id;
+            END;
+        ''')
+    
+    if counters_added:
+        _rebuild_dream_counters(cursor)
+    
+    _init_search_index(cursor)
+    
+    if not dream_tags_exists:
+        _backfill_dream_tags(cursor)
+    
+    if not keyword_df_exists:
+        _backfill_keyword_df(cursor)
     
     conn.commit()
     conn.close()
 
+# Tabela -> coluna de contador em dreams
+_COUNTER_TABLES = {
+    'likes': 'like_count',
+    'favorites': 'favorite_count',
+    'comments': 'comment_count',
+}
+
+def _add_column_if_missing(cursor, table, column, definition):
+    """Adiciona uma coluna se ela ainda não existir. Retorna True se adicionou."""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if any(row[1] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+def _rebuild_dream_counters(cursor):
+    """Recalcula os contadores de todos os sonhos. Retorna quantos estavam divergentes."""
+    drift_conditions = ' OR '.join(
+        f'{column} <> (SELECT COUNT(*) FROM {table} WHERE dream_id = dreams.id)'
+        for table, column in _COUNTER_TABLES.items()
+    )
+    cursor.execute(f'SELECT COUNT(*) FROM dreams WHERE {drift_conditions}')
+    drifted = cursor.fetchone()[0]
+    
+    if drifted:
+        assignments = ', '.join(
+            f'{column} = (SELECT COUNT(*) FROM {table} WHERE dream_id = dreams.id)'
+            for table, column in _COUNTER_TABLES.items()
+        )
+        cursor.execute(f'UPDATE dreams SET {assignments} WHERE {drift_conditions}')
+    
+    return drifted
+
+def _init_search_index(cursor):
+    """
+    Cria o índice FTS5 de título, descrição e tags dos sonhos.
+
+    O tokenizador unicode61 com remove_diacritics 2 ignora caixa e acentos,
+    equivalente ao _normalize_text de utils.dream_meanings ('Água' == 'agua').
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dreams_fts'")
+    exists = cursor.fetchone() is not None
+    
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS dreams_fts USING fts5(
+                title, description, tags,
+                content='dreams', content_rowid='id',
+                tokenize="unicode61 remove_diacritics 2"
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 indisponível, busca do feed usará LIKE: {e}")
+        return
+    
+    # Mantém o índice em sincronia; UPDATE só nas colunas indexadas para não
+    # reindexar a cada curtida (os contadores também atualizam dreams)
+    cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS trg_dreams_fts_insert AFTER INSERT ON dreams
+        BEGIN
+            INSERT INTO dreams_fts(rowid, title, description, tags)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.tags);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_dreams_fts_delete AFTER DELETE ON dreams
+        BEGIN
+            INSERT INTO dreams_fts(dreams_fts, rowid, title, description, tags)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_dreams_fts_update AFTER UPDATE OF title, description, tags ON dreams
+        BEGIN
+            INSERT INTO dreams_fts(dreams_fts, rowid, title, description, tags)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.tags);
+            INSERT INTO dreams_fts(rowid, title, description, tags)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.tags);
+        END;
+    ''')
+    
+    if not exists:
+        cursor.execute("INSERT INTO dreams_fts(dreams_fts) VALUES ('rebuild')")
+
+def save_dream_tags(cursor, dream_id, tags_list):
+    """
+    Grava as tags de um sonho em tags/dream_tags, substituindo as anteriores.
+
+    Deve ser chamada com o mesmo cursor (e transação) que grava o sonho.
+    """
+    cursor.execute('DELETE FROM dream_tags WHERE dream_id = ?', (dream_id,))
+    if not tags_list:
+        return
+    
+    names = list(dict.fromkeys(tags_list))
+    cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+    cursor.executemany(
+        'INSERT INTO dream_tags (dream_id, tag_id, position) SELECT ?, id, ? FROM tags WHERE name = ?',
+        [(dream_id, position, name) for position, name in enumerate(names)]
+    )
+
+def get_tags_for_dreams(cursor, dream_ids):
+    """
+    Busca as tags de vários sonhos em uma única consulta agregada.
+
+    Returns:
+        dict {dream_id: [tag, ...]} na ordem em que as tags foram informadas
+    """
+    if not dream_ids:
+        return {}
+    
+    placeholders = ','.join('?' * len(dream_ids))
+    cursor.execute(f'''
+        SELECT dream_id, group_concat(name, char(31)) as names
+        FROM (
+            SELECT dt.dream_id, t.name
+            FROM dream_tags dt
+            JOIN tags t ON t.id = dt.tag_id
+            WHERE dt.dream_id IN ({placeholders})
+            ORDER BY dt.dream_id, dt.position
+        )
+        GROUP BY dream_id
+    ''', list(dream_ids))
+    return {row[0]: row[1].split('\x1f') for row in cursor.fetchall()}
+
+def _backfill_dream_tags(cursor):
+    """Popula dream_tags a partir do JSON em dreams.tags. Retorna quantos sonhos foram migrados."""
+    cursor.execute("SELECT id, tags FROM dreams WHERE tags IS NOT NULL AND tags <> ''")
+    rows = cursor.fetchall()
+    migrated = 0
+    for dream_id, tags_json in rows:
+        try:
+            tags_list = json.loads(tags_json)
+        except ValueError:
+            continue
+        if isinstance(tags_list, list):
+            save_dream_tags(cursor, dream_id, [str(tag) for tag in tags_list if tag])
+            migrated += 1
+    return migrated
+
+def rebuild_dream_tags():
+    """Reconstrói tags/dream_tags a partir de dreams.tags. Retorna quantos sonhos foram migrados."""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        migrated = _backfill_dream_tags(cursor)
+        conn.commit()
+        return migrated
+    finally:
+        conn.close()
+
+def enqueue_interpretation(cursor, dream_id):
+    """
+    Agenda (ou reagenda, após uma edição) a interpretação de um sonho.
+
+    Roda na transação de quem grava o sonho; as interpretações antigas são
+    descartadas e um job ainda em execução da versão anterior deixa de valer.
+    """
+    cursor.execute('DELETE FROM dream_interpretations WHERE dream_id = ?', (dream_id,))
+    cursor.execute('''
+        INSERT INTO interpretation_jobs (dream_id) VALUES (?)
+        ON CONFLICT (dream_id) DO UPDATE SET
+            version = version + 1,
+            status = 'pending',
+            steps_total = 0,
+            steps_done = 0,
+            attempts = 0,
+            error = NULL,
+            updated_at = CURRENT_TIMESTAMP
+    ''', (dream_id,))
+
+def update_keyword_df(cursor, old_text=None, new_text=None):
+    """
+    Atualiza keyword_df na transação de quem grava o sonho.
+
+    Passe só new_text ao criar, os dois ao editar e só old_text ao excluir;
+    apenas os termos que mudaram são tocados.
+    """
+    old_terms = document_terms(old_text) if old_text else set()
+    new_terms = document_terms(new_text) if new_text else set()
+    added = new_terms - old_terms
+    removed = old_terms - new_terms
+    if added:
+        cursor.executemany('''
+            INSERT INTO keyword_df (term, df) VALUES (?, 1)
+            ON CONFLICT (term) DO UPDATE SET df = df + 1
+        ''', [(term,) for term in added])
+    if removed:
+        cursor.executemany('UPDATE keyword_df SET df = df - 1 WHERE term = ?',
+                           [(term,) for term in removed])
+        cursor.executemany('DELETE FROM keyword_df WHERE term = ? AND df <= 0',
+                           [(term,) for term in removed])
+
+def _backfill_keyword_df(cursor):
+    """Recalcula keyword_df a partir de todos os sonhos. Retorna quantos termos foram contados."""
+    cursor.execute('DELETE FROM keyword_df')
+    cursor.execute('SELECT title, description FROM dreams')
+    counts = {}
+    for title, description in cursor.fetchall():
+        for term in document_terms(f'{title} {description}'):
+            counts[term] = counts.get(term, 0) + 1
+    cursor.executemany('INSERT INTO keyword_df (term, df) VALUES (?, ?)', counts.items())
+    return len(counts)
+
+def rebuild_keyword_df():
+    """Reconstrói keyword_df (após mudar stopwords, radicais ou o dicionário)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        terms = _backfill_keyword_df(cursor)
+        conn.commit()
+        return terms
+    finally:
+        conn.close()
+
+def get_keyword_frequencies(terms):
+    """Retorna (total de sonhos, {termo: df}) para o cálculo do IDF"""
+    terms = list(terms)
+    conn = get_db()
+    try:
+        total = conn.execute('SELECT COUNT(*) FROM dreams').fetchone()[0]
+        if not terms:
+            return total, {}
+        placeholders = ','.join('?' * len(terms))
+        rows = conn.execute(
+            f'SELECT term, df FROM keyword_df WHERE term IN ({placeholders})', terms
+        ).fetchall()
+    finally:
+        conn.close()
+    return total, {row[0]: row[1] for row in rows}
+
+@cache_result('dream', CACHE_DURATION['dream'], tags=lambda dream_id: [f'dream:{dream_id}'])
+def get_dream_with_author(dream_id):
+    """Busca um sonho com os dados do autor (em cache até o sonho mudar)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT d.*, u.username, u.name, u.picture 
+        FROM dreams d
+        JOIN users u ON d.user_id = u.id
+        WHERE d.id = ?
+    ''', (dream_id,))
+    dream = cursor.fetchone()
+    conn.close()
+    return dict(dream) if dream else None
+
+def get_dream_version(dream_id):
+    """
+    Carimbo de versão de um sonho para GETs condicionais (sem cache: uma busca
+    pela chave primária e uma pelo índice de comentários).
+    
+    Returns:
+        Dict com updated_at, contadores e o último id de comentário, ou None
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT d.updated_at, d.like_count, d.favorite_count, d.comment_count,
+               (SELECT MAX(c.id) FROM comments c WHERE c.dream_id = d.id) AS last_comment_id
+        FROM dreams d
+        WHERE d.id = ?
+    ''', (dream_id,))
+    version = cursor.fetchone()
+    conn.close()
+    return dict(version) if version else None
+
+def get_dream_stats_version(dream_id, user_id):
+    """
+    Contadores de um sonho e se o usuário o curtiu/favoritou, em uma consulta
+    pelas chaves (sem cache). É o carimbo de versão de /api/dream-stats/<id>
+    e também o próprio corpo da resposta.
+    
+    Returns:
+        Dict com like_count, favorite_count, comment_count, is_liked e
+        is_favorited, ou None se o sonho não existe
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT d.like_count, d.favorite_count, d.comment_count,
+               EXISTS (SELECT 1 FROM likes WHERE user_id = ? AND dream_id = d.id) AS is_liked,
+               EXISTS (SELECT 1 FROM favorites WHERE user_id = ? AND dream_id = d.id) AS is_favorited
+        FROM dreams d
+        WHERE d.id = ?
+    ''', (user_id, user_id, dream_id))
+    row = cursor.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return {**dict(row), 'is_liked': bool(row['is_liked']), 'is_favorited': bool(row['is_favorited'])}
+
+@cache_result('comments', CACHE_DURATION['dream'], tags=lambda dream_id: [f'dream:{dream_id}'])
+def get_dream_comments(dream_id):
+    """Lista os comentários de um sonho (em cache até o sonho mudar)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT c.*, u.username, u.name, u.picture
+        FROM comments c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.dream_id = ?
+        ORDER BY c.created_at ASC
+    ''', (dream_id,))
+    comments = cursor.fetchall()
+    conn.close()
+    
+    return [{
+        'id': comment['id'],
+        'content': comment['content'],
+        'created_at': comment['created_at'],
+        'username': comment['username'],
+        'name': comment['name'],
+        'picture': comment['picture']
+    } for comment in comments]
+
+_search_index_available = None
+
+def search_index_available(conn=None):
+    """Indica se o índice FTS5 existe neste banco (verificado uma vez por processo)"""
+    global _search_index_available
+    if _search_index_available is None:
+        db = conn or get_db()
+        row = db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dreams_fts'"
+        ).fetchone()
+        _search_index_available = row is not None
+    return _search_index_available
+
+def build_search_query(text):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5.
+
+    Cada palavra vira um termo entre aspas (sem sintaxe FTS do usuário) e a
+    última é tratada como prefixo, para a busca funcionar enquanto se digita.
+    Retorna None se não houver palavras.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def rebuild_search_index():
+    """Reconstrói e otimiza o índice de busca a partir da tabela dreams"""
+    conn = get_db()
+    try:
+        conn.execute("INSERT INTO dreams_fts(dreams_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO dreams_fts(dreams_fts) VALUES ('optimize')")
+        conn.commit()
+        return conn.execute('SELECT COUNT(*) FROM dreams').fetchone()[0]
+    finally:
+        conn.close()
+
+def rebuild_dream_counters():
+    """
+    Recalcula like_count, favorite_count e comment_count a partir das tabelas
+    de origem (backfill/reparo). Retorna quantos sonhos foram corrigidos.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        drifted = _rebuild_dream_counters(cursor)
+        conn.commit()
+        return drifted
+    finally:
+        conn.close()
+
 def create_password_reset_token(user_id):
     """Cria um token de reset de senha"""
     conn = get_db()
@@ -188,9 +786,17 @@ def reset_database():
         
         # Remove todas as tabelas
         cursor.execute('DROP TABLE IF EXISTS history')
+        cursor.execute('DROP TABLE IF EXISTS dream_meanings_cache')
+        cursor.execute('DROP TABLE IF EXISTS dream_interpretations')
+        cursor.execute('DROP TABLE IF EXISTS interpretation_jobs')
+        cursor.execute('DROP TABLE IF EXISTS keyword_df')
+        cursor.execute('DROP TABLE IF EXISTS translation_memory')
+        cursor.execute('DROP TABLE IF EXISTS dream_tags')
+        cursor.execute('DROP TABLE IF EXISTS tags')
         cursor.execute('DROP TABLE IF EXISTS comments')
         cursor.execute('DROP TABLE IF EXISTS favorites')
         cursor.execute('DROP TABLE IF EXISTS likes')
+        cursor.execute('DROP TABLE IF EXISTS dreams_fts')
         cursor.execute('DROP TABLE IF EXISTS dreams')
         cursor.execute('DROP TABLE IF EXISTS password_reset_tokens')
         cursor.execute('DROP TABLE IF EXISTS users')
@@ -200,15 +806,19 @@ def reset_database():
         cursor.execute('DROP INDEX IF EXISTS idx_favorites_user')
         cursor.execute('DROP INDEX IF EXISTS idx_comments_dream')
         cursor.execute('DROP INDEX IF EXISTS idx_history_user')
+        cursor.execute('DROP INDEX IF EXISTS idx_history_dedup')
         
         conn.commit()
+    finally:
+        # A conexão da requisição volta ao pool: reabilita as foreign keys
+        # (o PRAGMA não tem efeito dentro de uma transação aberta)
+        if conn.in_transaction:
+            conn.rollback()
+        cursor.execute('PRAGMA foreign_keys = ON')
         conn.close()
-        
-        # Reabilita foreign keys e recria o banco
-        init_db()
-        
-        return True
-    except Exception as e:
-        conn.close()
-        raise e
+    
+    # Recria o banco
+    init_db()
+    
+    return True
 
@@ -0,0 +1,217 @@
+"""Pool de conexões SQLite por processo"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Nenhuma conexão ficou livre dentro do tempo limite do pool"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexão emprestada do pool.
+
+    As rotas chamam conn.close() ao terminar; aqui isso não fecha a conexão,
+    que só é devolvida ao pool no teardown da requisição.
+    """
+
+    def close(self):
+        pass
+
+    def _close(self):
+        super().close()
+
+
+_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def configure_connection(conn):
+    """Aplica os PRAGMAs de conexão (executado uma única vez por conexão)"""
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+
+    synchronous = Config.DB_SYNCHRONOUS.upper()
+    if synchronous in _SYNCHRONOUS_MODES:
+        conn.execute(f'PRAGMA synchronous = {synchronous}')
+    conn.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}')
+    conn.execute(f'PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}')
+    conn.execute(f'PRAGMA cache_size = {int(Config.DB_CACHE_SIZE)}')
+    return conn
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite.
+
+    Cada worker (processo) tem seu próprio pool; após um fork as conexões
+    herdadas são descartadas e o pool recomeça vazio.
+    """
+
+    def __init__(self, database: str, size: int = 10, timeout: float = 5.0,
+                 cached_statements: int = 128):
+        self.database = database
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'discarded': 0,
+            'wait_time_ms': 0.0,
+        }
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Conexões SQLite não podem atravessar um fork
+                    self._reset()
+
+    def _count(self, name: str, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        return configure_connection(conn)
+
+    def acquire(self):
+        """Empresta uma conexão do pool, criando ou aguardando se necessário"""
+        self._check_fork()
+
+        try:
+            conn = self._idle.get_nowait()
+            self._count('hits')
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self._stats['misses'] += 1
+
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        self._count('waits')
+        start = time.monotonic()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count('timeouts')
+            raise PoolTimeoutError(
+                f"Nenhuma conexão disponível no pool após {self.timeout}s"
+            )
+        finally:
+            self._count('wait_time_ms', (time.monotonic() - start) * 1000)
+        return conn
+
+    def release(self, conn):
+        """Devolve a conexão ao pool, desfazendo transações pendentes"""
+        if conn is None:
+            return
+
+        if self._pid != os.getpid():
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Descartando conexão do pool: {e}")
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._stats['discarded'] += 1
+            self._created -= 1
+        try:
+            conn._close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão para uso fora de uma requisição (ex: threads)"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Retorna métricas do pool"""
+        with self._lock:
+            stats = dict(self._stats)
+            created = self._created
+        return {
+            'size': self.size,
+            'created': created,
+            'idle': self._idle.qsize(),
+            **stats,
+            'wait_time_ms': round(stats['wait_time_ms'], 2),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Retorna o pool do processo atual, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    Config.DATABASE,
+                    size=Config.DB_POOL_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    cached_statements=Config.DB_STATEMENT_CACHE,
+                )
+    return _pool
@@ -0,0 +1,175 @@
+"""Fila de escrita única para o SQLite
+
+Uma thread dona de uma conexão própria recebe as escritas pequenas das rotas
+e as agrupa em uma única transação, trocando um fsync por escrita por um
+fsync por lote. Cada escrita roda dentro de um SAVEPOINT, então a falha de
+uma não desfaz as demais do mesmo lote.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import Config
+from .pool import configure_connection
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Thread única de escrita com agrupamento de transações"""
+
+    def __init__(self, database: str, batch_size: int = 100, window_ms: float = 5,
+                 max_pending: int = 10000):
+        self.database = database
+        self.batch_size = max(1, batch_size)
+        self.window = max(0.0, window_ms) / 1000
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'committed': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_batch': 0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Threads não sobrevivem a um fork: descarta a fila herdada
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, work) -> Future:
+        """
+        Enfileira uma escrita.
+
+        Args:
+            work: callable que recebe um cursor e executa a escrita
+
+        Returns:
+            Future resolvido com o retorno de `work` após o commit do lote
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((work, future))
+        self._stats['submitted'] += 1
+        return future
+
+    def stop(self, timeout: float = 5.0):
+        """Processa as escritas pendentes e encerra a thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _run(self):
+        conn = configure_connection(sqlite3.connect(self.database))
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+
+                batch = [item]
+                stop = False
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            item = self._queue.get(timeout=remaining)
+                        else:
+                            item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._apply(conn, batch)
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _apply(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for work, future in batch:
+                conn.execute('SAVEPOINT write_item')
+                try:
+                    result = work(conn.cursor())
+                    conn.execute('RELEASE write_item')
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_item')
+                    conn.execute('RELEASE write_item')
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao gravar lote de {len(batch)} escritas: {e}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            self._stats['failed'] += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self._stats['batches'] += 1
+        self._stats['max_batch'] = max(self._stats['max_batch'], len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                self._stats['failed'] += 1
+                future.set_exception(error)
+            else:
+                self._stats['committed'] += 1
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Retorna métricas da fila de escrita"""
+        return {
+            'enabled': True,
+            'pending': self._queue.qsize(),
+            **self._stats,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteQueue:
+    """Retorna a fila de escrita do processo, criando-a na primeira chamada"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteQueue(
+                    Config.DATABASE,
+                    batch_size=Config.DB_WRITE_BATCH_SIZE,
+                    window_ms=Config.DB_WRITE_BATCH_WINDOW_MS,
+                    max_pending=Config.DB_WRITE_MAX_PENDING,
+                )
+                atexit.register(_writer.stop)
+    return _writer
@@ -1,10 +1,61 @@
 """Rotas de API para funcionalidades interativas"""
 from flask import jsonify, request, session
-from models import get_db
-from utils.dream_meanings import get_dream_meaning, get_keywords_from_dream
+from config import Config
+from models import get_db, run_write, get_dream_comments, get_dream_version, get_dream_stats_version, enqueue_interpretation
+from utils.cache import cache_get, cache_set, invalidate_dream
+from utils.dream_meanings import MEANING_LANGUAGES, get_dream_meaning, get_keywords_from_dream, get_meanings_for_dream
+from utils.history_buffer import get_history_buffer
+from utils.http_cache import make_etag, not_modified, with_etag
+from utils.interpretations import get_interpretation, get_interpretation_version, get_interpretation_workers
+from utils.memberships import get_memberships, refresh_memberships
 from utils.translator import get_text
 from . import api_bp
 
+# Escritas de cada ação (usadas pelas rotas individuais e por /api/batch)
+
+def _write_like(cur, user_id, dream_id, like):
+    """Curte/descurte e retorna o total de curtidas (contador mantido por trigger)"""
+    if like:
+        # Adiciona curtida
+        cur.execute('''
+            INSERT OR IGNORE INTO likes (user_id, dream_id) 
+            VALUES (?, ?)
+        ''', (user_id, dream_id))
+    else:
+        # Remove curtida
+        cur.execute('''
+            DELETE FROM likes 
+            WHERE user_id = ? AND dream_id = ?
+        ''', (user_id, dream_id))
+    
+    cur.execute('SELECT like_count FROM dreams WHERE id = ?', (dream_id,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+def _write_favorite(cur, user_id, dream_id, favorite):
+    if favorite:
+        # Adiciona favorito
+        cur.execute('''
+            INSERT OR IGNORE INTO favorites (user_id, dream_id) 
+            VALUES (?, ?)
+        ''', (user_id, dream_id))
+    else:
+        # Remove favorito
+        cur.execute('''
+            DELETE FROM favorites 
+            WHERE user_id = ? AND dream_id = ?
+        ''', (user_id, dream_id))
+
+def _write_comment(cur, user_id, dream_id, content):
+    """Adiciona um comentário; LookupError se o sonho não existe"""
+    cur.execute('SELECT id FROM dreams WHERE id = ?', (dream_id,))
+    if not cur.fetchone():
+        raise LookupError('Sonho não encontrado')
+    cur.execute('''
+        INSERT INTO comments (user_id, dream_id, content)
+        VALUES (?, ?, ?)
+    ''', (user_id, dream_id, content))
+
 @api_bp.route('/api/like', methods=['POST'])
 def toggle_like():
     """API para curtir/descurtir um sonho"""
@@ -19,37 +70,16 @@ def toggle_like():
     if not dream_id:
         return jsonify({'success': False, 'error': 'ID do sonho não fornecido'}), 400
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        if like:
-            # Adiciona curtida
-            cursor.execute('''
-                INSERT OR IGNORE INTO likes (user_id, dream_id) 
-                VALUES (?, ?)
-            ''', (user['id'], dream_id))
-        else:
-            # Remove curtida
-            cursor.execute('''
-                DELETE FROM likes 
-                WHERE user_id = ? AND dream_id = ?
-            ''', (user['id'], dream_id))
-        
-        conn.commit()
-        
-        # Conta total de curtidas
-        cursor.execute('SELECT COUNT(*) as count FROM likes WHERE dream_id = ?', (dream_id,))
-        like_count = cursor.fetchone()['count']
-        
-        conn.close()
+        like_count = run_write(lambda cur: _write_like(cur, user['id'], dream_id, like))
+        refresh_memberships(user['id'])
+        invalidate_dream(dream_id, user_id=user['id'], feed=False)
         
         return jsonify({
             'success': True,
             'like_count': like_count
         })
     except Exception as e:
-        conn.close()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @api_bp.route('/api/favorite', methods=['POST'])
@@ -66,29 +96,13 @@ def toggle_favorite():
     if not dream_id:
         return jsonify({'success': False, 'error': 'ID do sonho não fornecido'}), 400
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        if favorite:
-            # Adiciona favorito
-            cursor.execute('''
-                INSERT OR IGNORE INTO favorites (user_id, dream_id) 
-                VALUES (?, ?)
-            ''', (user['id'], dream_id))
-        else:
-            # Remove favorito
-            cursor.execute('''
-                DELETE FROM favorites 
-                WHERE user_id = ? AND dream_id = ?
-            ''', (user['id'], dream_id))
-        
-        conn.commit()
-        conn.close()
+        run_write(lambda cur: _write_favorite(cur, user['id'], dream_id, favorite))
+        refresh_memberships(user['id'])
+        invalidate_dream(dream_id, user_id=user['id'], feed=False)
         
         return jsonify({'success': True})
     except Exception as e:
-        conn.close()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @api_bp.route('/api/history', methods=['POST'])
@@ -105,30 +119,16 @@ def register_history():
     if not dream_id:
         return jsonify({'success': False, 'error': 'ID do sonho não fornecido'}), 400
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        # Remove histórico duplicado recente (mesma ação no mesmo sonho)
-        cursor.execute('''
-            DELETE FROM history 
-            WHERE user_id = ? AND dream_id = ? AND action_type = ?
-            AND created_at > datetime('now', '-1 hour')
-        ''', (user['id'], dream_id, action_type))
-        
-        # Adiciona novo registro
-        cursor.execute('''
-            INSERT INTO history (user_id, dream_id, action_type)
-            VALUES (?, ?, ?)
-        ''', (user['id'], dream_id, action_type))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({'success': True})
-    except Exception as e:
-        conn.close()
-        return jsonify({'success': False, 'error': str(e)}), 500
+        dream_id = int(dream_id)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'ID do sonho inválido'}), 400
+    
+    # Vai para o buffer de histórico (gravação em lote, sem commit por evento)
+    if not get_history_buffer().record(user['id'], dream_id, action_type):
+        return jsonify({'success': False, 'error': 'Histórico temporariamente indisponível'}), 503
+    
+    return jsonify({'success': True})
 
 @api_bp.route('/api/comment', methods=['POST'])
 def add_comment():
@@ -147,30 +147,149 @@ def add_comment():
     if not content:
         return jsonify({'success': False, 'error': 'Conteúdo do comentário não fornecido'}), 400
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        # Verifica se o sonho existe
-        cursor.execute('SELECT id FROM dreams WHERE id = ?', (dream_id,))
-        if not cursor.fetchone():
-            conn.close()
-            return jsonify({'success': False, 'error': 'Sonho não encontrado'}), 404
-        
-        # Adiciona comentário
-        cursor.execute('''
-            INSERT INTO comments (user_id, dream_id, content)
-            VALUES (?, ?, ?)
-        ''', (user['id'], dream_id, content))
-        
-        conn.commit()
-        conn.close()
+        run_write(lambda cur: _write_comment(cur, user['id'], dream_id, content))
+        invalidate_dream(dream_id, feed=False)
         
         return jsonify({'success': True})
+    except LookupError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
     except Exception as e:
-        conn.close()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Máximo de operações por chamada de /api/batch
+BATCH_MAX_OPERATIONS = 50
+
+def _parse_operation(op):
+    """
+    Valida uma operação de /api/batch.
+    
+    Returns:
+        (tipo, dream_id, argumento) ou uma mensagem de erro (str)
+    """
+    if not isinstance(op, dict):
+        return 'Operação inválida'
+    kind = op.get('op')
+    dream_id = op.get('dream_id')
+    if not dream_id:
+        return 'ID do sonho não fornecido'
+    try:
+        dream_id = int(dream_id)
+    except (TypeError, ValueError):
+        return 'ID do sonho inválido'
+    
+    if kind == 'like':
+        return kind, dream_id, bool(op.get('like', True))
+    if kind == 'favorite':
+        return kind, dream_id, bool(op.get('favorite', True))
+    if kind == 'history':
+        return kind, dream_id, op.get('action_type', 'view')
+    if kind == 'comment':
+        content = str(op.get('content', '')).strip()
+        if not content:
+            return 'Conteúdo do comentário não fornecido'
+        return kind, dream_id, content
+    return f'Operação desconhecida: {kind}'
+
+_BATCH_WRITES = {
+    'like': _write_like,
+    'favorite': _write_favorite,
+    'comment': _write_comment,
+}
+
+@api_bp.route('/api/batch', methods=['POST'])
+def run_batch():
+    """
+    API para executar várias ações de uma vez (curtir, favoritar, histórico, comentar).
+    
+    Corpo: {"operations": [{"op": "like", "dream_id": 1, "like": true}, ...]}
+    
+    Todas as operações são gravadas em uma única transação (um commit); cada
+    uma roda em um savepoint, então a falha de uma não desfaz as outras.
+    Eventos de histórico vão para o buffer de histórico.
+    Retorna um resultado por operação, na mesma ordem.
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'success': False, 'error': 'Não autenticado'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'Nenhuma operação fornecida'}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({
+            'success': False,
+            'error': f'Máximo de {BATCH_MAX_OPERATIONS} operações por requisição'
+        }), 400
+    
+    parsed = [_parse_operation(op) for op in operations]
+    results = [
+        {'success': False, 'error': operation} if isinstance(operation, str) else None
+        for operation in parsed
+    ]
+    writes = [
+        index for index, operation in enumerate(parsed)
+        if results[index] is None and operation[0] in _BATCH_WRITES
+    ]
+    
+    def write(cur):
+        written = {}
+        # Savepoint externo: sem a fila de escrita, o RELEASE do primeiro
+        # savepoint interno faria commit sozinho
+        cur.execute('SAVEPOINT api_batch')
+        for index in writes:
+            kind, dream_id, argument = parsed[index]
+            cur.execute('SAVEPOINT api_batch_op')
+            try:
+                value = _BATCH_WRITES[kind](cur, user['id'], dream_id, argument)
+                cur.execute('RELEASE api_batch_op')
+            except Exception as e:
+                cur.execute('ROLLBACK TO api_batch_op')
+                cur.execute('RELEASE api_batch_op')
+                written[index] = {'success': False, 'error': str(e)}
+                continue
+            written[index] = {'success': True}
+            if kind == 'like':
+                written[index]['like_count'] = value
+        cur.execute('RELEASE api_batch')
+        return written
+    
+    try:
+        if writes:
+            for index, result in run_write(write).items():
+                results[index] = result
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    # Eventos de histórico: buffer, sem transação própria
+    history = get_history_buffer()
+    for index, operation in enumerate(parsed):
+        if results[index] is None:
+            _, dream_id, action_type = operation
+            if history.record(user['id'], dream_id, action_type):
+                results[index] = {'success': True}
+            else:
+                results[index] = {'success': False, 'error': 'Histórico temporariamente indisponível'}
+    
+    # Conjuntos do usuário e caches dos sonhos tocados
+    touched = []
+    memberships_changed = False
+    for operation, result in zip(parsed, results):
+        if not result['success']:
+            continue
+        kind, dream_id, _ = operation
+        memberships_changed |= kind in ('like', 'favorite')
+        if kind != 'history':
+            touched.append(str(dream_id))
+    if memberships_changed:
+        refresh_memberships(user['id'])
+    for dream_id in dict.fromkeys(touched):
+        invalidate_dream(dream_id, user_id=user['id'], feed=False)
+    
+    return jsonify({'success': True, 'results': results})
+
 @api_bp.route('/api/comments/<int:dream_id>', methods=['GET'])
 def get_comments(dream_id):
     """API para obter comentários de um sonho"""
@@ -178,40 +297,73 @@ def get_comments(dream_id):
     if not user:
         return jsonify({'success': False, 'error': 'Não autenticado'}), 401
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            SELECT c.*, u.username, u.name, u.picture
-            FROM comments c
-            JOIN users u ON c.user_id = u.id
-            WHERE c.dream_id = ?
-            ORDER BY c.created_at ASC
-        ''', (dream_id,))
+        # Versão dos comentários (total e último id): 304 se o cliente já a tem
+        version = get_dream_version(dream_id)
+        if version:
+            etag = make_etag('comments', dream_id, version['comment_count'], version['last_comment_id'])
+            cached = not_modified(etag)
+            if cached:
+                return cached
         
-        comments = cursor.fetchall()
-        conn.close()
+        comments_list = get_dream_comments(dream_id)
         
-        comments_list = []
-        for comment in comments:
-            comments_list.append({
-                'id': comment['id'],
-                'content': comment['content'],
-                'created_at': comment['created_at'],
-                'username': comment['username'],
-                'name': comment['name'],
-                'picture': comment['picture']
-            })
-        
-        return jsonify({
+        response = jsonify({
             'success': True,
             'comments': comments_list
         })
+        return with_etag(response, etag) if version else response
     except Exception as e:
-        conn.close()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Máximo de sonhos por chamada de /api/dream-stats?ids= (uma página do feed, com folga)
+DREAM_STATS_BATCH_LIMIT = 50
+
+def _dream_counters(dream_ids):
+    """
+    Contadores (curtidas, favoritos, comentários) de vários sonhos.
+
+    Usa os contadores em cache (tag 'dream:{id}', invalidada ao curtir,
+    favoritar e comentar) e busca os que faltam em uma única consulta IN.
+    Sonhos inexistentes ficam fora do resultado.
+    """
+    counters = {}
+    missing = []
+    for dream_id in dream_ids:
+        cached = cache_get(f'dream_stats:{dream_id}')
+        if cached is None:
+            missing.append(dream_id)
+        else:
+            counters[dream_id] = cached
+    
+    if missing:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, like_count, favorite_count, comment_count
+            FROM dreams WHERE id IN ({','.join('?' * len(missing))})
+        ''', missing)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        for row in rows:
+            counts = {
+                'like_count': row['like_count'],
+                'favorite_count': row['favorite_count'],
+                'comment_count': row['comment_count']
+            }
+            counters[row['id']] = counts
+            cache_set(f'dream_stats:{row["id"]}', counts, Config.DREAM_STATS_TTL,
+                      tags=[f'dream:{row["id"]}'], shared=False)
+    return counters
+
+def _dream_stats(counts, dream_id, memberships):
+    return {
+        **counts,
+        'is_liked': dream_id in memberships['likes'],
+        'is_favorited': dream_id in memberships['favorites']
+    }
+
 @api_bp.route('/api/dream-stats/<int:dream_id>', methods=['GET'])
 def get_dream_stats(dream_id):
     """API para obter estatísticas de um sonho (curtidas, favoritos)"""
@@ -219,46 +371,57 @@ def get_dream_stats(dream_id):
     if not user:
         return jsonify({'success': False, 'error': 'Não autenticado'}), 401
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     try:
-        # Verifica se o sonho existe
-        cursor.execute('SELECT id FROM dreams WHERE id = ?', (dream_id,))
-        if not cursor.fetchone():
-            conn.close()
+        # Carimbo barato (uma consulta pelas chaves, sem cache nem conjuntos do
+        # usuário): o 304 sai antes de qualquer outro trabalho
+        stats = get_dream_stats_version(dream_id, user['id'])
+        if not stats:
             return jsonify({'success': False, 'error': 'Sonho não encontrado'}), 404
         
-        # Conta curtidas
-        cursor.execute('SELECT COUNT(*) as count FROM likes WHERE dream_id = ?', (dream_id,))
-        like_count = cursor.fetchone()['count']
-        
-        # Verifica se o usuário curtiu
-        cursor.execute('''
-            SELECT COUNT(*) > 0 as is_liked 
-            FROM likes 
-            WHERE dream_id = ? AND user_id = ?
-        ''', (dream_id, user['id']))
-        is_liked = cursor.fetchone()['is_liked']
-        
-        # Verifica se o usuário favoritou
-        cursor.execute('''
-            SELECT COUNT(*) > 0 as is_favorited 
-            FROM favorites 
-            WHERE dream_id = ? AND user_id = ?
-        ''', (dream_id, user['id']))
-        is_favorited = cursor.fetchone()['is_favorited']
-        
-        conn.close()
+        etag = make_etag('stats', dream_id, user['id'], *stats.values())
+        return not_modified(etag) or with_etag(jsonify({'success': True, **stats}), etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/api/dream-stats', methods=['GET'])
+def get_dream_stats_batch():
+    """
+    API para obter estatísticas de vários sonhos de uma vez (?ids=1,2,3).
+    
+    Usada para atualizar os contadores de uma página inteira do feed em uma
+    única requisição. Sonhos inexistentes ficam fora de 'stats'.
+    """
+    user = session.get('user')
+    if not user:
+        return jsonify({'success': False, 'error': 'Não autenticado'}), 401
+    
+    try:
+        dream_ids = list(dict.fromkeys(
+            int(value) for value in request.args.get('ids', '').split(',') if value.strip()
+        ))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'IDs inválidos'}), 400
+    
+    if not dream_ids:
+        return jsonify({'success': False, 'error': 'IDs dos sonhos não fornecidos'}), 400
+    if len(dream_ids) > DREAM_STATS_BATCH_LIMIT:
+        return jsonify({
+            'success': False,
+            'error': f'Máximo de {DREAM_STATS_BATCH_LIMIT} sonhos por requisição'
+        }), 400
+    
+    try:
+        counters = _dream_counters(dream_ids)
+        memberships = get_memberships(user['id'])
         
         return jsonify({
             'success': True,
-            'like_count': like_count,
-            'is_liked': bool(is_liked),
-            'is_favorited': bool(is_favorited)
+            'stats': {
+                str(dream_id): _dream_stats(counters[dream_id], dream_id, memberships)
+                for dream_id in dream_ids if dream_id in counters
+            }
         })
     except Exception as e:
-        conn.close()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -271,48 +434,76 @@ def get_dream_meaning_api(dream_id):
     
     # Parâmetro de idioma (padrão: português)
     lang = request.args.get('lang', 'pt').lower()
-    if lang not in ['pt', 'en', 'es', 'fr', 'de']:
+    if lang not in MEANING_LANGUAGES:
         lang = 'pt'
     
     conn = get_db()
     cursor = conn.cursor()
     
     try:
+        # Interpretação pré-calculada pelo job de segundo plano (com ETag pela versão)
+        version = get_interpretation_version(cursor, dream_id, lang)
+        if version is not None:
+            etag = make_etag('meaning', dream_id, lang, *version)
+            cached = not_modified(etag)
+            if cached:
+                conn.close()
+                return cached
+        
+        interpretation = get_interpretation(cursor, dream_id, lang)
+        if interpretation is not None:
+            conn.close()
+            response = jsonify({
+                'success': True,
+                'dream_id': dream_id,
+                **interpretation,
+                'partial': 'timeout' in interpretation['statuses'].values(),
+                'precomputed': True,
+                'language': lang
+            })
+            return with_etag(response, etag) if version is not None else response
+        
         # Busca o sonho
-        cursor.execute('SELECT title, description FROM dreams WHERE id = ?', (dream_id,))
+        cursor.execute('''
+            SELECT d.title, d.description, j.status AS job_status
+            FROM dreams d
+            LEFT JOIN interpretation_jobs j ON j.dream_id = d.id
+            WHERE d.id = ?
+        ''', (dream_id,))
         dream = cursor.fetchone()
-        conn.close()
         
         if not dream:
+            conn.close()
             return jsonify({'success': False, 'error': 'Sonho não encontrado'}), 404
         
+        workers = get_interpretation_workers()
+        if dream['job_status'] is None and workers.enabled:
+            # Sonho anterior aos jobs: agenda a interpretação para os próximos acessos
+            # (sem workers ninguém executaria o job; a resposta é calculada na hora)
+            run_write(lambda cur: enqueue_interpretation(cur, dream_id))
+            workers.notify(dream_id)
+        conn.close()
+        
         # Extrai palavras-chave do título e descrição
         dream_text = f"{dream['title']} {dream['description']}"
         keywords = get_keywords_from_dream(dream_text)
         
-        # Busca significados para cada palavra-chave
-        meanings = []
-        for keyword in keywords:
-            meaning_data = get_dream_meaning(keyword, lang)
-            if meaning_data and meaning_data['source'] != 'error':
-                meanings.append(meaning_data)
+        # Palavras-chave e texto completo em paralelo, com prazo total
+        result = get_meanings_for_dream(dream_text, keywords, lang)
+        meanings = result['meanings']
 
-        # Se poucos significados foram encontrados, tente interpretar o texto completo
-        if len(meanings) < 2:
-            try:
-                full_meaning = get_dream_meaning(dream_text, lang)
-                if full_meaning and full_meaning.get('source') not in ('error', 'fallback'):
-                    # marca como interpretação de contexto
-                    full_meaning['context'] = True
-                    meanings.insert(0, full_meaning)
-            except Exception:
-                pass
+        # Se poucos significados foram encontrados, use a interpretação do texto completo
+        if len(meanings) < 2 and result['context']:
+            meanings.insert(0, result['context'])
 
         return jsonify({
             'success': True,
             'dream_id': dream_id,
             'keywords': keywords,
             'meanings': meanings,
+            'statuses': result['statuses'],
+            'partial': result['partial'],
+            'precomputed': False,
             'language': lang
         })
     
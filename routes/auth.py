@@ -5,6 +5,7 @@ import logging
 
 from models import get_db, create_password_reset_token, validate_password_reset_token, mark_token_as_used
 from utils.email_validator import is_email_valid
+from utils.http_cache import render_static_page
 from config import Config
 from . import auth_bp
 
@@ -232,24 +233,24 @@ def logout():
 
 @auth_bp.route('/blog')
 def blog():
-    return render_template('blog.html')
+    return render_static_page('blog.html')
 
 
 @auth_bp.route('/about')
 def about():
-    return render_template('about.html')
+    return render_static_page('about.html')
 
 
 @auth_bp.route('/terms')
 def terms():
-    return render_template('terms.html')
+    return render_static_page('terms.html')
 
 
 @auth_bp.route('/nossoApp')
 def nossoApp():
-    return render_template('nossoApp.html')
+    return render_static_page('nossoApp.html')
 
 @auth_bp.route('/nossaIA')
 def nossaIA():
-    return render_template('nossaIA.html')
+    return render_static_page('nossaIA.html')
 
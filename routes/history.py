@@ -1,6 +1,7 @@
 """Rotas para histórico do usuário"""
 from flask import render_template, session, redirect, url_for
 from models import get_db
+from utils.history_buffer import get_history_buffer
 from . import main_bp
 
 @main_bp.route('/historico')
@@ -10,6 +11,9 @@ def history():
     if not user:
         return redirect(url_for('main.index'))
     
+    # Grava os eventos ainda no buffer para a página mostrar as visitas recentes
+    get_history_buffer().flush()
+    
     conn = get_db()
     cursor = conn.cursor()
     
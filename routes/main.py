@@ -1,9 +1,14 @@
 """Rotas principais da aplicação"""
 from flask import render_template, session, redirect, url_for, request, jsonify
+import base64
 import json
 import logging
-from models import get_db
+from config import Config
+from markupsafe import Markup, escape
+from models import get_db, get_tags_for_dreams, search_index_available, build_search_query
 from utils.cache import cache_result
+from utils.fragments import render_dream_card
+from utils.memberships import get_memberships
 from . import main_bp
 
 logger = logging.getLogger(__name__)
@@ -31,90 +36,139 @@ def feed():
     tag_filter = request.args.get('tag', '').strip()
     search_query = request.args.get('search', '').strip()
     filter_type = request.args.get('filter', '').strip()
-    page = int(request.args.get('page', 1))
-    per_page = 10
-    offset = (page - 1) * per_page
+    per_page = Config.FEED_PER_PAGE
+    
+    # Paginação: por cursor (padrão) ou ?page= legado com OFFSET
+    cursor_data = _decode_cursor(request.args.get('cursor', ''))
+    legacy_page = request.args.get('page', type=int) if not cursor_data else None
+    page = cursor_data['p'] if cursor_data else (legacy_page or 1)
+    
+    # Busca textual pelo índice FTS5 (ordenada por relevância); LIKE se indisponível
+    search_match = None
+    if search_query and search_index_available(conn):
+        search_match = build_search_query(search_query)
+    ranked = search_match is not None
     
-    # Query otimizada: JOIN com subqueries para contagens
     query = '''
-        SELECT d.id, d.user_id, d.title, d.description, d.dream_type, d.tags, d.image_path,
-               d.created_at, u.username, u.name, u.picture,
-               (SELECT COUNT(*) FROM likes WHERE dream_id = d.id) as like_count,
-               (SELECT COUNT(*) FROM likes WHERE dream_id = d.id AND user_id = ?) > 0 as is_liked,
-               (SELECT COUNT(*) FROM favorites WHERE dream_id = d.id AND user_id = ?) > 0 as is_favorited
+        SELECT d.id, d.user_id, d.title, d.description, d.dream_type, d.image_path,
+               d.created_at, d.updated_at, u.username, u.name, u.picture, d.like_count
+    '''
+    params = []
+    if ranked:
+        query += ''',
+               snippet(dreams_fts, 1, ?, ?, '…', 24) as snippet
+        FROM dreams_fts
+        JOIN dreams d ON d.id = dreams_fts.rowid
+        JOIN users u ON d.user_id = u.id
+        '''
+        params.extend([_HIGHLIGHT_START, _HIGHLIGHT_END])
+    else:
+        query += '''
         FROM dreams d
         JOIN users u ON d.user_id = u.id
-    '''
-    params = [user['id'], user['id']]
+        '''
+    
+    # Curtidas/favoritos do usuário: um acesso ao cache para a página inteira
+    memberships = get_memberships(user['id'])
     
     # Aplica filtros
     conditions = []
+    filter_params = []
     
-    if filter_type == 'liked':
-        conditions.append('d.id IN (SELECT dream_id FROM likes WHERE user_id = ?)')
-        params.insert(0, user['id'])
-    elif filter_type == 'favorites':
-        conditions.append('d.id IN (SELECT dream_id FROM favorites WHERE user_id = ?)')
-        params.insert(0, user['id'])
+    if filter_type in ('liked', 'favorites'):
+        member_ids = memberships['likes' if filter_type == 'liked' else 'favorites']
+        conditions.append('d.id IN (SELECT value FROM json_each(?))')
+        filter_params.append(json.dumps(list(member_ids)))
     
     if tag_filter:
-        conditions.append('d.tags LIKE ?')
-        params.append(f'%"{tag_filter}"%')
+        conditions.append('''d.id IN (
+            SELECT dt.dream_id FROM dream_tags dt
+            JOIN tags t ON t.id = dt.tag_id
+            WHERE t.name = ?
+        )''')
+        filter_params.append(tag_filter.lstrip('#').lower())
+    
+    page_conditions = list(conditions)
+    page_params = list(filter_params)
     
-    if search_query:
-        conditions.append('(d.title LIKE ? OR d.description LIKE ?)')
+    if ranked:
+        page_conditions.insert(0, 'dreams_fts MATCH ?')
+        page_params.insert(0, search_match)
+        conditions.append('d.id IN (SELECT rowid FROM dreams_fts WHERE dreams_fts MATCH ?)')
+        filter_params.append(search_match)
+    elif search_query:
+        search_condition = '(d.title LIKE ? OR d.description LIKE ?)'
         search_param = f'%{search_query}%'
-        params.extend([search_param, search_param])
+        for target, target_params in ((conditions, filter_params), (page_conditions, page_params)):
+            target.append(search_condition)
+            target_params.extend([search_param, search_param])
     
-    if conditions:
-        query += ' WHERE ' + ' AND '.join(conditions)
+    # Keyset em (created_at, id): custo constante em qualquer página.
+    # Na busca por relevância a ordem é o bm25 e o cursor carrega só a página.
+    keyset = bool(cursor_data) and 'c' in cursor_data and not ranked
+    backwards = keyset and cursor_data['d'] == 'prev'
+    if keyset:
+        page_conditions.append(f"(d.created_at, d.id) {'>' if backwards else '<'} (?, ?)")
+        page_params.extend([cursor_data['c'], cursor_data['i']])
     
-    # Preserve parâmetros antes de adicionar LIMIT/OFFSET para a consulta de contagem
-    params_for_count = list(params)
-
-    query += ' ORDER BY d.created_at DESC LIMIT ? OFFSET ?'
-    params.extend([per_page, offset])
+    if page_conditions:
+        query += ' WHERE ' + ' AND '.join(page_conditions)
+        params.extend(page_params)
+    
+    if ranked:
+        # Pesos do bm25 por coluna: título, descrição, tags
+        query += ' ORDER BY bm25(dreams_fts, 10.0, 1.0, 5.0), d.id DESC LIMIT ? OFFSET ?'
+        params.extend([per_page + 1, (page - 1) * per_page])
+    else:
+        order = 'ASC' if backwards else 'DESC'
+        query += f' ORDER BY d.created_at {order}, d.id {order} LIMIT ?'
+        params.append(per_page + 1)
+        if legacy_page:
+            query += ' OFFSET ?'
+            params.append((legacy_page - 1) * per_page)
 
     try:
         cursor.execute(query, params)
     except Exception as e:
         # Em caso de erro na consulta do feed, evita quebrar o site
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Erro ao consultar sonhos para o feed: {e}")
         conn.close()
-        return render_template('feed.html', user=user, dreams=[], tag_filter=tag_filter, search_query=search_query, filter_type=filter_type, page=page, total_pages=0)
+        return render_template('feed.html', user=user, dreams=[], tag_filter=tag_filter, search_query=search_query, filter_type=filter_type, page=page, total_pages=0, next_cursor=None, prev_cursor=None)
     dreams = cursor.fetchall()
     
-    # Conta total para paginação
-    count_query = 'SELECT COUNT(*) as total FROM dreams d'
-    if conditions:
-        count_query += ' WHERE ' + ' AND '.join(conditions)
-        count_params = params_for_count
-    else:
-        count_params = []
-
-    try:
-        cursor.execute(count_query, count_params)
-        total = cursor.fetchone()['total']
-    except Exception:
-        total = 0
-    total_pages = (total + per_page - 1) // per_page
+    has_more = len(dreams) > per_page
+    dreams = dreams[:per_page]
+    if backwards:
+        dreams.reverse()
+    
+    # Cursores das páginas vizinhas
+    next_cursor = prev_cursor = None
+    if dreams:
+        first, last = dreams[0], dreams[-1]
+        if has_more or backwards:
+            next_cursor = _encode_cursor('next', page + 1, None if ranked else last)
+        if (has_more if backwards else page > 1):
+            prev_cursor = _encode_cursor('prev', page - 1, None if ranked else first)
+    
+    # Total estimado (em cache, atualizado em segundo plano)
+    total = _estimated_total(conditions, filter_params)
+    total_pages = max((total + per_page - 1) // per_page, page if dreams else 0)
+    
+    # Tags da página inteira em uma única consulta
+    tags_by_dream = get_tags_for_dreams(cursor, [dream['id'] for dream in dreams])
     
     conn.close()
     
-    # Processa tags para cada sonho
     dreams_list = []
     for dream in dreams:
-        tags = []
-        if dream['tags']:
-            try:
-                tags = json.loads(dream['tags'])
-            except:
-                tags = []
-        
         dream_dict = dict(dream)
-        dream_dict['tags_list'] = tags
+        dream_dict['tags_list'] = tags_by_dream.get(dream['id'], [])
+        dream_dict['is_liked'] = dream['id'] in memberships['likes']
+        dream_dict['is_favorited'] = dream['id'] in memberships['favorites']
+        if ranked:
+            dream_dict['snippet'] = _highlight(dream['snippet'])
+        # HTML do card a partir do cache de fragmentos
+        dream_dict['card_html'] = render_dream_card(dream_dict)
         dreams_list.append(dream_dict)
     
     return render_template('feed.html', 
@@ -124,15 +178,106 @@ def feed():
                          search_query=search_query,
                          filter_type=filter_type,
                          page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
+
+def _encode_cursor(direction, page, dream=None):
+    """Gera o token opaco de paginação (com o sonho de borda, no modo keyset)"""
+    data = {'d': direction, 'p': page}
+    if dream is not None:
+        data.update({'c': dream['created_at'], 'i': dream['id']})
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_cursor(token):
+    """Decodifica um token de paginação; retorna None se inválido"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        if data['d'] not in ('next', 'prev'):
+            return None
+        if 'c' in data:
+            data['i'] = int(data['i'])
+        data['p'] = max(1, int(data['p']))
+        return data
+    except Exception:
+        return None
+
+# Delimitadores do snippet do FTS5 (trocados por <mark> depois do escape)
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+def _highlight(snippet):
+    """Escapa o snippet da busca e marca os termos encontrados"""
+    text = str(escape(snippet or ''))
+    return Markup(text.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>'))
+
+@cache_result('feed_total', Config.FEED_COUNT_TTL, tags=['feed'], stale_ttl=Config.FEED_COUNT_TTL * 10)
+def _count_dreams(conditions, params):
+    """
+    Total de sonhos para a paginação.
+
+    O COUNT(*) roda uma vez por combinação de filtros; depois disso o valor em
+    cache é servido e, passado FEED_COUNT_TTL, recalculado em segundo plano.
+    """
+    count_query = 'SELECT COUNT(*) as total FROM dreams d'
+    if conditions:
+        count_query += ' WHERE ' + ' AND '.join(conditions)
+    # Conexão da requisição (ou avulsa na atualização em segundo plano)
+    conn = get_db()
+    try:
+        return conn.execute(count_query, params).fetchone()['total']
+    finally:
+        conn.close()
+
+def _estimated_total(conditions, params):
+    try:
+        return _count_dreams(tuple(conditions), tuple(params))
+    except Exception as e:
+        logger.warning(f"Erro ao contar sonhos do feed: {e}")
+        return 0
+
+@main_bp.route('/admin/stats')
+def admin_stats():
+    """Rota administrativa com métricas internas da aplicação (só ADMIN_EMAILS)"""
+    user = session.get('user')
+    if not user:
+        return jsonify({'success': False, 'error': 'Não autenticado'}), 401
+    if (user.get('email') or '').lower() not in Config.ADMIN_EMAILS:
+        return jsonify({'success': False, 'error': 'Acesso negado'}), 403
+    
+    from models import get_pool_stats, get_writer_stats
+    from utils.cache import get_cache_stats
+    from utils.dream_meanings import get_meaning_cache_stats
+    from utils.history_buffer import get_history_buffer
+    from utils.http import get_http_stats
+    from utils.interpretations import get_interpretation_workers
+
+    return jsonify({
+        'success': True,
+        'db_pool': get_pool_stats(),
+        'db_writer': get_writer_stats(),
+        'history_buffer': get_history_buffer().stats(),
+        'cache': get_cache_stats(),
+        'meanings': get_meaning_cache_stats(),
+        'interpretations': get_interpretation_workers().stats(),
+        'http': get_http_stats()
+    })
 
 @main_bp.route('/admin/reset-db', methods=['POST'])
 def reset_database():
     """Rota administrativa para resetar o banco de dados completamente"""
     from models import reset_database as reset_db
+    from utils.cache import clear_cache
+    from utils.dream_meanings import clear_meaning_memory
     
     try:
         reset_db()
+        clear_cache()
+        clear_meaning_memory()
         return jsonify({'success': True, 'message': 'Banco de dados resetado com sucesso!'})
     except Exception as e:
         import logging
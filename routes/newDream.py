@@ -6,7 +6,10 @@ import os
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
-from models import get_db
+from models import get_db, save_dream_tags, get_dream_with_author, get_dream_version, enqueue_interpretation, update_keyword_df
+from utils.cache import invalidate_dream
+from utils.http_cache import make_etag, not_modified, with_etag
+from utils.interpretations import get_interpretation_workers, get_job_progress
 from . import dreams_bp
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,8 @@ logger = logging.getLogger(__name__)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 # Ajusta o caminho para a pasta static/uploads/dreams relativa ao root do projeto
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads', 'dreams')
+# Campos do sonho que compõem o ETag de /sonho/<id>/json
+DREAM_ETAG_FIELDS = ('updated_at', 'like_count', 'favorite_count', 'comment_count')
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -73,9 +78,14 @@ def post_dream():
                 'INSERT INTO dreams (user_id, title, description, dream_type, tags, image_path) VALUES (?, ?, ?, ?, ?, ?)',
                 (user['id'], title, description, dream_type, tags_json, image_path)
             )
-            conn.commit()
             dream_id = cursor.lastrowid
+            save_dream_tags(cursor, dream_id, tags_list)
+            update_keyword_df(cursor, new_text=f"{title} {description}")
+            enqueue_interpretation(cursor, dream_id)
+            conn.commit()
             conn.close()
+            invalidate_dream(dream_id, user_id=user['id'])
+            get_interpretation_workers().notify(dream_id)
             
             # Redireciona para página de carregamento
             return redirect(url_for('dreams.loading_dream', dream_id=dream_id))
@@ -110,21 +120,25 @@ def loading_dream(dream_id):
 
 @dreams_bp.route('/verificar-sonho/<int:dream_id>')
 def check_dream(dream_id):
-    """Rota AJAX para verificar se o sonho foi processado"""
+    """Rota AJAX para verificar se o sonho foi processado (progresso da interpretação)"""
     user = session.get('user')
     if not user:
         return jsonify({'error': 'Não autenticado'}), 401
     
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM dreams WHERE id = ? AND user_id = ?', (dream_id, user['id']))
+    cursor.execute('SELECT id FROM dreams WHERE id = ? AND user_id = ?', (dream_id, user['id']))
     dream = cursor.fetchone()
+    job = get_job_progress(cursor, dream_id) if dream else None
     conn.close()
     
     if dream:
+        # Sem job, job encerrado ou workers desligados: o sonho já pode ser exibido
         return jsonify({
-            'ready': True,
-            'dream_id': dream_id
+            'ready': (job is None or job['status'] in ('done', 'failed')
+                      or not get_interpretation_workers().enabled),
+            'dream_id': dream_id,
+            'job': job
         })
     else:
         return jsonify({'ready': False}), 404
@@ -137,19 +151,8 @@ def view_dream(dream_id):
         flash('Você precisa estar logado para ver sonhos.', 'error')
         return redirect(url_for('main.index'))
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Busca o sonho com informações do usuário
-    cursor.execute('''
-        SELECT d.*, u.username, u.name, u.picture 
-        FROM dreams d
-        JOIN users u ON d.user_id = u.id
-        WHERE d.id = ?
-    ''', (dream_id,))
-    
-    dream = cursor.fetchone()
-    conn.close()
+    dream = get_dream_with_author(dream_id)
     
     if not dream:
         flash('Sonho não encontrado.', 'error')
@@ -172,18 +175,15 @@ def view_dream_json(dream_id):
     if not user:
         return jsonify({'success': False, 'error': 'Não autenticado'}), 401
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT d.*, u.username, u.name, u.picture 
-        FROM dreams d
-        JOIN users u ON d.user_id = u.id
-        WHERE d.id = ?
-    ''', (dream_id,))
+    # Versão atual (edição e contadores): 304 se o cliente já a tem
+    version = get_dream_version(dream_id)
+    if not version:
+        return jsonify({'success': False, 'error': 'Sonho não encontrado'}), 404
+    cached = not_modified(_dream_etag(dream_id, version))
+    if cached:
+        return cached
     
-    dream = cursor.fetchone()
-    conn.close()
+    dream = get_dream_with_author(dream_id)
     
     if not dream:
         return jsonify({'success': False, 'error': 'Sonho não encontrado'}), 404
@@ -196,11 +196,17 @@ def view_dream_json(dream_id):
         except:
             tags = []
     
-    return jsonify({
+    # O ETag sai dos campos do corpo servido: se o cache deste worker ainda não
+    # viu a última mudança, o cliente não guarda o corpo antigo com o ETag novo
+    return with_etag(jsonify({
         'success': True,
-        'dream': dict(dream),
+        'dream': dream,
         'tags': tags
-    })
+    }), _dream_etag(dream_id, dream))
+
+def _dream_etag(dream_id, fields):
+    """ETag de /sonho/<id>/json a partir da versão ou do próprio sonho servido"""
+    return make_etag('dream', dream_id, *(fields[name] for name in DREAM_ETAG_FIELDS))
 
 @dreams_bp.route('/editar-sonho/<int:dream_id>', methods=['GET', 'POST'])
 def edit_dream(dream_id):
@@ -267,8 +273,13 @@ def edit_dream(dream_id):
                 SET title = ?, description = ?, dream_type = ?, tags = ?, image_path = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ? AND user_id = ?
             ''', (title, description, dream_type, tags_json, image_path, dream_id, user['id']))
+            save_dream_tags(cursor, dream_id, tags_list)
+            update_keyword_df(cursor, f"{dream['title']} {dream['description']}", f"{title} {description}")
+            enqueue_interpretation(cursor, dream_id)
             conn.commit()
             conn.close()
+            invalidate_dream(dream_id, user_id=user['id'])
+            get_interpretation_workers().notify(dream_id)
             
             flash('Sonho atualizado com sucesso!', 'success')
             return redirect(url_for('dreams.view_dream', dream_id=dream_id))
@@ -317,8 +328,10 @@ def delete_dream(dream_id):
         
         # Deleta sonho (cascata deleta curtidas, favoritos, comentários, histórico)
         cursor.execute('DELETE FROM dreams WHERE id = ? AND user_id = ?', (dream_id, user['id']))
+        update_keyword_df(cursor, old_text=f"{dream['title']} {dream['description']}")
         conn.commit()
         conn.close()
+        invalidate_dream(dream_id, user_id=user['id'])
         
         return jsonify({'success': True})
     except Exception as e:
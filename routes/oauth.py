@@ -5,6 +5,7 @@ import logging
 
 from config import Config
 from models import get_db
+from utils.cache import invalidate
 from werkzeug.security import generate_password_hash
 from . import auth_bp
 
@@ -120,6 +121,8 @@ def auth_google():
             if name and not user['name']:
                 cursor.execute('UPDATE users SET name = ?, picture = ? WHERE id = ?', (name, picture, user_id))
                 conn.commit()
+                # Cards do feed em cache mostram o nome e a foto do autor
+                invalidate(f'user:{user_id}')
         
         conn.close()
         
@@ -200,6 +203,8 @@ def auth_facebook():
             if name and not user['name']:
                 cursor.execute('UPDATE users SET name = ?, picture = ? WHERE id = ?', (name, picture, user_id))
                 conn.commit()
+                # Cards do feed em cache mostram o nome e a foto do autor
+                invalidate(f'user:{user_id}')
         
         conn.close()
         
@@ -0,0 +1,124 @@
+// Cliente da API: agrupa curtidas, favoritos, histórico e comentários feitos
+// em uma janela curta em uma única chamada a /api/batch, e revalida as
+// leituras JSON com If-None-Match (304 reaproveita a resposta anterior)
+
+const ApiClient = (function() {
+    // Janela de agrupamento (ms) e limite do servidor por chamada
+    const WINDOW_MS = 150;
+    const MAX_OPERATIONS = 50;
+
+    // Leituras guardadas por URL (as mais antigas saem primeiro)
+    const MAX_CACHED_READS = 100;
+
+    let queue = [];
+    let timer = null;
+    const reads = new Map();
+
+    function enqueue(operation) {
+        return new Promise((resolve, reject) => {
+            // Curtir/favoritar o mesmo sonho de novo na janela: só o último estado vai
+            // ao servidor, e a ação substituída recebe o mesmo resultado
+            if (operation.op === 'like' || operation.op === 'favorite') {
+                const previous = queue.find(item =>
+                    item.operation.op === operation.op &&
+                    String(item.operation.dream_id) === String(operation.dream_id));
+                if (previous) {
+                    previous.operation = operation;
+                    previous.waiters.push({ resolve, reject });
+                    return;
+                }
+            }
+
+            queue.push({ operation, waiters: [{ resolve, reject }] });
+            if (queue.length >= MAX_OPERATIONS) {
+                flush();
+            } else if (!timer) {
+                timer = setTimeout(flush, WINDOW_MS);
+            }
+        });
+    }
+
+    function takeQueue() {
+        clearTimeout(timer);
+        timer = null;
+        const pending = queue;
+        queue = [];
+        return pending;
+    }
+
+    function flush() {
+        const pending = takeQueue();
+        if (pending.length === 0) return;
+
+        fetch('/api/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ operations: pending.map(item => item.operation) })
+        })
+        .then(response => response.json())
+        .then(data => {
+            pending.forEach((item, index) => {
+                const result = data.success
+                    ? data.results[index]
+                    : { success: false, error: data.error };
+                item.waiters.forEach(waiter => waiter.resolve(result));
+            });
+        })
+        .catch(error => {
+            pending.forEach(item => item.waiters.forEach(waiter => waiter.reject(error)));
+        });
+    }
+
+    // Saindo da página: envia o que falta sem esperar resposta
+    function flushOnExit() {
+        const pending = takeQueue();
+        if (pending.length === 0) return;
+
+        const body = new Blob(
+            [JSON.stringify({ operations: pending.map(item => item.operation) })],
+            { type: 'application/json' }
+        );
+        navigator.sendBeacon('/api/batch', body);
+    }
+
+    window.addEventListener('pagehide', flushOnExit);
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            flushOnExit();
+        }
+    });
+
+    function getJSON(url) {
+        const cached = reads.get(url);
+        const headers = cached ? { 'If-None-Match': cached.etag } : {};
+
+        return fetch(url, { headers: headers })
+            .then(response => {
+                if (response.status === 304 && cached) {
+                    return cached.data;
+                }
+                return response.json().then(data => {
+                    const etag = response.headers.get('ETag');
+                    reads.delete(url);
+                    if (response.ok && etag) {
+                        reads.set(url, { etag: etag, data: data });
+                        if (reads.size > MAX_CACHED_READS) {
+                            reads.delete(reads.keys().next().value);
+                        }
+                    }
+                    return data;
+                });
+            });
+    }
+
+    return {
+        getJSON: getJSON,
+        like: (dreamId, like) => enqueue({ op: 'like', dream_id: dreamId, like: like }),
+        favorite: (dreamId, favorite) => enqueue({ op: 'favorite', dream_id: dreamId, favorite: favorite }),
+        history: (dreamId, actionType) => enqueue({ op: 'history', dream_id: dreamId, action_type: actionType }),
+        comment: (dreamId, content) => enqueue({ op: 'comment', dream_id: dreamId, content: content }),
+        flush: flush
+    };
+})();
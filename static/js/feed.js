@@ -76,13 +76,7 @@ document.addEventListener('DOMContentLoaded', function() {
         container.style.display = 'block';
         preview.style.display = 'none';
         
-        fetch(`/sonho/${dreamId}/json`)
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                return response.json();
-            })
+        ApiClient.getJSON(`/sonho/${dreamId}/json`)
             .then(data => {
                 if (data.success && data.dream) {
                     let html = '';
@@ -145,14 +139,7 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     function toggleLike(dreamId, like, button) {
-        fetch('/api/like', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dream_id: dreamId, like: like })
-        })
-        .then(response => response.json())
+        ApiClient.like(dreamId, like)
         .then(data => {
             if (data.success) {
                 const icon = button.querySelector('i');
@@ -192,14 +179,7 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     function toggleFavorite(dreamId, favorite, button) {
-        fetch('/api/favorite', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dream_id: dreamId, favorite: favorite })
-        })
-        .then(response => response.json())
+        ApiClient.favorite(dreamId, favorite)
         .then(data => {
             if (data.success) {
                 const icon = button.querySelector('i');
@@ -221,15 +201,53 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Atualiza curtidas/favoritos de todos os cards da página em uma única requisição
+    function hydrateStats() {
+        const cards = document.querySelectorAll('.dream-card[data-dream-id]');
+        const ids = Array.from(cards, card => card.getAttribute('data-dream-id'));
+        if (ids.length === 0) return;
+
+        fetch(`/api/dream-stats?ids=${ids.join(',')}`)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) return;
+
+                cards.forEach(card => {
+                    const stats = data.stats[card.getAttribute('data-dream-id')];
+                    if (!stats) return;
+
+                    const likeBtn = card.querySelector('.like-btn');
+                    if (likeBtn) {
+                        likeBtn.classList.toggle('liked', stats.is_liked);
+                        likeBtn.setAttribute('data-liked', stats.is_liked ? 'true' : 'false');
+                        likeBtn.querySelector('i').className = stats.is_liked ? 'bi bi-heart-fill' : 'bi bi-heart';
+                        const countSpan = likeBtn.querySelector('.like-count');
+                        if (countSpan) {
+                            countSpan.textContent = stats.like_count || 0;
+                        }
+                    }
+
+                    const favoriteBtn = card.querySelector('.favorite-btn');
+                    if (favoriteBtn) {
+                        favoriteBtn.classList.toggle('favorited', stats.is_favorited);
+                        favoriteBtn.setAttribute('data-favorited', stats.is_favorited ? 'true' : 'false');
+                        favoriteBtn.querySelector('i').className = stats.is_favorited ? 'bi bi-bookmark-fill' : 'bi bi-bookmark';
+                    }
+                });
+            })
+            .catch(error => console.error('Erro ao atualizar estatísticas:', error));
+    }
+
+    // Página restaurada do cache do navegador (botão voltar): os contadores podem estar velhos
+    window.addEventListener('pageshow', function(e) {
+        if (e.persisted) {
+            hydrateStats();
+        }
+    });
+
     // Registro de Histórico
     function registerHistory(dreamId, actionType) {
-        fetch('/api/history', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dream_id: dreamId, action_type: actionType })
-        })
+        ApiClient.history(dreamId, actionType)
         .catch(error => console.error('Erro ao registrar histórico:', error));
     }
     
@@ -267,8 +285,7 @@ document.addEventListener('DOMContentLoaded', function() {
             button.classList.add('active');
             
             // Busca significados da API
-            fetch(`/api/dream-meaning/${dreamId}?lang=pt`)
-                .then(response => response.json())
+            ApiClient.getJSON(`/api/dream-meaning/${dreamId}?lang=pt`)
                 .then(data => {
                     if (data.success && data.meanings && data.meanings.length > 0) {
                         let html = '<div class="meanings-list" style="padding: 1rem;">';
@@ -1,44 +1,60 @@
-// Verificação periódica se o sonho foi processado
+// Acompanha o job de interpretação do sonho e redireciona quando terminar
 
 document.addEventListener('DOMContentLoaded', function() {
     const loadingFill = document.getElementById('loadingFill');
     const loadingStatus = document.getElementById('loadingStatus');
     
-    let progress = 0;
+    // Tempo máximo de espera: a interpretação continua em segundo plano depois disso
+    const MAX_WAIT_MS = 30000;
+    const startedAt = Date.now();
+    
     let checkInterval;
-    let progressInterval;
+    let finished = false;
+
+    function setProgress(fraction) {
+        // A barra nunca volta e reserva os últimos 10% para o redirecionamento
+        const current = parseFloat(loadingFill.style.width) || 0;
+        const target = Math.max(current, Math.min(90, 10 + fraction * 80));
+        loadingFill.style.width = target + '%';
+    }
 
-    // Simula progresso da barra de carregamento
-    function simulateProgress() {
-        progressInterval = setInterval(function() {
-            if (progress < 90) {
-                progress += Math.random() * 10;
-                if (progress > 90) progress = 90;
-                loadingFill.style.width = progress + '%';
-            }
-        }, 500);
+    function finish(message) {
+        if (finished) return;
+        finished = true;
+        clearInterval(checkInterval);
+        
+        loadingFill.style.width = '100%';
+        loadingStatus.textContent = message;
+        
+        // Redireciona após 1 segundo
+        setTimeout(function() {
+            window.location.href = viewUrl;
+        }, 1000);
     }
 
-    // Verifica se o sonho está pronto
+    // Consulta o progresso real do job
     function checkDreamReady() {
         fetch(checkUrl)
             .then(response => response.json())
             .then(data => {
+                const job = data.job;
+                
                 if (data.ready) {
-                    // Sonho está pronto
-                    clearInterval(checkInterval);
-                    clearInterval(progressInterval);
-                    
-                    loadingFill.style.width = '100%';
-                    loadingStatus.textContent = 'Sonho processado com sucesso!';
-                    
-                    // Redireciona após 1 segundo
-                    setTimeout(function() {
-                        window.location.href = viewUrl;
-                    }, 1000);
-                } else {
-                    // Continua verificando
-                    loadingStatus.textContent = 'Verificando informações...';
+                    finish('Sonho processado com sucesso!');
+                    return;
+                }
+                
+                if (job) {
+                    setProgress(job.progress);
+                    if (job.status === 'pending') {
+                        loadingStatus.textContent = 'Aguardando interpretação...';
+                    } else {
+                        loadingStatus.textContent = `Interpretando significados (${job.steps_done}/${job.steps_total} idiomas)...`;
+                    }
+                }
+                
+                if (Date.now() - startedAt > MAX_WAIT_MS) {
+                    finish('Sonho salvo! Os significados ficarão prontos em instantes.');
                 }
             })
             .catch(error => {
@@ -47,32 +63,12 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
-    // Inicia verificação periódica
-    simulateProgress();
+    loadingStatus.textContent = 'Salvando informações...';
+    setProgress(0);
     
-    // Verifica a cada 2 segundos
-    checkInterval = setInterval(checkDreamReady, 2000);
+    // Verifica a cada segundo
+    checkInterval = setInterval(checkDreamReady, 1000);
     
     // Primeira verificação imediata
     checkDreamReady();
-
-    // Atualiza status durante o carregamento
-    const statusMessages = [
-        'Salvando informações...',
-        'Processando tags...',
-        'Organizando dados...',
-        'Finalizando...'
-    ];
-    
-    let statusIndex = 0;
-    setInterval(function() {
-        if (progress < 90) {
-            loadingStatus.textContent = statusMessages[statusIndex % statusMessages.length];
-            statusIndex++;
-        }
-    }, 2000);
 });
-
-
-
-
@@ -51,14 +51,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 return;
             }
 
-            fetch('/api/comment', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ dream_id: dreamId, content: content })
-            })
-            .then(response => response.json())
+            ApiClient.comment(dreamId, content)
             .then(data => {
                 if (data.success) {
                     commentInput.value = '';
@@ -79,8 +72,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if (!dreamId) return;
 
         // Carrega estatísticas (curtidas, favoritos)
-        fetch(`/api/dream-stats/${dreamId}`)
-            .then(response => response.json())
+        ApiClient.getJSON(`/api/dream-stats/${dreamId}`)
             .then(data => {
                 if (data.success) {
                     if (likeBtn) {
@@ -111,14 +103,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function toggleLike(dreamId, like, button) {
-        fetch('/api/like', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dream_id: dreamId, like: like })
-        })
-        .then(response => response.json())
+        ApiClient.like(dreamId, like)
         .then(data => {
             if (data.success) {
                 const icon = button.querySelector('i');
@@ -143,14 +128,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function toggleFavorite(dreamId, favorite, button) {
-        fetch('/api/favorite', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dream_id: dreamId, favorite: favorite })
-        })
-        .then(response => response.json())
+        ApiClient.favorite(dreamId, favorite)
         .then(data => {
             if (data.success) {
                 const icon = button.querySelector('i');
@@ -173,8 +151,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const dreamId = likeBtn?.getAttribute('data-dream-id');
         if (!dreamId) return;
 
-        fetch(`/api/comments/${dreamId}`)
-            .then(response => response.json())
+        ApiClient.getJSON(`/api/comments/${dreamId}`)
             .then(data => {
                 if (data.success) {
                     if (data.comments.length === 0) {
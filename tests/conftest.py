@@ -0,0 +1,72 @@
+"""Fixtures dos testes: aplicação com banco temporário e cache só em memória"""
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# A configuração é lida na importação: o ambiente precisa vir antes do app
+_TMP_DIR = tempfile.mkdtemp(prefix='sonholandia-tests-')
+os.environ['DATABASE'] = os.path.join(_TMP_DIR, 'test.db')
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ['INTERPRETATION_WORKERS'] = '0'
+os.environ['ADMIN_EMAILS'] = 'admin@example.com'
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    """Conexão do pool dentro de um contexto da aplicação"""
+    from models import get_db
+    with app.app_context():
+        yield get_db()
+
+
+def sign_up(client, name=None) -> int:
+    """Cadastra (e autentica) um usuário novo no cliente; retorna o id"""
+    username = f'usuario{next(_usernames)}'
+    response = client.post('/signUp', data={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': '123456',
+        'confirm_password': '123456',
+        'name': name or username,
+    })
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        return session['user']['id']
+
+
+def post_dream(client, title='Sonho', description='Eu estava voando sobre o mar', tags='#voo') -> int:
+    """Publica um sonho pelo formulário; retorna o id"""
+    response = client.post('/postar-sonho', data={
+        'title': title,
+        'description': description,
+        'dream_type': 'lucido',
+        'tags': tags,
+    })
+    assert response.status_code == 302
+    return int(response.headers['Location'].rstrip('/').split('/')[-1])
+
+
+@pytest.fixture
+def user(client):
+    return sign_up(client)
+
+
+@pytest.fixture
+def dream(client, user):
+    return post_dream(client)
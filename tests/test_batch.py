@@ -0,0 +1,70 @@
+"""/api/batch: uma transação, um savepoint por operação"""
+import routes.api
+from routes.api import BATCH_MAX_OPERATIONS
+
+
+def _batch(client, operations):
+    response = client.post('/api/batch', json={'operations': operations})
+    assert response.status_code == 200
+    return response.get_json()['results']
+
+
+def test_results_follow_operation_order(client, db, dream):
+    results = _batch(client, [
+        {'op': 'like', 'dream_id': dream},
+        {'op': 'favorite', 'dream_id': str(dream)},
+        {'op': 'comment', 'dream_id': dream, 'content': 'Lindo'},
+        {'op': 'history', 'dream_id': dream, 'action_type': 'view'},
+        {'op': 'comment', 'dream_id': dream, 'content': '  '},
+        {'op': 'like', 'dream_id': 'abc'},
+        {'op': 'voar', 'dream_id': dream},
+    ])
+
+    assert [result['success'] for result in results] == [True, True, True, True, False, False, False]
+    assert results[0]['like_count'] == 1
+    assert results[5]['error'] == 'ID do sonho inválido'
+    row = db.execute('SELECT like_count, favorite_count, comment_count FROM dreams WHERE id = ?',
+                     (dream,)).fetchone()
+    assert tuple(row) == (1, 1, 1)
+
+
+def test_failed_operation_is_rolled_back_alone(client, db, user, dream, monkeypatch):
+    def broken_comment(cur, user_id, dream_id, content):
+        cur.execute('INSERT INTO comments (user_id, dream_id, content) VALUES (?, ?, ?)',
+                    (user_id, dream_id, content))
+        raise RuntimeError('falha no meio da operação')
+
+    monkeypatch.setitem(routes.api._BATCH_WRITES, 'comment', broken_comment)
+    results = _batch(client, [
+        {'op': 'like', 'dream_id': dream},
+        {'op': 'comment', 'dream_id': dream, 'content': 'não deve ficar'},
+        {'op': 'favorite', 'dream_id': dream},
+    ])
+
+    assert [result['success'] for result in results] == [True, False, True]
+    assert results[1]['error'] == 'falha no meio da operação'
+    assert db.execute('SELECT COUNT(*) FROM comments WHERE dream_id = ?', (dream,)).fetchone()[0] == 0
+    row = db.execute('SELECT like_count, favorite_count, comment_count FROM dreams WHERE id = ?',
+                     (dream,)).fetchone()
+    assert tuple(row) == (1, 1, 0)
+
+
+def test_missing_dream_does_not_affect_others(client, db, dream):
+    results = _batch(client, [
+        {'op': 'comment', 'dream_id': 999999, 'content': 'sumiu'},
+        {'op': 'comment', 'dream_id': dream, 'content': 'ficou'},
+    ])
+
+    assert [result['success'] for result in results] == [False, True]
+    assert [row[0] for row in db.execute(
+        'SELECT content FROM comments WHERE dream_id IN (?, ?)', (dream, 999999))] == ['ficou']
+
+
+def test_rejects_invalid_batches(client, user):
+    assert client.post('/api/batch', json={}).status_code == 400
+    too_many = [{'op': 'history', 'dream_id': 1}] * (BATCH_MAX_OPERATIONS + 1)
+    assert client.post('/api/batch', json={'operations': too_many}).status_code == 400
+
+
+def test_requires_login(client):
+    assert client.post('/api/batch', json={'operations': [{'op': 'like', 'dream_id': 1}]}).status_code == 401
@@ -0,0 +1,57 @@
+"""Contadores de curtidas/favoritos/comentários mantidos por triggers"""
+from conftest import post_dream
+
+
+def _counters(db, dream_id):
+    row = db.execute(
+        'SELECT like_count, favorite_count, comment_count FROM dreams WHERE id = ?', (dream_id,)
+    ).fetchone()
+    return tuple(row)
+
+
+def test_api_writes_update_counters(client, db, dream):
+    assert _counters(db, dream) == (0, 0, 0)
+
+    assert client.post('/api/like', json={'dream_id': dream, 'like': True}).get_json()['like_count'] == 1
+    client.post('/api/favorite', json={'dream_id': dream, 'favorite': True})
+    client.post('/api/comment', json={'dream_id': dream, 'content': 'Que sonho!'})
+    assert _counters(db, dream) == (1, 1, 1)
+
+    assert client.post('/api/like', json={'dream_id': dream, 'like': False}).get_json()['like_count'] == 0
+    client.post('/api/favorite', json={'dream_id': dream, 'favorite': False})
+    assert _counters(db, dream) == (0, 0, 1)
+
+
+def test_repeated_like_counts_once(client, db, dream):
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    assert _counters(db, dream)[0] == 1
+
+
+def test_triggers_follow_direct_sql(client, db, user, dream):
+    other = post_dream(client, title='Outro sonho')
+    db.execute('INSERT INTO comments (user_id, dream_id, content) VALUES (?, ?, ?)', (user, dream, 'a'))
+    db.execute('INSERT INTO comments (user_id, dream_id, content) VALUES (?, ?, ?)', (user, dream, 'b'))
+    db.commit()
+    assert _counters(db, dream)[2] == 2
+
+    # Mover um comentário de sonho ajusta os dois contadores
+    db.execute('UPDATE comments SET dream_id = ? WHERE dream_id = ? AND content = ?', (other, dream, 'b'))
+    db.commit()
+    assert _counters(db, dream)[2] == 1
+    assert _counters(db, other)[2] == 1
+
+    db.execute('DELETE FROM comments WHERE dream_id IN (?, ?)', (dream, other))
+    db.commit()
+    assert _counters(db, dream)[2] == 0
+    assert _counters(db, other)[2] == 0
+
+
+def test_rebuild_matches_triggers(client, db, dream):
+    from models import rebuild_dream_counters
+
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    client.post('/api/comment', json={'dream_id': dream, 'content': 'oi'})
+    before = _counters(db, dream)
+    rebuild_dream_counters()
+    assert _counters(db, dream) == before == (1, 0, 1)
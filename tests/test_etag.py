@@ -0,0 +1,77 @@
+"""ETag/304 nas leituras JSON e nas páginas estáticas"""
+from conftest import sign_up
+
+
+def _get(client, url, etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    return client.get(url, headers=headers)
+
+
+def _etag(response):
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    return etag
+
+
+def test_dream_stats_revalidates(client, dream):
+    url = f'/api/dream-stats/{dream}'
+    response = _get(client, url)
+    etag = _etag(response)
+    assert response.get_json()['like_count'] == 0
+    assert 'private' in response.headers['Cache-Control']
+
+    cached = _get(client, url, etag)
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    changed = _get(client, url, etag)
+    assert _etag(changed) != etag
+    assert changed.get_json()['like_count'] == 1
+    assert changed.get_json()['is_liked'] is True
+
+
+def test_dream_stats_etag_is_per_user(app, client, dream):
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    etag = _etag(_get(client, f'/api/dream-stats/{dream}'))
+
+    other = app.test_client()
+    sign_up(other)
+    response = _get(other, f'/api/dream-stats/{dream}', etag)
+    assert _etag(response) != etag
+    assert response.get_json()['is_liked'] is False
+
+
+def test_dream_stats_missing_dream(client, user):
+    assert _get(client, '/api/dream-stats/999999').status_code == 404
+
+
+def test_dream_json_revalidates(client, dream):
+    url = f'/sonho/{dream}/json'
+    etag = _etag(_get(client, url))
+    assert _get(client, url, etag).status_code == 304
+
+    client.post('/api/comment', json={'dream_id': dream, 'content': 'Novo comentário'})
+    changed = _get(client, url, etag)
+    assert _etag(changed) != etag
+    assert changed.get_json()['dream']['comment_count'] == 1
+
+
+def test_comments_revalidate(client, dream):
+    url = f'/api/comments/{dream}'
+    etag = _etag(_get(client, url))
+    assert _get(client, url, etag).status_code == 304
+
+    client.post('/api/comment', json={'dream_id': dream, 'content': 'Outro'})
+    changed = _get(client, url, etag)
+    assert _etag(changed) != etag
+    assert [comment['content'] for comment in changed.get_json()['comments']] == ['Outro']
+
+
+def test_static_page_revalidates(client):
+    response = _get(client, '/about')
+    etag = _etag(response)
+    assert response.cache_control.public
+    assert _get(client, '/about', etag).status_code == 304
+    assert _get(client, '/about', 'outra-versao').status_code == 200
@@ -0,0 +1,73 @@
+"""Paginação do feed por cursor (created_at, id)"""
+import html
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from config import Config
+from conftest import post_dream
+from routes.main import _decode_cursor
+
+_CARD = re.compile(r'class="reveal dream-card" data-dream-id="(\d+)"')
+_PAGE_LINK = re.compile(r'href="(/feed\?[^"]*cursor=[^"]+)"')
+
+
+def _page(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    links = {}
+    for link in _PAGE_LINK.findall(body):
+        link = html.unescape(link)
+        token = parse_qs(urlsplit(link).query)['cursor'][0]
+        links[_decode_cursor(token)['d']] = link
+    return [int(dream_id) for dream_id in _CARD.findall(body)], links
+
+
+def _expected_order(db):
+    return [row[0] for row in db.execute('SELECT id FROM dreams ORDER BY created_at DESC, id DESC')]
+
+
+def test_cursor_walks_every_dream_once(client, db, user):
+    # Vários sonhos no mesmo segundo: o id desempata a ordem
+    for i in range(Config.FEED_PER_PAGE * 2 + 3):
+        post_dream(client, title=f'Sonho {i}')
+
+    seen, url, pages = [], '/feed', []
+    while url:
+        ids, links = _page(client, url)
+        pages.append(ids)
+        seen.extend(ids)
+        url = links.get('next')
+
+    assert seen == _expected_order(db)
+    assert all(len(ids) == Config.FEED_PER_PAGE for ids in pages[:-1])
+
+
+def test_prev_cursor_returns_previous_page(client, user):
+    for i in range(Config.FEED_PER_PAGE + 2):
+        post_dream(client, title=f'Sonho {i}')
+
+    first, links = _page(client, '/feed')
+    assert 'prev' not in links
+    second, links = _page(client, links['next'])
+    assert second and not set(second) & set(first)
+    back, _ = _page(client, links['prev'])
+    assert back == first
+
+
+def test_cursor_ignores_new_dreams(client, user):
+    for i in range(Config.FEED_PER_PAGE + 1):
+        post_dream(client, title=f'Sonho {i}')
+
+    first, links = _page(client, '/feed')
+    expected, _ = _page(client, links['next'])
+    # Um sonho novo no topo não desloca a página seguinte (ao contrário do OFFSET)
+    post_dream(client, title='Sonho novo')
+    second, _ = _page(client, links['next'])
+    assert second == expected
+
+
+def test_invalid_cursor_falls_back_to_first_page(client, user):
+    post_dream(client)
+    first, _ = _page(client, '/feed')
+    assert _page(client, '/feed?cursor=invalido')[0] == first
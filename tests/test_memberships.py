@@ -0,0 +1,55 @@
+"""Conjuntos de sonhos curtidos/favoritados por usuário"""
+import pickle
+
+from utils.memberships import MembershipSet, get_memberships, refresh_memberships
+
+
+def _memberships(app, user_id):
+    # Um contexto por leitura: a memória por requisição (g) não mascara o cache
+    with app.app_context():
+        memberships = get_memberships(user_id)
+        return set(memberships['likes']), set(memberships['favorites'])
+
+
+def test_membership_set_lookup_and_pickle():
+    ids = MembershipSet([42, 7, 7, 19])
+    assert list(ids) == [7, 19, 42]
+    assert 19 in ids and 20 not in ids
+    restored = pickle.loads(pickle.dumps(ids))
+    assert list(restored) == [7, 19, 42]
+    assert len(pickle.loads(pickle.dumps(MembershipSet()))) == 0
+
+
+def test_api_writes_refresh_the_sets(app, client, user, dream):
+    assert _memberships(app, user) == (set(), set())
+
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    client.post('/api/favorite', json={'dream_id': dream, 'favorite': True})
+    assert _memberships(app, user) == ({dream}, {dream})
+
+    client.post('/api/like', json={'dream_id': dream, 'like': False})
+    assert _memberships(app, user) == (set(), {dream})
+
+
+def test_batch_refreshes_the_sets(app, client, user, dream):
+    _memberships(app, user)
+    client.post('/api/batch', json={'operations': [{'op': 'like', 'dream_id': dream}]})
+    assert _memberships(app, user)[0] == {dream}
+
+
+def test_refresh_reloads_from_database(app, db, user, dream):
+    assert _memberships(app, user)[0] == set()
+    # Escrita feita por outro worker: o cache deste continua com o conjunto antigo
+    db.execute('INSERT INTO likes (user_id, dream_id) VALUES (?, ?)', (user, dream))
+    db.commit()
+    assert _memberships(app, user)[0] == set()
+
+    refresh_memberships(user)
+    assert _memberships(app, user)[0] == {dream}
+
+
+def test_feed_marks_liked_dreams(client, dream):
+    button = f'like-btn" data-dream-id="{dream}" data-liked='
+    assert button + '"false"' in client.get('/feed').get_data(as_text=True)
+    client.post('/api/like', json={'dream_id': dream, 'like': True})
+    assert button + '"true"' in client.get('/feed').get_data(as_text=True)
@@ -16,17 +16,32 @@ def setup_ssl():
     if os.getenv("SSL_VERIFY", "True").lower() == "false":
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def create_session_with_retry():
-    """Cria uma sessão HTTP com retry automático"""
+def create_session_with_retry(retries=3, backoff_factor=1, pool_maxsize=10, allowed_methods=None):
+    """
+    Cria uma sessão HTTP com retry automático e pool de conexões keep-alive.
+    
+    Args:
+        retries: Total de retentativas por requisição
+        backoff_factor: Fator de espera exponencial entre retentativas
+        pool_maxsize: Conexões mantidas abertas por host
+        allowed_methods: Métodos que podem ser repetidos (padrão do urllib3: os idempotentes)
+    """
     from requests import Session
     
     session = Session()
+    retry_options = {}
+    if allowed_methods is not None:
+        retry_options['allowed_methods'] = frozenset(allowed_methods)
     retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
+        total=retries,
+        backoff_factor=backoff_factor,
         status_forcelist=[429, 500, 502, 503, 504],
+        # Devolve a última resposta em vez de levantar RetryError: quem chama trata o status
+        raise_on_status=False,
+        **retry_options,
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize,
+                          max_retries=retry_strategy)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     
@@ -1,13 +1,17 @@
 """Utilidades de cache e performance"""
+import hashlib
 import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from datetime import datetime, timedelta
+from itertools import islice
 
-logger = logging.getLogger(__name__)
+from config import Config
+from utils.cache_backends import CLEAR_ALL, create_backend, dumps, loads
 
-# Cache em memória para reduzir queries ao banco
-_memory_cache = {}
-_cache_timestamps = {}
+logger = logging.getLogger(__name__)
 
 CACHE_DURATION = {
     'user': 3600,           # 1 hora
@@ -15,63 +19,527 @@ CACHE_DURATION = {
     'dream_list': 300,      # 5 minutos
     'stats': 900,           # 15 minutos
     'tags': 3600,           # 1 hora
+    'meaning': 86400,       # 24 horas (API externa)
+    'translation': 86400,   # 24 horas (API externa)
+    'email': 86400,         # 24 horas (API externa)
 }
 
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'size', 'tags')
+
+    def __init__(self, value, expires_at, size, tags):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+# Estimativa de tamanho: níveis percorridos e itens amostrados por contêiner
+_SIZE_DEPTH = 3
+_SIZE_SAMPLE = 8
+_SCALARS = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def _estimate_size(value, depth: int = _SIZE_DEPTH) -> int:
+    """
+    Estimativa barata do tamanho em bytes de um valor, sem serializá-lo.
+
+    Soma sys.getsizeof do objeto e dos seus itens/atributos até `depth` níveis;
+    contêineres grandes são extrapolados a partir de uma amostra. Quando o valor
+    já foi serializado para o L2, cache_set passa o tamanho exato do blob.
+    """
+    size = sys.getsizeof(value, 64)
+    if depth <= 0 or isinstance(value, _SCALARS):
+        return size
+    if isinstance(value, dict):
+        total = len(value)
+        sample = list(islice(value.items(), _SIZE_SAMPLE))
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        total = len(value)
+        sample = list(islice(value, _SIZE_SAMPLE))
+    else:
+        fields = getattr(value, '__dict__', None)
+        if fields is None:
+            slots = getattr(type(value), '__slots__', ())
+            slots = (slots,) if isinstance(slots, str) else slots
+            fields = {name: getattr(value, name, None) for name in slots}
+        total = len(fields)
+        sample = list(fields.values())
+    if not sample:
+        return size
+    children = sum(_estimate_size(item, depth - 1) for item in sample)
+    return size + children * total // len(sample)
+
+
+class CacheEngine:
+    """
+    Cache em memória com despejo LRU e expiração por TTL.
 
-def cache_result(cache_key_prefix: str, duration: int = 300):
+    Limitado por número de entradas e por bytes estimados; o TTL usa o relógio
+    monotônico. Cada entrada pode carregar tags de dependência (ex: 'dream:42'),
+    indexadas para que a invalidação custe O(entradas afetadas). Seguro para
+    servidores WSGI com threads.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._data = OrderedDict()
+        self._tags = {}  # tag -> set de chaves
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key, default=None):
+        """Retorna o valor em cache ou `default` se ausente/expirado"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry.value
+
+    def set(self, key, value, ttl: float, tags=(), size: int = None):
+        """Armazena um valor por `ttl` segundos, despejando as entradas menos usadas"""
+        if size is None:
+            size = _estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"Valor grande demais para o cache ({size} bytes): {key}")
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            tags = frozenset(tags)
+            self._data[key] = _Entry(value, time.monotonic() + ttl, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def delete(self, key) -> bool:
+        """Remove uma entrada. Retorna True se ela existia."""
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_tags(self, *tags) -> int:
+        """Remove todas as entradas marcadas com alguma das tags. Retorna quantas."""
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+            self._stats['invalidations'] += removed
+        return removed
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'total_entries': len(self._data),
+                'memory_usage_kb': round(self._bytes / 1024, 2),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'tags': len(self._tags),
+                **self._stats,
+            }
+
+
+# Cache em memória para reduzir queries ao banco (L1, por processo)
+_memory_cache = CacheEngine(
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    max_bytes=Config.CACHE_MAX_BYTES,
+)
+
+# Cache compartilhado entre os workers (L2); None quando desativado
+_shared_cache = create_backend(Config.CACHE_BACKEND, Config.CACHE_DIR)
+
+_sync_state = {'last_id': None, 'checked_at': float('-inf'), 'applied': 0}
+_sync_lock = threading.Lock()
+
+
+def _sync_invalidations():
+    """
+    Aplica ao L1 as invalidações feitas por outros workers.
+
+    O log é consultado no máximo a cada CACHE_SYNC_INTERVAL segundos, que é
+    também o tempo máximo que um worker serve uma entrada já invalidada.
+    """
+    if _shared_cache is None:
+        return
+    now = time.monotonic()
+    if now - _sync_state['checked_at'] < Config.CACHE_SYNC_INTERVAL:
+        return
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        _sync_state['checked_at'] = now
+        last_id, tags, complete = _shared_cache.invalidations_since(_sync_state['last_id'])
+        _sync_state['last_id'] = last_id
+        if not complete or CLEAR_ALL in tags:
+            _memory_cache.clear()
+        elif tags:
+            _memory_cache.invalidate_tags(*tags)
+        _sync_state['applied'] += len(tags)
+    finally:
+        _sync_lock.release()
+
+
+def cache_get(key, default=None):
+    """Busca no L1 e, se ausente, no cache compartilhado (promovendo ao L1)"""
+    _sync_invalidations()
+    value = _memory_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    if _shared_cache is None:
+        return default
+
+    found = _shared_cache.get(key)
+    if found is None:
+        return default
+    blob, expires_at, tags = found
+    try:
+        value = loads(blob)
+    except Exception as e:
+        logger.warning(f"Entrada ilegível no cache compartilhado {key}: {e}")
+        _shared_cache.delete(key)
+        return default
+    _memory_cache.set(key, value, expires_at - time.time(), tags=tags, size=len(blob))
+    return value
+
+
+def cache_set(key, value, ttl: float, tags=(), shared: bool = True):
+    """Grava no L1 e, se `shared`, no cache compartilhado"""
+    if _shared_cache is None or not shared:
+        _memory_cache.set(key, value, ttl, tags=tags)
+        return
+    try:
+        blob = dumps(value)
+    except Exception:
+        # Valor não serializável: fica apenas no processo
+        _memory_cache.set(key, value, ttl, tags=tags)
+        return
+    _memory_cache.set(key, value, ttl, tags=tags, size=len(blob))
+    _shared_cache.set(key, blob, time.time() + ttl, tags=tags)
+
+
+def make_cache_key(prefix: str, func, args, kwargs) -> str:
+    """Chave estável: prefixo legível + hash dos argumentos"""
+    raw = repr((args, sorted(kwargs.items()))).encode('utf-8', 'backslashreplace')
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    return f"{prefix}:{func.__module__}.{func.__qualname__}:{digest}"
+
+
+def _resolve_tags(prefix, tags, args, kwargs):
+    resolved = {prefix}
+    if callable(tags):
+        resolved.update(tags(*args, **kwargs))
+    elif tags:
+        resolved.update(tags)
+    return resolved
+
+
+class _Stamped:
+    """Valor com validade própria (stale-while-revalidate); o relógio é de parede
+    para que a validade continue correta quando a entrada vem do cache compartilhado"""
+    __slots__ = ('value', 'fresh_until')
+
+    def __init__(self, value, fresh_until):
+        self.value = value
+        self.fresh_until = fresh_until
+
+    def __getstate__(self):
+        return (self.value, self.fresh_until)
+
+    def __setstate__(self, state):
+        self.value, self.fresh_until = state
+
+
+class _Flight:
+    """Cálculo em andamento de uma chave; os demais chamadores esperam por ele"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+_result_stats = {
+    'hits': 0,
+    'misses': 0,
+    'stale_served': 0,
+    'coalesced_waits': 0,
+    'refreshes': 0,
+    'refresh_errors': 0,
+}
+
+
+def _count(name):
+    with _flights_lock:
+        _result_stats[name] += 1
+
+
+def _join_flight(key):
+    """Retorna (flight, líder?) — o primeiro chamador de uma chave vira o líder"""
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            return flight, False
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _lead(key, flight, compute):
+    try:
+        flight.value = compute()
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.event.set()
+    return flight.value
+
+
+def single_flight(key, compute):
+    """
+    Executa `compute` uma única vez por chave entre as threads concorrentes.
+
+    Quem chega enquanto o cálculo está em andamento espera e recebe o mesmo
+    valor (ou a mesma exceção) do primeiro chamador.
+    """
+    flight, leader = _join_flight(key)
+    if leader:
+        return _lead(key, flight, compute)
+
+    _count('coalesced_waits')
+    if not flight.event.wait(Config.CACHE_FLIGHT_TIMEOUT):
+        logger.warning(f"Tempo esgotado aguardando cálculo em andamento: {key}")
+        return compute()
+    if flight.error is not None:
+        raise flight.error
+    return flight.value
+
+
+def single_flight_many(keys: dict, compute) -> dict:
+    """
+    single_flight para um lote: `keys` é {item: chave}.
+
+    Os itens sem cálculo em andamento são calculados juntos, em uma única
+    chamada compute(itens) -> {item: valor}; os demais esperam o líder da
+    própria chave. Retorna {item: valor} (None onde o cálculo não trouxe valor).
+    """
+    led, joined = {}, {}
+    for item, key in keys.items():
+        flight, leader = _join_flight(key)
+        (led if leader else joined)[item] = flight
+
+    results = {}
+    if led:
+        try:
+            values = compute(list(led))
+            for item, flight in led.items():
+                flight.value = results[item] = values.get(item)
+        except BaseException as e:
+            for flight in led.values():
+                flight.error = e
+            raise
+        finally:
+            with _flights_lock:
+                for item in led:
+                    _flights.pop(keys[item], None)
+            for flight in led.values():
+                flight.event.set()
+
+    expired = []
+    for item, flight in joined.items():
+        _count('coalesced_waits')
+        if not flight.event.wait(Config.CACHE_FLIGHT_TIMEOUT):
+            logger.warning(f"Tempo esgotado aguardando cálculo em andamento: {keys[item]}")
+            expired.append(item)
+            continue
+        if flight.error is not None:
+            raise flight.error
+        results[item] = flight.value
+    if expired:
+        values = compute(expired)
+        results.update((item, values.get(item)) for item in expired)
+    return results
+
+
+def refresh_in_background(key, compute):
+    """
+    Recalcula uma entrada vencida sem bloquear quem está servindo o valor antigo.
+
+    Compartilha as chaves de single_flight: se a chave já está sendo
+    calculada, nada é disparado.
+    """
+    flight, leader = _join_flight(key)
+    if not leader:
+        return  # já existe um recálculo em andamento
+
+    def run():
+        _count('refreshes')
+        try:
+            _lead(key, flight, compute)
+        except Exception as e:
+            _count('refresh_errors')
+            logger.warning(f"Erro ao recalcular entrada de cache {key}: {e}")
+
+    threading.Thread(target=run, name='cache-refresh', daemon=True).start()
+
+
+def cache_result(cache_key_prefix: str, duration: int = 300, tags=None, shared: bool = True,
+                 stale_ttl: int = 0):
     """
     Decorador para cachear resultados de funções.
-    
+
+    Chamadas concorrentes para a mesma chave ausente são agrupadas (single-flight):
+    só uma executa a função, as outras aguardam o resultado dela.
+
     Args:
-        cache_key_prefix: Prefixo da chave de cache
+        cache_key_prefix: Prefixo da chave de cache (também usado como tag)
         duration: Duração em segundos
+        tags: Tags de dependência da entrada: lista fixa ou callable que recebe
+              os mesmos argumentos da função (ex: lambda dream_id: [f'dream:{dream_id}'])
+        shared: Se False, o resultado fica só no cache do processo (L1)
+        stale_ttl: Segundos, após `duration`, em que o valor vencido ainda é servido
+                   enquanto um único recálculo roda em segundo plano
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Cria chave de cache única
-            cache_key = f"{cache_key_prefix}:{func.__name__}:{str(args)}:{str(kwargs)}"
-            
-            # Verifica se existe no cache e se ainda é válido
-            if cache_key in _memory_cache:
-                timestamp = _cache_timestamps.get(cache_key)
-                if timestamp and (datetime.now() - timestamp).total_seconds() < duration:
+            cache_key = make_cache_key(cache_key_prefix, func, args, kwargs)
+
+            def compute():
+                # Outro líder pode ter gravado a entrada entre o miss e o single-flight
+                cached = cache_get(cache_key, _MISSING)
+                if cached is not _MISSING and (
+                        not isinstance(cached, _Stamped) or cached.fresh_until > time.time()):
+                    return cached.value if isinstance(cached, _Stamped) else cached
+
+                result = func(*args, **kwargs)
+                entry_tags = _resolve_tags(cache_key_prefix, tags, args, kwargs)
+                if stale_ttl:
+                    stored = _Stamped(result, time.time() + duration)
+                    cache_set(cache_key, stored, duration + stale_ttl, tags=entry_tags, shared=shared)
+                else:
+                    cache_set(cache_key, result, duration, tags=entry_tags, shared=shared)
+                return result
+
+            cached = cache_get(cache_key, _MISSING)
+            if cached is not _MISSING:
+                if not isinstance(cached, _Stamped):
+                    _count('hits')
                     logger.debug(f"Cache hit: {cache_key}")
-                    return _memory_cache[cache_key]
-            
-            # Executa função
-            result = func(*args, **kwargs)
-            
-            # Armazena em cache
-            _memory_cache[cache_key] = result
-            _cache_timestamps[cache_key] = datetime.now()
-            
-            return result
-        
+                    return cached
+                if cached.fresh_until > time.time():
+                    _count('hits')
+                    return cached.value
+                _count('stale_served')
+                refresh_in_background(cache_key, compute)
+                return cached.value
+
+            _count('misses')
+            return single_flight(cache_key, compute)
+
         return wrapper
     return decorator
 
 
-def clear_cache(pattern: str = None):
-    """Limpa cache em memória"""
-    global _memory_cache, _cache_timestamps
-    
-    if pattern:
-        keys_to_delete = [k for k in _memory_cache.keys() if pattern in k]
-        for key in keys_to_delete:
-            del _memory_cache[key]
-            if key in _cache_timestamps:
-                del _cache_timestamps[key]
-        logger.info(f"Cache limpo: {len(keys_to_delete)} entradas removidas")
+def invalidate(*tags):
+    """
+    Evento de invalidação: remove as entradas que dependem de alguma das tags.
+
+    Tags usadas pelas rotas: 'dream:{id}', 'user:{id}' e 'feed'. O evento
+    também vai para o cache compartilhado, de onde os outros workers o aplicam.
+    """
+    removed = _memory_cache.invalidate_tags(*tags)
+    if _shared_cache is not None:
+        removed += _shared_cache.invalidate_tags(*tags)
+    if removed:
+        logger.debug(f"Cache invalidado {tags}: {removed} entradas removidas")
+    return removed
+
+
+def invalidate_dream(dream_id, user_id=None, feed=True):
+    """Invalida o que depende de um sonho (e opcionalmente do autor e do feed)"""
+    tags = [f'dream:{dream_id}']
+    if user_id is not None:
+        tags.append(f'user:{user_id}')
+    if feed:
+        tags.append('feed')
+    return invalidate(*tags)
+
+
+def clear_cache(tag: str = None):
+    """Limpa o cache (inteiro ou apenas as entradas de uma tag/prefixo)"""
+    if tag:
+        removed = invalidate(tag)
+        logger.info(f"Cache limpo: {removed} entradas removidas")
     else:
         _memory_cache.clear()
-        _cache_timestamps.clear()
+        if _shared_cache is not None:
+            _shared_cache.clear()
         logger.info("Cache completamente limpo")
 
 
 def get_cache_stats():
-    """Retorna estatísticas do cache"""
-    return {
-        'total_entries': len(_memory_cache),
-        'memory_usage_kb': sum(len(str(v)) for v in _memory_cache.values()) / 1024
-    }
+    """Retorna estatísticas do cache (L1 do processo e compartilhado)"""
+    stats = _memory_cache.stats()
+    stats['shared'] = _shared_cache.stats() if _shared_cache is not None else None
+    stats['invalidations_synced'] = _sync_state['applied']
+    with _flights_lock:
+        stats['results'] = dict(_result_stats, in_flight=len(_flights))
+    return stats
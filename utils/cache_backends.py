@@ -0,0 +1,323 @@
+"""Backends de cache compartilhados entre processos
+
+O cache em memória (utils.cache.CacheEngine) é por processo: com vários
+workers do gunicorn cada um buscaria e guardaria as mesmas respostas. Um
+backend compartilhado fica atrás dele como segundo nível (L2), e as
+invalidações são gravadas em um log que cada worker lê para limpar o seu L1.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tag especial registrada no log de invalidações quando o cache inteiro é limpo
+CLEAR_ALL = '*'
+
+_TAG_SEP = '\x1f'
+
+
+class CacheBackend:
+    """
+    Interface de um backend de cache compartilhado.
+
+    Os valores trafegam já serializados (bytes); `expires_at` é um timestamp
+    de relógio de parede (time.time()), comparável entre processos.
+    """
+
+    name = 'base'
+
+    def get(self, key):
+        """Retorna (blob, expires_at, tags) ou None se ausente/expirado"""
+        raise NotImplementedError
+
+    def set(self, key, blob: bytes, expires_at: float, tags=()):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags) -> int:
+        """Remove as entradas das tags e registra o evento para os outros workers"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def invalidations_since(self, last_id):
+        """
+        Eventos de invalidação posteriores a `last_id`.
+
+        Returns:
+            (novo_last_id, tags, completo) — `completo` é False quando parte do
+            log já foi descartada e o chamador deve limpar o L1 inteiro.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache compartilhado em um arquivo SQLite (WAL) dentro de CACHE_DIR.
+
+    Os valores são desserializados com pickle, portanto o arquivo é tão
+    confiável quanto o diretório: ele é criado só para o usuário da aplicação
+    (0700) e nunca deve ficar em um caminho gravável por terceiros.
+
+    Cada thread usa sua própria conexão; após um fork as conexões herdadas
+    são abandonadas. Erros do SQLite nunca sobem: o cache se comporta como
+    um miss e a aplicação segue consultando a origem.
+    """
+
+    name = 'sqlite'
+
+    # Manutenção (expiradas e log antigo) a cada N escritas
+    _PURGE_EVERY = 500
+    # Por quanto tempo os eventos de invalidação ficam no log
+    _LOG_RETENTION = 3600
+
+    def __init__(self, directory: str, filename: str = 'shared_cache.db'):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(directory, filename)
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'errors': 0,
+        }
+        self._init_schema(self._conn())
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            # É um cache: perder as últimas escritas numa queda de energia é aceitável
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._conn())
+
+    @staticmethod
+    def _init_schema(conn):
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                tags TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(expires_at);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cache_invalidations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tag TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        ''')
+
+    def _fail(self, action, error):
+        self._stats['errors'] += 1
+        logger.warning(f"Cache compartilhado indisponível ({action}): {error}")
+
+    def get(self, key):
+        try:
+            row = self._conn().execute(
+                'SELECT value, expires_at, tags FROM cache_entries WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._fail('get', e)
+            return None
+
+        if row is None or row[1] <= time.time():
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits'] += 1
+        tags = row[2].split(_TAG_SEP) if row[2] else []
+        return row[0], row[1], tags
+
+    def set(self, key, blob, expires_at, tags=()):
+        tags = sorted(set(tags))
+        try:
+            with self._transaction() as conn:
+                self._delete_keys(conn, [key])
+                conn.execute(
+                    'INSERT INTO cache_entries (key, value, expires_at, tags) VALUES (?, ?, ?, ?)',
+                    (key, blob, expires_at, _TAG_SEP.join(tags))
+                )
+                conn.executemany('INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)',
+                                 [(tag, key) for tag in tags])
+        except sqlite3.Error as e:
+            self._fail('set', e)
+            return
+
+        self._stats['sets'] += 1
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            self.purge()
+
+    @staticmethod
+    def _tags_of(conn, key):
+        row = conn.execute('SELECT tags FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        return row[0].split(_TAG_SEP) if row and row[0] else []
+
+    def delete(self, key):
+        try:
+            with self._transaction() as conn:
+                self._delete_keys(conn, [key])
+        except sqlite3.Error as e:
+            self._fail('delete', e)
+
+    def _delete_keys(self, conn, keys):
+        for key in keys:
+            for tag in self._tags_of(conn, key):
+                conn.execute('DELETE FROM cache_tags WHERE tag = ? AND key = ?', (tag, key))
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def invalidate_tags(self, *tags):
+        removed = 0
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                for tag in tags:
+                    keys = [row[0] for row in conn.execute(
+                        'SELECT key FROM cache_tags WHERE tag = ?', (tag,)
+                    )]
+                    self._delete_keys(conn, keys)
+                    removed += len(keys)
+                conn.executemany('INSERT INTO cache_invalidations (tag, created_at) VALUES (?, ?)',
+                                 [(tag, now) for tag in tags])
+        except sqlite3.Error as e:
+            self._fail('invalidate', e)
+        return removed
+
+    def clear(self):
+        try:
+            with self._transaction() as conn:
+                conn.execute('DELETE FROM cache_entries')
+                conn.execute('DELETE FROM cache_tags')
+                conn.execute('INSERT INTO cache_invalidations (tag, created_at) VALUES (?, ?)',
+                             (CLEAR_ALL, time.time()))
+        except sqlite3.Error as e:
+            self._fail('clear', e)
+
+    def invalidations_since(self, last_id):
+        try:
+            conn = self._conn()
+            if last_id is None:
+                # Primeiro acesso do processo: começa do fim do log
+                row = conn.execute('SELECT MAX(id) FROM cache_invalidations').fetchone()
+                return row[0] or 0, [], True
+            rows = conn.execute(
+                'SELECT id, tag FROM cache_invalidations WHERE id > ? ORDER BY id', (last_id,)
+            ).fetchall()
+            if not rows:
+                return last_id, [], True
+            # Os ids são sequenciais: um salto significa que parte do log foi podada
+            complete = rows[0][0] == last_id + 1
+            return rows[-1][0], [tag for _, tag in rows], complete
+        except sqlite3.Error as e:
+            self._fail('sync', e)
+            return last_id, [], True
+
+    def purge(self):
+        """Remove entradas expiradas e eventos de invalidação antigos"""
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                expired = [row[0] for row in conn.execute(
+                    'SELECT key FROM cache_entries WHERE expires_at <= ?', (now,)
+                )]
+                self._delete_keys(conn, expired)
+                # Mantém sempre o evento mais recente, para que um processo novo
+                # (que começa do MAX(id)) não veja um salto falso
+                conn.execute('''
+                    DELETE FROM cache_invalidations
+                    WHERE created_at < ? AND id < (SELECT MAX(id) FROM cache_invalidations)
+                ''', (now - self._LOG_RETENTION,))
+        except sqlite3.Error as e:
+            self._fail('purge', e)
+
+    def stats(self) -> dict:
+        try:
+            conn = self._conn()
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries'
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'total_entries': entries,
+            'memory_usage_kb': round(size / 1024, 2) if size is not None else None,
+            **self._stats,
+        }
+
+
+class _Transaction:
+    """Agrupa as instruções de um bloco `with` em uma transação IMMEDIATE"""
+
+    __slots__ = ('conn',)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+
+_BACKENDS = {
+    'sqlite': SQLiteCacheBackend,
+}
+
+
+def register_backend(name: str, backend_class):
+    """Registra uma implementação de CacheBackend selecionável por CACHE_BACKEND"""
+    _BACKENDS[name] = backend_class
+
+
+def create_backend(name: str, directory: str):
+    """Instancia o backend configurado; None para cache apenas em memória"""
+    if not name or name == 'memory':
+        return None
+    backend_class = _BACKENDS.get(name)
+    if backend_class is None:
+        logger.warning(f"Backend de cache desconhecido '{name}'; usando apenas memória")
+        return None
+    try:
+        return backend_class(directory)
+    except Exception as e:
+        logger.warning(f"Não foi possível iniciar o cache compartilhado ({name}): {e}")
+        return None
+
+
+def dumps(value) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(blob: bytes):
+    return pickle.loads(blob)
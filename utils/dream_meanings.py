@@ -4,56 +4,89 @@ Se a chave `RAPIDAPI_KEY` não estiver configurada, o módulo usa o dicionário
 fallback.
 """
 import logging
-import requests
 import json
-import re
+import os
+import threading
+import time
 import unicodedata
-from functools import lru_cache
-from models import get_db
+from collections import ChainMap, Counter, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from models import get_db, run_write
+from utils.http import UpstreamUnavailable, get_upstream
+from utils.keywords import extract_keywords
+from utils.symbols import get_symbol_dictionary
 from config import Config
-
-# Tentamos usar rapidfuzz para fuzzy matching quando disponível
-try:
-    from rapidfuzz import process as rf_process, fuzz as rf_fuzz
-    _HAS_RAPIDFUZZ = True
-except Exception:
-    _HAS_RAPIDFUZZ = False
+from utils.cache import CACHE_DURATION, CacheEngine, refresh_in_background, single_flight
 
 logger = logging.getLogger(__name__)
 
-# Base de dados local de significados (para fallback rápido)
-DREAM_MEANINGS_LOCAL = {
-    'voar': 'Sonhar que está voando geralmente representa liberdade, ambição e desejo de escapar das limitações. Pode indicar elevação espiritual ou fuga de problemas.',
-    'cair': 'Queda em sonhos simboliza perda de controle, insegurança ou ansiedade. Pode representar medo de fracasso ou sensação de vulnerabilidade.',
-    'morte': 'Morte em sonhos não é literal. Representa transformação, fim de um ciclo, mudança ou transição importante na vida.',
-    'água': 'Água em sonhos representa emoções, inconsistência e fluidez. Água calma = paz, turbulenta = emoções instáveis.',
-    'casa': 'Casa representa o eu interior, segurança e lar. Explorar uma casa = autodescoberta. Casa abandonada = partes de si desconectadas.',
-    'perseguição': 'Ser perseguido em sonhos indica fuga de conflitos ou emoções reprimidas. Medo de enfrentar algo na vida real.',
-    'sexo': 'Sonhos sexuais não são literais. Podem representar conexão, energia criativa, poder ou desejo de intimidade emocional.',
-    'morte de alguém': 'Morte de outro em sonhos não prediz morte real. Representa mudança naquela relação ou fim de um padrão.',
-    'dente caindo': 'Queda de dentes é associada a ansiedade, transição de vida ou perda. Também pode indicar mudanças positivas.',
-    'animais': 'Animais em sonhos representam instintos e características. Cachorro = lealdade, gato = independência, serpente = transformação.',
-    'sangue': 'Sangue pode representar energia vital, traição, culpa ou paixão. Contexto determina significado exato.',
-    'fogo': 'Fogo representa transformação, paixão e destruição/renovação. Pode indicar raiva reprimida ou energia criativa.',
-    'dinheiro': 'Dinheiro em sonhos = valor pessoal, poder ou segurança. Encontrar dinheiro = descoberta, perder = insegurança.',
-    'comida': 'Comida representa nutrição emocional, desejo ou necessidade. Tipo de comida pode revelar o que você precisa emocionalmente.',
-    'escola': 'Escola representa aprendizado, avaliação ou ansiedade. Pode indicar foco em desenvolvimento pessoal ou medo de julgamento.',
-    'amigo': 'Amigos em sonhos representam partes de si ou relações. Ação do amigo no sonho é importante para interpretação.',
-    'inimigo': 'Inimigos em sonhos frequentemente representam aspectos rejeitados de si mesmo, não a pessoa real.',
-    'viagem': 'Viagem simboliza jornada de vida, mudança ou busca por algo. Destino e modo de transporte têm significado.',
-    'família': 'Membros da família em sonhos representam papéis familiares e dinâmicas. Também podem representar partes de si.',
-}
+# Idiomas em que os significados são oferecidos (o primeiro é o padrão)
+MEANING_LANGUAGES = ('pt', 'en', 'es', 'fr', 'de')
+
+
+@dataclass(frozen=True, slots=True)
+class MeaningRecord:
+    """
+    Resultado de uma busca de significado, guardado no cache em memória.
+
+    É imutável e compartilhado entre todas as requisições; quem precisa anotar
+    o resultado usa view(), que não copia nem altera o registro.
+    """
+    word: str
+    meaning: str
+    source: str
+    language: str
+    fetched_at: float = 0.0     # time.time() da busca
+    latency_ms: float = 0.0     # duração da busca (0 para acertos da tabela)
+    expires_at: float = 0.0     # time.time() em que vence (depois é servido enquanto recalcula)
+    fields: Mapping = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'fields', MappingProxyType({
+            'word': self.word,
+            'meaning': self.meaning,
+            'source': self.source,
+            'language': self.language,
+        }))
+
+    def view(self, **annotations) -> ChainMap:
+        """Visão do resultado como mapeamento; escritas ficam só na visão"""
+        return ChainMap(annotations, self.fields)
+
 
-@lru_cache(maxsize=200)
-def get_dream_meaning(dream_word: str, lang: str = 'pt') -> dict:
+# Cache em memória de MeaningRecord por (palavra normalizada, idioma)
+_meaning_records = CacheEngine(max_entries=Config.MEANING_MEMORY_ENTRIES)
+
+# Por quanto tempo um resultado não persistido (API fora do ar) fica em memória
+_RETRY_AFTER = 60
+
+# Por quanto tempo, depois de vencido, um registro ainda é servido enquanto
+# um único recálculo roda em segundo plano (stale-while-revalidate)
+_STALE_TTL = CACHE_DURATION['meaning']
+
+# Busca resolvida e ainda não traduzida (ver _resolve_meaning)
+_Resolved = namedtuple('_Resolved', 'result persist_ttl cache_ttl latency_ms')
+
+
+def get_dream_meaning(dream_word: str, lang: str = 'pt') -> Mapping:
     """
-    Busca significado de um sonho usando cache local primeiro, depois API.
+    Busca significado de um sonho: cache em memória, tabela dream_meanings_cache,
+    depois API e dicionário local.
+    
+    Buscas simultâneas da mesma palavra são agrupadas (single-flight): só uma
+    consulta a tabela e a API, traduz e grava; as demais recebem o registro
+    pronto. Um registro vencido em memória ainda é servido
+    enquanto um único recálculo roda em segundo plano.
     
     Args:
         dream_word: Palavra/tema do sonho (ex: 'voar', 'água')
         lang: Idioma (pt, en, es)
     
     Returns:
+        Visão (somente o próprio chamador vê o que escrever nela) de
         {
             'word': str,
             'meaning': str,
@@ -62,84 +95,226 @@ def get_dream_meaning(dream_word: str, lang: str = 'pt') -> dict:
         }
     """
     dream_word = dream_word.lower().strip()
-    norm_word = _normalize_text(dream_word)
     
     if not dream_word:
         return {'word': '', 'meaning': 'Palavra inválida', 'source': 'error', 'language': lang}
     
-    # Preferir a API externa quando a chave estiver configurada
+    record = _memory_record(dream_word, lang)
+    if record is None:
+        record = single_flight(
+            _flight_key(_normalize_text(dream_word), lang),
+            lambda: _compute_record(dream_word, lang),
+        )
+    return record.view()
+
+
+def _flight_key(norm_word: str, lang: str) -> str:
+    return f'meaning:{lang}:{norm_word}'
+
+
+def _memory_record(dream_word: str, lang: str):
+    """
+    Registro em memória da palavra, ou None. Se estiver vencido, é devolvido
+    assim mesmo e um único recálculo é disparado em segundo plano.
+    """
+    norm_word = _normalize_text(dream_word)
+    record = _meaning_records.get((norm_word, lang))
+    if record is not None and record.expires_at <= time.time():
+        refresh_in_background(_flight_key(norm_word, lang), lambda: _compute_record(dream_word, lang))
+    return record
+
+
+_UNREAD = object()
+
+
+def _compute_record(dream_word: str, lang: str, cached=_UNREAD, english: str = None) -> MeaningRecord:
+    """
+    Busca completa de uma palavra, executada dentro do single-flight: resolve,
+    traduz, persiste e guarda o registro em memória.
+
+    Args:
+        cached: Linha de dream_meanings_cache já lida (ou None); lida aqui se omitida
+        english: Palavra já traduzida para o inglês (consulta à API), se houver
+    """
+    if cached is _UNREAD:
+        cached = _load_meaning_cache(_normalize_text(dream_word), lang)
+    resolved = _resolve_meaning(dream_word, lang, cached, english)
+    return _complete_meanings([dream_word], [resolved], lang)[0]
+
+
+def _resolve_meaning(dream_word: str, lang: str, cached, english: str = None) -> _Resolved:
+    """
+    Resolve o significado sem traduzir (roda nas threads de busca concorrente).
+    
+    Args:
+        dream_word: Palavra já em minúsculas
+        lang: Idioma pedido
+        cached: Linha de dream_meanings_cache da palavra, ou None
+        english: Palavra já traduzida para o inglês (consulta à API), se houver
+    
+    Returns:
+        _Resolved — o resultado pode estar em outro idioma ('language');
+        persist_ttl é None quando não há nada a persistir (veio da tabela ou a
+        API falhou) e cache_ttl é quanto o resultado fica em memória
+    """
+    if cached is not None and cached['fresh']:
+        _count_meaning('negative_hits' if cached['meaning'] is None else 'hits')
+        return _Resolved(_meaning_from_row(dream_word, lang, cached), None, cached['remaining'], 0.0)
+    _count_meaning('expired' if cached is not None else 'misses')
+    
+    start = time.perf_counter()
+    result, ttl = _lookup_meaning(dream_word, lang, english)
+    latency_ms = (time.perf_counter() - start) * 1000
+    if ttl is None and cached is not None:
+        # A API falhou agora: a entrada vencida é melhor que o fallback local
+        return _Resolved(_meaning_from_row(dream_word, lang, cached), None, _RETRY_AFTER, latency_ms)
+    return _Resolved(result, ttl, ttl or _RETRY_AFTER, latency_ms)
+
+
+def _complete_meanings(words: list, resolved: list, lang: str) -> list:
+    """
+    Traduz em lote os significados que vieram em outro idioma, persiste os
+    resultados novos e os guarda no cache em memória.
+
+    Returns:
+        MeaningRecord na ordem de `words`
+    """
+    results = _localize([item.result for item in resolved], lang)
+    now = time.time()
+    records = []
+    for word, result, item in zip(words, results, resolved):
+        if item.persist_ttl:
+            save_dream_meaning_cache(
+                word,
+                None if result['source'] == 'fallback' else result['meaning'],
+                lang,
+                source=result['source'],
+                ttl=item.persist_ttl,
+            )
+        record = MeaningRecord(
+            word=result['word'],
+            meaning=result['meaning'],
+            source=result['source'],
+            language=result['language'],
+            fetched_at=now,
+            latency_ms=round(item.latency_ms, 2),
+            expires_at=now + item.cache_ttl,
+        )
+        _meaning_records.set(
+            (_normalize_text(word), lang), record, item.cache_ttl + _STALE_TTL,
+            size=len(record.meaning) + len(record.word) + 256,
+        )
+        records.append(record)
+    return records
+
+
+def _localize(results: list, lang: str) -> list:
+    """Traduz para `lang` os significados em outro idioma: uma chamada por idioma de origem"""
+    from utils.translator import translate_many
+    
+    by_language = {}
+    for index, result in enumerate(results):
+        if result.get('language', lang) != lang:
+            by_language.setdefault(result['language'], []).append(index)
+    
+    results = list(results)
+    for source_language, indexes in by_language.items():
+        try:
+            translated = translate_many([results[i]['meaning'] for i in indexes], lang, source_language)
+        except Exception as e:
+            logger.warning(f"Falha ao traduzir significados ({source_language}->{lang}): {e}")
+            translated = [results[i]['meaning'] for i in indexes]
+        for i, meaning in zip(indexes, translated):
+            results[i] = dict(results[i], meaning=meaning or results[i]['meaning'], language=lang)
+    return results
+
+
+def _english_symbols(words: list, lang: str) -> dict:
+    """Palavras em inglês para a RapidAPI (que espera 'Snake'), traduzidas em um único lote"""
+    if not Config.RAPIDAPI_KEY or lang == 'en' or not words or not get_upstream('rapidapi').available():
+        return {}
+    from utils.translator import translate_many
+    
     try:
-        if Config.RAPIDAPI_KEY:
-            api_result = _fetch_from_dream_api(dream_word, lang)
-            if api_result:
-                return api_result
+        return dict(zip(words, translate_many(words, 'en', lang)))
     except Exception as e:
-        logger.warning(f"Falha ao consultar RapidAPI: {e}")
-
-    # Tenta obter do cache local (fallback)
-    # 1) Checagem direta em keys locais
-    for key in DREAM_MEANINGS_LOCAL.keys():
-        if key == dream_word or key == norm_word:
-            meaning = DREAM_MEANINGS_LOCAL[key]
-            source = 'local'
-            break
-    else:
-        meaning = None
-        source = None
-
-    # 2) Substring / containment (ex: 'morte de alguém' vs 'morte')
-    if not meaning:
-        for key in DREAM_MEANINGS_LOCAL.keys():
-            if key in dream_word or dream_word in key:
-                meaning = DREAM_MEANINGS_LOCAL[key]
-                source = 'local_substring'
-                break
+        logger.warning(f"Falha ao traduzir palavras para a RapidAPI: {e}")
+        return {}
+
+
+def _resolve_pending(dream_word: str, lang: str, cached, english_future) -> MeaningRecord:
+    """
+    _compute_record após a tradução em lote das palavras para a API (nas
+    threads de busca), com single-flight por palavra entre as requisições
+    """
+    english = english_future.result() if english_future is not None else {}
+    return single_flight(
+        _flight_key(_normalize_text(dream_word), lang),
+        lambda: _compute_record(dream_word, lang, cached, english.get(dream_word)),
+    )
+
+
+def _lookup_meaning(dream_word: str, lang: str, english: str = None):
+    """
+    Resolve o significado na API externa e no dicionário local.
 
-    # 3) Fuzzy match usando rapidfuzz (se disponível)
-    if not meaning and _HAS_RAPIDFUZZ:
+    Returns:
+        (resultado, ttl) — o resultado vem no idioma da fonte ('language'); ttl
+        é o tempo de validade para a tabela de cache ou None quando o resultado
+        não deve ser persistido (falha transitória da API)
+    """
+    # Sem resposta da API o resultado local/negativo vale por menos tempo
+    ttl = Config.MEANING_NEGATIVE_TTL
+    
+    # Preferir a API externa quando a chave estiver configurada
+    if Config.RAPIDAPI_KEY:
+        _count_meaning('api_calls')
         try:
-            choices = list(DREAM_MEANINGS_LOCAL.keys())
-            # procuramos o melhor candidato entre as chaves locais
-            match = rf_process.extractOne(dream_word, choices, scorer=rf_fuzz.token_sort_ratio)
-            if match and match[1] >= 65:  # threshold razoável
-                best = match[0]
-                meaning = DREAM_MEANINGS_LOCAL.get(best)
-                source = 'local_fuzzy'
-        except Exception:
-            meaning = None
-            source = None
-
-    # 4) Fallback: busca por tokens individuais
+            api_result = _fetch_from_dream_api(dream_word, lang, english)
+        except Exception as e:
+            logger.warning(f"Falha ao consultar RapidAPI: {e}")
+            api_result = None
+        if api_result:
+            return api_result, Config.MEANING_CACHE_TTL
+        if api_result is None:
+            ttl = None
+
+    # Dicionário local de símbolos (fallback)
+    symbols = get_symbol_dictionary()
+    source = 'local'
+    # 1) Checagem direta pelo índice de chaves normalizadas
+    meaning, meaning_lang = symbols.get(dream_word, lang)
+
+    # 2) Símbolos contidos no texto (ex: 'morte de alguém' -> 'morte'), ou
+    #    símbolos maiores que contêm a palavra (ex: 'dente' -> 'dente caindo')
     if not meaning:
-        tokens = [t for t in re.findall(r"\w+", norm_word) if len(t) > 2]
-        for t in tokens:
-            if t in DREAM_MEANINGS_LOCAL:
-                meaning = DREAM_MEANINGS_LOCAL[t]
-                source = 'local_token'
-                break
+        matches = symbols.find_symbols(dream_word, lang) or symbols.containing(dream_word, lang)
+        if matches:
+            meaning, meaning_lang = symbols.get(max(matches, key=len), lang)
+            source = 'local_substring'
 
-    if meaning:
-        # Traduz se necessário
-        final_meaning = meaning
-        if lang != 'pt':
-            try:
-                from utils.translator import translate_text
-                translated = translate_text(meaning, lang, 'pt')
-                if translated:
-                    final_meaning = translated
-            except Exception:
-                pass
+    # 3) Busca aproximada pelo índice de trigramas
+    if not meaning:
+        best, _ = symbols.fuzzy(dream_word, lang)
+        if best:
+            meaning, meaning_lang = symbols.get(best, lang)
+            source = 'local_fuzzy'
 
+    if meaning:
+        # A tradução (se necessária) é feita por _complete_meanings
         result = {
             'word': dream_word,
-            'meaning': final_meaning,
-            'source': source or 'local',
-            'language': lang
+            'meaning': meaning,
+            'source': source,
+            'language': meaning_lang
         }
-        # se tivermos score (fuzzy), inclua opcionalmente
-        return result
+        return result, ttl
 
     # Fallback genérico
+    return _not_found(dream_word, lang), ttl
+
+
+def _not_found(dream_word: str, lang: str) -> dict:
     return {
         'word': dream_word,
         'meaning': f'Significado de "{dream_word}" não encontrado. Tente outras palavras-chave relacionadas ao seu sonho.',
@@ -161,33 +336,36 @@ def _normalize_text(text: str) -> str:
     return text
 
 
-def _fetch_from_dream_api(word: str, lang: str) -> dict:
+def _fetch_from_dream_api(word: str, lang: str, english: str = None) -> dict:
     """
     Busca significado de uma API externa (implementação de fallback).
     Usa APIs gratuitas disponíveis.
+
+    Retorna o significado (em inglês, como a API responde), False se a API não
+    conhece a palavra ou None em caso de falha (que não deve ser cacheada).
     """
     try:
         rapid_key = Config.RAPIDAPI_KEY
         rapid_host = Config.RAPIDAPI_HOST or 'ai-dream-interpretation-dream-dictionary-dream-analysis.p.rapidapi.com'
         if not rapid_key:
             return None
+        rapidapi = get_upstream('rapidapi')
+        if not rapidapi.available():
+            # Circuito aberto: cai direto no dicionário local, sem traduzir nem esperar
+            return None
 
         url = f"https://{rapid_host}/dreamDictionary?noqueue=1"
         # Alguns serviços esperam um 'symbol' em inglês (ex: 'Snake').
-        # Se o idioma solicitado não for inglês, tentamos traduzir a palavra-chave
-        # para inglês antes de consultar a API, e então traduzimos a resposta
-        # de volta para o idioma desejado.
-        symbol_to_send = word
-        try:
-            if lang != 'en':
+        # A busca concorrente já traduz todas as palavras em lote; numa busca
+        # avulsa a palavra é traduzida aqui.
+        symbol_to_send = english or word
+        if not english and lang != 'en':
+            try:
                 from utils.translator import translate_text
-                # traduz de lang -> en
-                symbol_translated = translate_text(word, 'en', lang)
-                if symbol_translated:
-                    symbol_to_send = symbol_translated
-        except Exception:
-            # se tradução falhar, continua com a palavra original
-            symbol_to_send = word
+                symbol_to_send = translate_text(word, 'en', lang) or word
+            except Exception:
+                # se tradução falhar, continua com a palavra original
+                symbol_to_send = word
 
         payload = {"symbol": symbol_to_send.title(), "language": 'en'}
         headers = {
@@ -196,7 +374,14 @@ def _fetch_from_dream_api(word: str, lang: str) -> dict:
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(url, json=payload, headers=headers, timeout=8, verify=Config.SSL_VERIFY)
+        try:
+            response = rapidapi.post(url, json=payload, headers=headers, verify=Config.SSL_VERIFY)
+        except UpstreamUnavailable as e:
+            logger.warning(f"RapidAPI indisponível ({e}); pulando '{word}'")
+            return None
+        if response.status_code == 404:
+            # A API não conhece o símbolo: resultado negativo (pode ser cacheado)
+            return False
         if response.status_code not in (200, 201):
             logger.warning(f"RapidAPI returned status {response.status_code}: {response.text}")
             return None
@@ -209,9 +394,12 @@ def _fetch_from_dream_api(word: str, lang: str) -> dict:
                 'word': word,
                 'meaning': response.text,
                 'source': 'rapidapi',
-                'language': lang
+                'language': 'en'
             }
 
+        if not data:
+            return False
+
         # Tentativa robusta de extrair o campo de interpretação
         meaning_text = None
         # Possíveis chaves conhecidas
@@ -249,46 +437,322 @@ def _fetch_from_dream_api(word: str, lang: str) -> dict:
             # fallback para a representação JSON
             meaning_text = json.dumps(data, ensure_ascii=False)
 
-        # Se o usuário pediu outro idioma, traduzimos o texto de volta
-        final_meaning = meaning_text
-        try:
-            if lang != 'en':
-                from utils.translator import translate_text
-                translated_back = translate_text(meaning_text, lang, 'en')
-                if translated_back:
-                    final_meaning = translated_back
-        except Exception:
-            pass
-
+        # A tradução de volta para o idioma pedido é feita por _complete_meanings
         return {
             'word': word,
-            'meaning': final_meaning,
+            'meaning': meaning_text,
             'source': 'rapidapi',
-            'language': lang
+            'language': 'en'
         }
     except Exception as e:
         logger.error(f"Erro ao chamar RapidAPI: {e}")
         return None
 
 
-def save_dream_meaning_cache(dream_id: int, word: str, meaning: str, language: str = 'pt'):
+# Contadores da tabela dream_meanings_cache (por processo)
+_meaning_stats = {
+    'hits': 0,
+    'negative_hits': 0,
+    'misses': 0,
+    'expired': 0,
+    'api_calls': 0,
+    'saved': 0,
+}
+_meaning_stats_lock = threading.Lock()
+
+
+def _count_meaning(name: str):
+    with _meaning_stats_lock:
+        _meaning_stats[name] += 1
+
+
+def get_meaning_cache_stats() -> dict:
+    """Retorna os contadores do cache persistente e do cache em memória de significados"""
+    with _meaning_stats_lock:
+        stats = dict(_meaning_stats)
+    memory = _meaning_records.stats()
+    lookups = memory['hits'] + memory['misses']
+    stats['memory'] = {
+        'entries': memory['total_entries'],
+        'max_entries': memory['max_entries'],
+        'hits': memory['hits'],
+        'misses': memory['misses'],
+        'hit_rate': round(memory['hits'] / lookups, 3) if lookups else 0.0,
+        'evictions': memory['evictions'],
+        'expirations': memory['expirations'],
+    }
+    return stats
+
+
+def clear_meaning_memory():
+    """Esvazia o cache em memória de significados (ex: após resetar o banco)"""
+    _meaning_records.clear()
+
+
+def _load_meaning_cache(norm_word: str, lang: str):
+    """Busca a entrada persistida de (palavra normalizada, idioma); None se ausente"""
+    return _load_meaning_caches([norm_word], lang).get(norm_word)
+
+
+def _load_meaning_caches(norm_words: list, lang: str) -> dict:
+    """Entradas persistidas de várias palavras em uma consulta: {palavra normalizada: linha}"""
+    norm_words = list(dict.fromkeys(norm_words))
+    if not norm_words:
+        return {}
+    placeholders = ','.join('?' * len(norm_words))
+    try:
+        # Na requisição usa a conexão dela; nas threads de busca, uma avulsa
+        conn = get_db()
+        try:
+            rows = conn.execute(f'''
+                SELECT normalized_word, word, meaning, source, fetched_at,
+                       expires_at > CURRENT_TIMESTAMP AS fresh,
+                       (julianday(expires_at) - julianday('now')) * 86400 AS remaining
+                FROM dream_meanings_cache
+                WHERE lang = ? AND normalized_word IN ({placeholders})
+            ''', (lang, *norm_words)).fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Erro ao ler cache de significados: {e}")
+        return {}
+    return {row['normalized_word']: dict(row) for row in rows}
+
+
+def _meaning_from_row(dream_word: str, lang: str, row: dict) -> dict:
+    if row['meaning'] is None:
+        # Resultado negativo: nenhuma fonte conhece a palavra
+        return _not_found(dream_word, lang)
+    return {
+        'word': dream_word,
+        'meaning': row['meaning'],
+        'source': row['source'],
+        'language': lang
+    }
+
+
+def save_dream_meaning_cache(word: str, meaning, language: str = 'pt', source: str = 'api',
+                             ttl: int = None):
     """
     Salva significado em cache no banco para reduzir requisições à API.
     
     Args:
-        dream_id: ID do sonho
-        word: Palavra do significado
-        meaning: Significado em texto
+        word: Palavra do significado (a chave é a forma normalizada)
+        meaning: Significado em texto; None registra um resultado negativo
         language: Idioma do significado
+        source: Origem do significado ('rapidapi', 'local', ...)
+        ttl: Validade em segundos (padrão: MEANING_CACHE_TTL)
     """
+    ttl = Config.MEANING_CACHE_TTL if ttl is None else ttl
+    norm_word = _normalize_text(word.strip())
+    if not norm_word:
+        return
     try:
-        # Implementar tabela 'dream_meanings_cache' no banco de dados futuramente
-        # Por enquanto, apenas log
-        logger.info(f"Cache de significado para sonho {dream_id}, palavra '{word}' em {language}")
+        run_write(lambda cur: cur.execute('''
+            INSERT INTO dream_meanings_cache
+                (normalized_word, lang, word, meaning, source, fetched_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, datetime('now', ?))
+            ON CONFLICT (normalized_word, lang) DO UPDATE SET
+                word = excluded.word,
+                meaning = excluded.meaning,
+                source = excluded.source,
+                fetched_at = excluded.fetched_at,
+                expires_at = excluded.expires_at
+        ''', (norm_word, language, word, meaning, source, f'+{int(ttl)} seconds')))
+        _count_meaning('saved')
     except Exception as e:
         logger.error(f"Erro ao salvar cache de significado: {e}")
 
 
+def warm_meaning_cache(limit: int = 100, languages=('pt',)) -> dict:
+    """
+    Pré-carrega a tabela de significados com as palavras-chave mais frequentes
+    dos sonhos já publicados.
+
+    Returns:
+        {'keywords': int, 'lookups': int, 'cached': int}
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT title, description FROM dreams')
+    frequency = Counter()
+    for row in cursor.fetchall():
+        frequency.update(get_keywords_from_dream(f"{row['title']} {row['description']}"))
+    conn.close()
+
+    keywords = [word for word, _ in frequency.most_common(limit)]
+    already_cached = 0
+    for lang in languages:
+        for keyword in keywords:
+            cached = _load_meaning_cache(_normalize_text(keyword), lang)
+            if cached is not None and cached['fresh']:
+                already_cached += 1
+                continue
+            get_dream_meaning(keyword, lang)
+
+    return {
+        'keywords': len(keywords),
+        'lookups': len(keywords) * len(languages) - already_cached,
+        'cached': already_cached,
+    }
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Buscas em andamento nas threads, por palavra: requisições simultâneas
+# esperam a mesma busca em vez de enfileirar outra
+_lookups = {}
+_lookups_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool de threads das buscas de significado (recriado após um fork)"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.MEANING_LOOKUP_WORKERS,
+                    thread_name_prefix='meaning-lookup',
+                )
+                _executor_pid = os.getpid()
+                with _lookups_lock:
+                    _lookups.clear()  # buscas herdadas do processo pai nunca terminam aqui
+    return _executor
+
+
+def _submit_lookup(executor, dream_word: str, lang: str, cached, english_future):
+    """Future da busca da palavra: a que já está em andamento ou uma nova"""
+    key = _flight_key(_normalize_text(dream_word), lang)
+    with _lookups_lock:
+        future = _lookups.get(key)
+        if future is not None:
+            return future
+        future = _lookups[key] = executor.submit(_resolve_pending, dream_word, lang, cached, english_future)
+    future.add_done_callback(lambda f: _forget_lookup(key, f))
+    return future
+
+
+def _forget_lookup(key: str, future):
+    with _lookups_lock:
+        if _lookups.get(key) is future:
+            del _lookups[key]
+
+
+def _lookup_status(result) -> str:
+    if not result or result.get('source') == 'error':
+        return 'error'
+    if result.get('source') == 'fallback':
+        return 'not_found'
+    return 'ok'
+
+
+def get_meanings_for_dream(dream_text: str, keywords: list, lang: str = 'pt',
+                           deadline: float = None) -> dict:
+    """
+    Busca os significados das palavras-chave e a interpretação do texto completo
+    em paralelo, respeitando um prazo total.
+
+    O cache persistente é lido em uma consulta só, e as palavras vão para a
+    API traduzidas em um único lote. Cada busca roda nas threads por inteiro
+    (API, tradução de volta para `lang`, gravação), dentro do prazo; uma
+    palavra que outra requisição já está buscando não gera outra busca: as
+    duas recebem o mesmo registro. O que não terminar no prazo continua
+    rodando em segundo plano (e alimenta o cache); a resposta sai com o que
+    ficou pronto.
+
+    Args:
+        dream_text: Texto completo do sonho (título + descrição)
+        keywords: Palavras-chave extraídas do texto
+        lang: Idioma
+        deadline: Prazo em segundos (padrão: MEANING_REQUEST_DEADLINE)
+
+    Returns:
+        {
+            'meanings': list,   # mesma ordem das palavras-chave
+            'context': dict,    # interpretação do texto completo ou None
+            'statuses': dict,   # palavra -> 'ok' | 'not_found' | 'error' | 'timeout'
+            'partial': bool     # True se o prazo estourou
+        }
+    """
+    deadline = Config.MEANING_REQUEST_DEADLINE if deadline is None else deadline
+    words = [keyword.lower().strip() for keyword in keywords]
+    context_word = dream_text.lower().strip()
+    lookups = [word for word in words if word] + ([context_word] if context_word else [])
+
+    # Cache em memória primeiro (vencidos são servidos e recalculados em segundo
+    # plano); as demais palavras leem a tabela em uma consulta
+    records = {}
+    for word in dict.fromkeys(lookups):
+        record = _memory_record(word, lang)
+        if record is not None:
+            records[word] = record
+    missing = [word for word in dict.fromkeys(lookups) if word not in records]
+    cached = _load_meaning_caches([_normalize_text(word) for word in missing], lang)
+
+    # Entradas válidas da tabela (já no idioma pedido) respondem direto; o
+    # resto vai para as threads
+    ready = {}
+    pending_words = []
+    for word in missing:
+        row = cached.get(_normalize_text(word))
+        if row is not None and row['fresh']:
+            ready[word] = _resolve_meaning(word, lang, row)
+        else:
+            pending_words.append(word)
+    records.update(zip(ready, _complete_meanings(list(ready), list(ready.values()), lang)))
+
+    # A tradução das palavras para a API é a primeira tarefa da fila; as
+    # buscas esperam por ela nas threads, dentro do prazo
+    executor = _get_executor()
+    english = executor.submit(_english_symbols, pending_words, lang) if pending_words else None
+    futures = {
+        word: _submit_lookup(executor, word, lang, cached.get(_normalize_text(word)), english)
+        for word in pending_words
+    }
+    wait(list(futures.values()), timeout=deadline)
+
+    errors = {}
+    late = False
+    for word, future in futures.items():
+        if not future.done():
+            # Termina sozinha em segundo plano e grava no cache
+            late = True
+            continue
+        try:
+            records[word] = future.result()
+        except Exception as e:
+            logger.warning(f"Erro ao buscar significado de '{word}': {e}")
+            errors[word] = e
+    results = {word: record.view() for word, record in records.items()}
+
+    meanings = []
+    statuses = {}
+    for keyword, word in zip(keywords, words):
+        if word in errors or not word:
+            statuses[keyword] = 'error'
+        elif word not in results:
+            statuses[keyword] = 'timeout'
+        else:
+            statuses[keyword] = _lookup_status(results[word])
+            if statuses[keyword] != 'error':
+                meanings.append(results[word])
+
+    context = None
+    if context_word in records and _lookup_status(results[context_word]) == 'ok':
+        # Visão anotada: o registro em cache continua sem 'context'
+        context = records[context_word].view(context=True)
+
+    return {
+        'meanings': meanings,
+        'context': context,
+        'statuses': statuses,
+        'partial': late,
+    }
+
+
 def get_keywords_from_dream(dream_text: str) -> list:
     """
     Extrai palavras-chave de um texto de sonho para buscar significados.
@@ -297,27 +761,6 @@ def get_keywords_from_dream(dream_text: str) -> list:
         dream_text: Texto do sonho
     
     Returns:
-        Lista de palavras-chave
+        Até 5 palavras-chave, das mais relevantes para as menos (ver utils.keywords)
     """
-    # Palavras comuns a filtrar (stopwords em português)
-    stopwords = {'o', 'a', 'de', 'para', 'com', 'em', 'que', 'e', 'é', 'do', 'da', 
-                 'ou', 'na', 'no', 'um', 'uma', 'os', 'as', 'dos', 'das', 'por', 'foi', 
-                 'seja', 'seu', 'sua', 'como', 'se', 'não', 'ele', 'ela', 'eu', 'eu'}
-    
-    # Tokeniza e filtra
-    words = dream_text.lower().split()
-    keywords = [
-        word.strip('.,!?;:') 
-        for word in words 
-        if word.strip('.,!?;:') not in stopwords and len(word) > 3
-    ]
-    
-    # Remove duplicatas mantendo ordem
-    seen = set()
-    unique = []
-    for w in keywords:
-        if w not in seen:
-            unique.append(w)
-            seen.add(w)
-    
-    return unique[:5]  # Retorna até 5 palavras-chave
+    return extract_keywords(dream_text, limit=5)
@@ -1,12 +1,35 @@
 """Validação de email usando mail.so API"""
 import requests
 import logging
-from functools import lru_cache
+from utils.cache import cache_result, CACHE_DURATION
+from utils.http import get_upstream
 
 logger = logging.getLogger(__name__)
 
-# Cache de validações para não sobrecarregar API (máx 100 emails em memória)
-@lru_cache(maxsize=100)
+# Cache de validações (compartilhado entre workers) para não sobrecarregar a API.
+# Só vereditos reais da API entram no cache: falhas levantam exceção.
+@cache_result('email', CACHE_DURATION['email'])
+def _verify_with_mailso(email: str, api_key: str) -> dict:
+    """Consulta a mail.so; levanta RequestException se a API falhar"""
+    # Endpoint da mail.so API
+    url = f"https://api.mail.so/verify"
+    headers = {'Authorization': f'Bearer {api_key}'}
+    params = {'email': email}
+    
+    response = get_upstream('mailso').get(url, headers=headers, params=params)
+    response.raise_for_status()
+    
+    data = response.json()
+    
+    return {
+        'valid': data.get('valid', False),
+        'reason': data.get('reason', 'unknown'),
+        'is_temporary': data.get('is_temporary', False),
+        'is_disposable': data.get('is_disposable', False),
+        'is_free_email': data.get('is_free_email', False)
+    }
+
+
 def validate_email_with_mailso(email: str, api_key: str = None) -> dict:
     """
     Valida email usando mail.so API.
@@ -35,27 +58,11 @@ def validate_email_with_mailso(email: str, api_key: str = None) -> dict:
         }
     
     try:
-        # Endpoint da mail.so API
-        url = f"https://api.mail.so/verify"
-        headers = {'Authorization': f'Bearer {api_key}'}
-        params = {'email': email}
-        
-        response = requests.get(url, headers=headers, params=params, timeout=5)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        return {
-            'valid': data.get('valid', False),
-            'reason': data.get('reason', 'unknown'),
-            'is_temporary': data.get('is_temporary', False),
-            'is_disposable': data.get('is_disposable', False),
-            'is_free_email': data.get('is_free_email', False)
-        }
-    
+        return _verify_with_mailso(email, api_key)
     except requests.exceptions.RequestException as e:
         logger.error(f"Erro ao validar email com mail.so: {e}")
-        # Retorna True por padrão se API falhar (não bloqueia signup)
+        # Retorna True por padrão se API falhar (não bloqueia signup).
+        # Não vai para o cache: a próxima tentativa consulta a API de novo.
         return {
             'valid': True,
             'reason': 'api_error',
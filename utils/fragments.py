@@ -0,0 +1,77 @@
+"""Cache de fragmentos HTML do feed
+
+Cada card de sonho é renderizado uma vez por (sonho, updated_at, idioma) e
+guardado já quebrado nas partes fixas em volta dos campos que dependem de
+quem vê (curtiu, favoritou) ou mudam sem editar o sonho (total de curtidas).
+Montar o card de uma requisição é só juntar as partes com esses valores.
+
+A entrada leva as tags 'dream:{id}' e 'user:{autor}': editar ou apagar o sonho,
+ou mudar o nome/foto do autor, a invalida; o updated_at na chave descarta
+versões antigas mesmo entre workers.
+"""
+import re
+import secrets
+
+from flask import render_template
+from markupsafe import Markup
+
+from config import Config
+from utils.cache import cache_get, cache_set
+from utils.translator import current_language
+
+CARD_TEMPLATE = 'dream_card.html'
+
+# Campos preenchidos por requisição (na ordem em que aparecem no card)
+VIEWER_FIELDS = ('liked', 'like_icon', 'like_count', 'favorited', 'favorite_icon')
+
+# Marcador dos campos na renderização para o cache: aleatório por processo,
+# então o conteúdo de um sonho não consegue imitá-lo
+_SLOT_TOKEN = secrets.token_hex(8)
+_SLOT = re.compile(rf'@@{_SLOT_TOKEN}:(\w+)@@')
+
+
+def viewer_fields(dream) -> dict:
+    """Valores dos campos de `viewer` do card para o usuário atual"""
+    return {
+        'liked': 'true' if dream.get('is_liked') else 'false',
+        'like_icon': '-fill' if dream.get('is_liked') else '',
+        'like_count': dream.get('like_count') or 0,
+        'favorited': 'true' if dream.get('is_favorited') else 'false',
+        'favorite_icon': '-fill' if dream.get('is_favorited') else '',
+    }
+
+
+def _render_parts(dream) -> tuple:
+    """Renderiza o card com marcadores e o quebra em (partes fixas, campos)"""
+    slots = {field: f'@@{_SLOT_TOKEN}:{field}@@' for field in VIEWER_FIELDS}
+    html = render_template(CARD_TEMPLATE, dream=dream, viewer=slots)
+    pieces = _SLOT.split(html)
+    return tuple(pieces[::2]), tuple(pieces[1::2])
+
+
+def _assemble(parts, fields, values) -> Markup:
+    out = [parts[0]]
+    for field, part in zip(fields, parts[1:]):
+        out.append(str(Markup.escape(values[field])))
+        out.append(part)
+    return Markup(''.join(out))
+
+
+def render_dream_card(dream) -> Markup:
+    """
+    HTML do card de um sonho do feed.
+
+    Resultados de busca (com snippet destacado para a consulta) não são
+    guardados: o trecho muda a cada busca.
+    """
+    if dream.get('snippet') or not dream.get('updated_at'):
+        return Markup(render_template(CARD_TEMPLATE, dream=dream, viewer=viewer_fields(dream)))
+
+    key = f"card:{dream['id']}:{dream['updated_at']}:{current_language()}"
+    cached = cache_get(key)
+    if cached is None:
+        cached = _render_parts(dream)
+        cache_set(key, cached, Config.FRAGMENT_CACHE_TTL,
+                  tags=[f"dream:{dream['id']}", f"user:{dream['user_id']}"])
+    parts, fields = cached
+    return _assemble(parts, fields, viewer_fields(dream))
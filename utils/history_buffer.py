@@ -0,0 +1,177 @@
+"""Buffer de eventos de histórico
+
+Cada card aberto no feed gera um evento 'view'. Em vez de um DELETE + INSERT
+e um commit por evento, os eventos ficam em um buffer por processo:
+
+- eventos repetidos (mesmo usuário, sonho e ação) antes do flush viram um só,
+  com o horário do último;
+- o buffer é gravado a cada HISTORY_FLUSH_INTERVAL_MS, ou antes ao juntar
+  HISTORY_FLUSH_SIZE eventos, em uma transação com dois executemany (remove
+  a mesma ação da última hora e insere a nova, como a rota fazia);
+- o tamanho é limitado (HISTORY_BUFFER_MAX): cheio, o evento é descartado e
+  contado em 'dropped';
+- os pendentes são gravados ao encerrar o processo.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from config import Config
+from models import run_write
+
+logger = logging.getLogger(__name__)
+
+# Mesma janela de deduplicação da rota original
+_DEDUP_SQL = '''
+    DELETE FROM history
+    WHERE user_id = :user_id AND dream_id = :dream_id AND action_type = :action_type
+    AND created_at > datetime(:created_at, '-1 hour')
+'''
+
+# Sonhos (ou usuários) apagados enquanto o evento esperava são ignorados
+_INSERT_SQL = '''
+    INSERT INTO history (user_id, dream_id, action_type, created_at)
+    SELECT :user_id, :dream_id, :action_type, :created_at
+    WHERE EXISTS (SELECT 1 FROM dreams WHERE id = :dream_id)
+    AND EXISTS (SELECT 1 FROM users WHERE id = :user_id)
+'''
+
+
+class HistoryBuffer:
+    """Buffer em memória com gravação em lote do histórico"""
+
+    def __init__(self, flush_interval_ms: float = 500, flush_size: int = 200, max_pending: int = 10000):
+        self.interval = max(0.01, flush_interval_ms / 1000)
+        self.flush_size = max(1, flush_size)
+        self.max_pending = max(1, max_pending)
+        self._pending = {}          # (user_id, dream_id, action_type) -> created_at
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'recorded': 0,
+            'deduplicated': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed': 0,
+            'max_batch': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Eventos herdados de um fork pertencem ao processo pai
+                self._pending = {}
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='history-buffer', daemon=True)
+            self._thread.start()
+
+    def record(self, user_id: int, dream_id: int, action_type: str) -> bool:
+        """
+        Registra um evento de histórico.
+
+        Returns:
+            False se o buffer está cheio e o evento foi descartado
+        """
+        self._ensure_started()
+        key = (user_id, dream_id, action_type)
+        created_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        with self._lock:
+            if key in self._pending:
+                self._stats['deduplicated'] += 1
+            elif len(self._pending) >= self.max_pending:
+                self._stats['dropped'] += 1
+                self._wake.set()
+                return False
+            else:
+                self._stats['recorded'] += 1
+            self._pending[key] = created_at
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Grava os eventos pendentes; retorna quantos foram gravados"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = [
+                {'user_id': user_id, 'dream_id': dream_id, 'action_type': action_type, 'created_at': created_at}
+                for (user_id, dream_id, action_type), created_at in batch.items()
+            ]
+
+            def write(cur):
+                cur.executemany(_DEDUP_SQL, rows)
+                cur.executemany(_INSERT_SQL, rows)
+
+            start = time.perf_counter()
+            try:
+                run_write(write)
+            except Exception as e:
+                logger.error(f"Erro ao gravar {len(rows)} eventos de histórico: {e}")
+                with self._lock:
+                    self._stats['failed'] += len(rows)
+                return 0
+
+            with self._lock:
+                self._stats['flushed'] += len(rows)
+                self._stats['flushes'] += 1
+                self._stats['max_batch'] = max(self._stats['max_batch'], len(rows))
+                self._stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            return len(rows)
+
+    def stop(self):
+        """Grava o que está pendente (chamado ao encerrar o processo)"""
+        if self._pid == os.getpid():
+            self.flush()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro no buffer de histórico: {e}")
+
+    def stats(self) -> dict:
+        """Retorna métricas do buffer"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'max_pending': self.max_pending,
+                **self._stats,
+            }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_history_buffer() -> HistoryBuffer:
+    """Retorna o buffer de histórico do processo, criando-o na primeira chamada"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = HistoryBuffer(
+                    flush_interval_ms=Config.HISTORY_FLUSH_INTERVAL_MS,
+                    flush_size=Config.HISTORY_FLUSH_SIZE,
+                    max_pending=Config.HISTORY_BUFFER_MAX,
+                )
+                atexit.register(_buffer.stop)
+    return _buffer
@@ -0,0 +1,314 @@
+"""Clientes HTTP compartilhados para os serviços externos
+
+Cada serviço (RapidAPI, mail.so, tradução) tem um Upstream por processo com:
+
+- uma sessão requests com pool de conexões keep-alive (sem handshake TCP/TLS
+  a cada chamada), timeouts e retentativas vindos do Config;
+- um circuit breaker: depois de HTTP_BREAKER_FAILURES falhas seguidas o
+  circuito abre e as chamadas falham na hora (UpstreamUnavailable), para quem
+  chamou cair no fallback local sem prender uma thread esperando o timeout.
+  Passados HTTP_BREAKER_RESET segundos, uma única chamada de teste decide se
+  o circuito fecha de novo;
+- um histograma de latência, exposto em /admin/stats.
+"""
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from config import Config
+from utils import create_session_with_retry
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores dos baldes do histograma (ms)
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Respostas que contam como falha do serviço (as demais, como 404, são respostas válidas)
+_FAILURE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(requests.exceptions.RequestException):
+    """Circuito aberto ou limite de chamadas simultâneas atingido"""
+
+
+class CircuitBreaker:
+    """Circuit breaker por falhas consecutivas (fechado -> aberto -> meio-aberto)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def allow(self) -> bool:
+        """Decide se uma chamada pode seguir; no meio-aberto só uma de teste passa"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self._stats['rejected'] += 1
+                    return False
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    self._stats['rejected'] += 1
+                    return False
+                self._probing = True
+            return True
+
+    def cancel(self):
+        """Desiste de uma chamada liberada por allow() sem registrar resultado"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                **self._stats,
+            }
+
+
+class LatencyHistogram:
+    """Histograma de latência com baldes fixos"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._total_ms = 0.0
+        self._count = 0
+
+    def observe(self, elapsed_ms: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._total_ms += elapsed_ms
+            self._count += 1
+
+    def _percentile(self, counts, fraction):
+        # Limite superior do balde onde cai o percentil (estimativa)
+        target = fraction * self._count
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else None
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            labels = [f'le_{bound}' for bound in self.buckets] + ['le_inf']
+            return {
+                'count': self._count,
+                'avg_ms': round(self._total_ms / self._count, 2) if self._count else 0.0,
+                'p50_ms': self._percentile(counts, 0.5) if self._count else None,
+                'p95_ms': self._percentile(counts, 0.95) if self._count else None,
+                'buckets': dict(zip(labels, counts)),
+            }
+
+
+class Upstream:
+    """Cliente de um serviço externo: sessão com pool, breaker e métricas"""
+
+    def __init__(self, name: str, timeout: float, retries: int = 2, retry_methods=('GET',),
+                 max_concurrent: int = 0, pool_size: int = 10):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_methods = frozenset(retry_methods)
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(Config.HTTP_BREAKER_FAILURES, Config.HTTP_BREAKER_RESET)
+        self.latency = LatencyHistogram()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'failures': 0,
+            'retries': 0,
+            'rejected': 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    @property
+    def session(self) -> requests.Session:
+        """Sessão do processo (recriada após um fork: sockets não atravessam o fork)"""
+        if self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session_pid != os.getpid():
+                    self._session = create_session_with_retry(
+                        retries=self.retries,
+                        backoff_factor=Config.HTTP_BACKOFF,
+                        pool_maxsize=self.pool_size,
+                        allowed_methods=self.retry_methods,
+                    )
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def available(self) -> bool:
+        """True se o circuito não está aberto (não reserva a chamada de teste)"""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def _acquire(self):
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise UpstreamUnavailable(f"circuito aberto para '{self.name}'")
+        if self._slots is not None and not self._slots.acquire(timeout=self.timeout):
+            self.breaker.cancel()
+            self._count('rejected')
+            raise UpstreamUnavailable(f"limite de chamadas simultâneas para '{self.name}'")
+
+    def _release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Faz uma requisição HTTP pelo pool do serviço.
+
+        Raises:
+            UpstreamUnavailable: circuito aberto ou sem vaga para a chamada
+            requests.exceptions.RequestException: erro de rede/timeout
+        """
+        kwargs.setdefault('timeout', (Config.HTTP_CONNECT_TIMEOUT, self.timeout))
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(start, failed=True)
+            raise
+        finally:
+            self._release()
+
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', ())
+        if retries:
+            self._count('retries', len(retries))
+        self._record(start, failed=response.status_code in _FAILURE_STATUSES)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def call(self, func, *args, **kwargs):
+        """Executa um cliente que não usa requests (ex: biblioteca de tradução) sob o breaker"""
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record(start, failed=True)
+            raise
+        finally:
+            self._release()
+        self._record(start, failed=False)
+        return result
+
+    def _record(self, start: float, failed: bool):
+        self.latency.observe((time.perf_counter() - start) * 1000)
+        self._count('requests')
+        if failed:
+            self._count('failures')
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            'breaker': self.breaker.stats(),
+            'latency': self.latency.stats(),
+        }
+
+
+def _upstream_settings() -> dict:
+    return {
+        'rapidapi': dict(
+            timeout=Config.RAPIDAPI_TIMEOUT,
+            retry_methods=('POST',),  # consulta ao dicionário: repetir é seguro
+            max_concurrent=Config.MEANING_MAX_EXTERNAL_CALLS,
+        ),
+        'mailso': dict(timeout=Config.API_EMAIL_TIMEOUT),
+        'translation': dict(timeout=Config.TRANSLATION_TIMEOUT),
+    }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name: str) -> Upstream:
+    """Retorna o cliente do serviço externo, criando-o na primeira chamada"""
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.get(name)
+            if upstream is None:
+                settings = _upstream_settings()[name]
+                upstream = _upstreams[name] = Upstream(
+                    name,
+                    retries=Config.HTTP_RETRIES,
+                    pool_size=Config.HTTP_POOL_SIZE,
+                    **settings,
+                )
+    return upstream
+
+
+def get_http_stats() -> dict:
+    """Métricas (breaker e latência) dos serviços externos já usados no processo"""
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {name: upstream.stats() for name, upstream in sorted(upstreams.items())}
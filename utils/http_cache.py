@@ -0,0 +1,77 @@
+"""Cache HTTP: páginas estáticas e GETs condicionais
+
+Páginas sem dados dinâmicos (sobre, blog, termos...) são renderizadas uma vez
+por processo e servidas com ETag, Last-Modified e Cache-Control. O navegador
+revalida com If-None-Match/If-Modified-Since e recebe 304 sem corpo. A chave
+inclui o mtime do template: editar o arquivo gera uma nova versão.
+
+As APIs JSON de leitura calculam um carimbo de versão barato (updated_at,
+contadores, último id) antes de montar a resposta; se o If-None-Match do
+cliente bate com o ETag do carimbo, a resposta é um 304 sem nenhum trabalho.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, render_template, request
+
+from config import Config
+from utils.cache import cache_get, cache_set
+
+
+def _template_mtime(template_name: str) -> float:
+    template = current_app.jinja_env.get_template(template_name)
+    try:
+        return os.path.getmtime(template.filename) if template.filename else 0.0
+    except OSError:
+        return 0.0
+
+
+def render_static_page(template_name: str):
+    """
+    Resposta de uma página estática com validação condicional.
+
+    Returns:
+        Response 200 com a página, ou 304 se o navegador já tem a versão atual
+    """
+    mtime = _template_mtime(template_name)
+    key = f'page:{template_name}:{mtime}'
+    page = cache_get(key)
+    if page is None:
+        body = render_template(template_name)
+        page = (body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+        cache_set(key, page, Config.STATIC_PAGE_TTL, tags=['pages'], shared=False)
+    body, etag = page
+
+    response = make_response(body)
+    response.set_etag(etag)
+    if mtime:
+        response.last_modified = datetime.fromtimestamp(int(mtime), timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.STATIC_PAGE_MAX_AGE
+    return response.make_conditional(request)
+
+
+def make_etag(*stamp) -> str:
+    """ETag forte a partir do carimbo de versão de um recurso (sem montar o corpo)"""
+    return hashlib.sha1(repr(stamp).encode('utf-8')).hexdigest()
+
+
+def _revalidate(response, etag: str):
+    # Dados por usuário: só o navegador guarda, e sempre revalida
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag: str):
+    """Resposta 304 se o cliente já tem esta versão (If-None-Match); senão None"""
+    if etag in request.if_none_match:
+        return _revalidate(make_response('', 304), etag)
+    return None
+
+
+def with_etag(response, etag: str):
+    """Marca uma resposta JSON com o ETag da versão servida"""
+    return _revalidate(make_response(response), etag)
@@ -0,0 +1,302 @@
+"""Interpretação dos sonhos em segundo plano
+
+Ao postar ou editar um sonho, um job é gravado em interpretation_jobs (na
+mesma transação do sonho). Um pool de threads por processo executa os jobs:
+extrai as palavras-chave, busca os significados uma vez no idioma do sonho,
+traduz o resultado em lote para os demais idiomas suportados e grava tudo em
+dream_interpretations, de onde a API de significados passa a servir sem
+chamar serviços externos.
+
+Com INTERPRETATION_WORKERS=0 os jobs não são executados: o sonho é exibido
+logo e a API de significados calcula a interpretação na hora.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+
+from config import Config
+from models import run_write
+from models.pool import get_pool
+from utils.dream_meanings import MEANING_LANGUAGES, get_keywords_from_dream, get_meanings_for_dream
+from utils.keywords import text_language
+from utils.translator import translate_many
+
+logger = logging.getLogger(__name__)
+
+# Jobs 'running' sem atualização por mais que isso são considerados abandonados
+_STALE_AFTER = 300
+
+
+class InterpretationWorkers:
+    """Pool de threads que executa os jobs de interpretação do processo"""
+
+    def __init__(self, size: int = 2, poll_interval: float = 30):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._queue = queue.Queue()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'completed': 0,
+            'failed': 0,
+            'retried': 0,
+            'superseded': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        """False quando os workers estão desligados (INTERPRETATION_WORKERS=0)"""
+        return self.size > 0
+
+    def ensure_started(self):
+        """Inicia as threads (de novo, após um fork)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'interpretation-{i}', daemon=True)
+                for i in range(self.size)
+            ]
+            for thread in self._threads:
+                thread.start()
+        self._queue.put(None)  # varredura inicial: retoma jobs pendentes
+
+    def notify(self, dream_id: int):
+        """Avisa que há um job novo para o sonho (sem workers, não há quem avise)"""
+        if not self.enabled:
+            return
+        self.ensure_started()
+        self._queue.put(dream_id)
+
+    def _run(self):
+        while True:
+            try:
+                dream_id = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                dream_id = None
+            try:
+                if dream_id is None:
+                    for pending_id in _pending_jobs():
+                        self._process(pending_id)
+                else:
+                    self._process(dream_id)
+            except Exception as e:
+                logger.error(f"Erro no worker de interpretação: {e}")
+
+    def _process(self, dream_id: int):
+        claimed = _claim(dream_id)
+        if claimed is None:
+            return  # outro worker pegou o job, ou ele já foi concluído
+        version, attempt = claimed
+
+        try:
+            with get_pool().connection() as conn:
+                dream = conn.execute(
+                    'SELECT title, description FROM dreams WHERE id = ?', (dream_id,)
+                ).fetchone()
+            if dream is None:
+                return
+
+            dream_text = f"{dream['title']} {dream['description']}"
+            keywords = get_keywords_from_dream(dream_text)
+
+            # Uma busca por palavra, no idioma do sonho (a API recebe as palavras em inglês)
+            source_lang = text_language(dream_text)
+            result = get_meanings_for_dream(
+                dream_text, keywords, source_lang, deadline=Config.INTERPRETATION_DEADLINE
+            )
+            if result['partial'] and attempt < Config.INTERPRETATION_MAX_ATTEMPTS:
+                # As buscas atrasadas seguem alimentando o cache; a próxima tentativa as aproveita
+                raise TimeoutError(f"prazo esgotado para o idioma '{source_lang}'")
+            meanings = [dict(meaning) for meaning in result['meanings']]
+            if len(meanings) < 2 and result['context']:
+                meanings.insert(0, dict(result['context']))
+
+            # Os demais idiomas são traduções do resultado, uma chamada por idioma
+            for lang in MEANING_LANGUAGES:
+                localized = meanings if lang == source_lang else _translate_meanings(meanings, lang, source_lang)
+                if not _store(dream_id, version, lang, keywords, localized, result['statuses']):
+                    self._stats['superseded'] += 1
+                    return
+
+            _finish(dream_id, version)
+            self._stats['completed'] += 1
+        except Exception as e:
+            logger.warning(f"Falha ao interpretar o sonho {dream_id}: {e}")
+            if _fail(dream_id, version, str(e)):
+                self._stats['failed'] += 1
+            else:
+                self._stats['retried'] += 1
+
+    def stats(self) -> dict:
+        """Retorna métricas dos workers e da fila de jobs"""
+        return {
+            'workers': self.size,
+            'alive': sum(thread.is_alive() for thread in self._threads),
+            'queued': self._queue.qsize(),
+            **self._stats,
+        }
+
+
+def _translate_meanings(meanings: list, lang: str, source_lang: str) -> list:
+    """Significados traduzidos de `source_lang` para `lang` em um único lote"""
+    translated = translate_many([meaning['meaning'] for meaning in meanings], lang, source_lang)
+    return [
+        dict(meaning, meaning=text or meaning['meaning'], language=lang)
+        for meaning, text in zip(meanings, translated)
+    ]
+
+
+def _pending_jobs() -> list:
+    """Jobs pendentes (e 'running' abandonados por um processo que morreu)"""
+    def requeue_stale(cur):
+        cur.execute('''
+            UPDATE interpretation_jobs SET status = 'pending'
+            WHERE status = 'running' AND updated_at < datetime('now', ?)
+        ''', (f'-{_STALE_AFTER} seconds',))
+
+    run_write(requeue_stale)
+    with get_pool().connection() as conn:
+        rows = conn.execute('''
+            SELECT dream_id FROM interpretation_jobs
+            WHERE status = 'pending' AND attempts < ?
+            ORDER BY updated_at
+        ''', (Config.INTERPRETATION_MAX_ATTEMPTS,)).fetchall()
+    return [row['dream_id'] for row in rows]
+
+
+def _claim(dream_id: int):
+    """Marca o job como em execução. Retorna (versão, tentativa) ou None."""
+    def claim(cur):
+        cur.execute('SELECT version, attempts FROM interpretation_jobs WHERE dream_id = ?', (dream_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute('''
+            UPDATE interpretation_jobs
+            SET status = 'running', attempts = attempts + 1, steps_done = 0,
+                steps_total = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE dream_id = ? AND version = ? AND status = 'pending' AND attempts < ?
+        ''', (len(MEANING_LANGUAGES), dream_id, row[0], Config.INTERPRETATION_MAX_ATTEMPTS))
+        return (row[0], row[1] + 1) if cur.rowcount else None
+
+    return run_write(claim)
+
+
+def _store(dream_id, version, lang, keywords, meanings, statuses) -> bool:
+    """Grava a interpretação de um idioma se o job ainda for da versão atual"""
+    def store(cur):
+        cur.execute('''
+            UPDATE interpretation_jobs
+            SET steps_done = steps_done + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE dream_id = ? AND version = ? AND status = 'running'
+        ''', (dream_id, version))
+        if cur.rowcount == 0:
+            return False
+        cur.execute('''
+            INSERT OR REPLACE INTO dream_interpretations (dream_id, lang, keywords, meanings, statuses)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (dream_id, lang, json.dumps(keywords, ensure_ascii=False),
+              json.dumps(meanings, ensure_ascii=False, default=dict), json.dumps(statuses)))
+        return True
+
+    return run_write(store)
+
+
+def _finish(dream_id, version):
+    run_write(lambda cur: cur.execute('''
+        UPDATE interpretation_jobs SET status = 'done', error = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE dream_id = ? AND version = ?
+    ''', (dream_id, version)))
+
+
+def _fail(dream_id, version, error) -> bool:
+    """Devolve o job à fila ou o marca como falho. Retorna True se falhou de vez."""
+    def fail(cur):
+        cur.execute('''
+            UPDATE interpretation_jobs
+            SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE dream_id = ? AND version = ?
+        ''', (Config.INTERPRETATION_MAX_ATTEMPTS, error, dream_id, version))
+        cur.execute('SELECT status FROM interpretation_jobs WHERE dream_id = ? AND version = ?',
+                    (dream_id, version))
+        row = cur.fetchone()
+        return row is not None and row[0] == 'failed'
+
+    return run_write(fail)
+
+
+def get_interpretation(cursor, dream_id: int, lang: str):
+    """Interpretação pré-calculada de um sonho em um idioma; None se ainda não existe"""
+    cursor.execute('''
+        SELECT keywords, meanings, statuses FROM dream_interpretations
+        WHERE dream_id = ? AND lang = ?
+    ''', (dream_id, lang))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        'keywords': json.loads(row['keywords']),
+        'meanings': json.loads(row['meanings']),
+        'statuses': json.loads(row['statuses']),
+    }
+
+
+def get_interpretation_version(cursor, dream_id: int, lang: str):
+    """Carimbo de versão da interpretação (para ETag); None se ainda não existe"""
+    cursor.execute('''
+        SELECT i.created_at, j.version, j.steps_done
+        FROM dream_interpretations i
+        LEFT JOIN interpretation_jobs j ON j.dream_id = i.dream_id
+        WHERE i.dream_id = ? AND i.lang = ?
+    ''', (dream_id, lang))
+    row = cursor.fetchone()
+    return tuple(row) if row else None
+
+
+def get_job_progress(cursor, dream_id: int):
+    """Situação do job de interpretação de um sonho; None se não há job"""
+    cursor.execute('''
+        SELECT status, steps_done, steps_total, attempts FROM interpretation_jobs
+        WHERE dream_id = ?
+    ''', (dream_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    progress = row['steps_done'] / row['steps_total'] if row['steps_total'] else 0.0
+    return {
+        'status': row['status'],
+        'steps_done': row['steps_done'],
+        'steps_total': row['steps_total'],
+        'progress': 1.0 if row['status'] == 'done' else round(progress, 2),
+    }
+
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def get_interpretation_workers() -> InterpretationWorkers:
+    """Retorna o pool de workers do processo, criando-o na primeira chamada"""
+    global _workers
+    if _workers is None:
+        with _workers_lock:
+            if _workers is None:
+                _workers = InterpretationWorkers(
+                    size=Config.INTERPRETATION_WORKERS,
+                    poll_interval=Config.INTERPRETATION_POLL_INTERVAL,
+                )
+    return _workers
+
+
+def init_app(app):
+    """Garante os workers em cada processo que atende requisições"""
+    app.before_request(get_interpretation_workers().ensure_started)
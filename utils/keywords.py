@@ -0,0 +1,218 @@
+"""Extração de palavras-chave dos sonhos
+
+Cada palavra-chave vira uma busca de significado (e, com a RapidAPI ativa, uma
+chamada externa), então vale escolher poucas e boas. O pipeline:
+
+1. tokeniza e remove acentos;
+2. descarta stopwords de português, inglês e espanhol (data/stopwords/*.txt);
+3. reduz as palavras a um radical leve (plural, diminutivo, gerúndio);
+4. pontua cada radical por TF-IDF, com a frequência de documentos mantida
+   incrementalmente na tabela keyword_df;
+5. multiplica a nota dos símbolos conhecidos do dicionário local.
+"""
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from config import Config
+from utils.symbols import get_symbol_dictionary, normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+STOPWORD_LANGUAGES = ('pt', 'en', 'es')
+
+# Multiplicadores da nota
+_SYMBOL_BOOST = 3.0      # palavra é um símbolo do dicionário
+_PHRASE_BOOST = 1.5      # símbolo de várias palavras ("dente caindo")
+
+_MIN_LENGTH = 3
+
+_TOKEN = re.compile(r'[^\W\d_]+')
+
+_stopwords = None
+_stopwords_lock = threading.Lock()
+
+
+def _load_stopwords() -> dict:
+    directory = os.path.join(os.path.dirname(Config.SYMBOLS_FILE), 'stopwords')
+    stopwords = {}
+    for lang in STOPWORD_LANGUAGES:
+        path = os.path.join(directory, f'{lang}.txt')
+        try:
+            with open(path, encoding='utf-8') as f:
+                stopwords[lang] = frozenset(
+                    normalize_symbol(line) for line in f
+                    if line.strip() and not line.startswith('#')
+                )
+        except OSError as e:
+            logger.warning(f"Lista de stopwords indisponível ({path}): {e}")
+            stopwords[lang] = frozenset()
+    return stopwords
+
+
+def get_stopwords() -> dict:
+    """Stopwords por idioma (já sem acentos), carregadas uma vez por processo"""
+    global _stopwords
+    if _stopwords is None:
+        with _stopwords_lock:
+            if _stopwords is None:
+                _stopwords = _load_stopwords()
+    return _stopwords
+
+
+def detect_language(words) -> str:
+    """Idioma provável do texto: o que tem mais stopwords entre as palavras"""
+    stopwords = get_stopwords()
+    counts = {lang: sum(word in stopwords[lang] for word in words) for lang in STOPWORD_LANGUAGES}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else 'pt'
+
+
+def text_language(text: str) -> str:
+    """Idioma provável de um texto livre (ver detect_language)"""
+    return detect_language([normalize_symbol(word) for word in _TOKEN.findall((text or '').lower())])
+
+
+def stem(word: str, lang: str = 'pt') -> str:
+    """
+    Radical leve de uma palavra sem acentos.
+
+    Só remove flexões que não mudam o símbolo: plural, diminutivo e gerúndio
+    (que volta ao infinitivo, para casar com o dicionário: 'voando' -> 'voar').
+    """
+    if len(word) <= 3:
+        return word
+
+    if lang == 'en':
+        if word.endswith('ies') and len(word) > 4:
+            return word[:-3] + 'y'
+        if word.endswith('ing') and len(word) > 5:
+            return word[:-3]
+        if word.endswith('ed') and len(word) > 4:
+            return word[:-2]
+        if word.endswith('s') and not word.endswith('ss'):
+            return word[:-1]
+        return word
+
+    # Gerúndio -> infinitivo (pt/es)
+    for suffix, infinitive in (('iendo', 'er'), ('ando', 'ar'), ('endo', 'er'), ('indo', 'ir')):
+        if word.endswith(suffix) and len(word) > len(suffix) + 1:
+            return word[:-len(suffix)] + infinitive
+
+    # Plural
+    if word.endswith(('oes', 'aes')):
+        word = word[:-3] + 'ao'
+    elif word.endswith(('ais', 'eis', 'ois')) and len(word) > 4:
+        word = word[:-2] + 'l'
+    elif word.endswith('ns'):
+        word = word[:-2] + 'm'
+    elif word.endswith('res') or word.endswith('zes'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('us', 'is', 'ss')):
+        word = word[:-1]
+
+    # Diminutivo
+    for suffix, replacement in (('zinho', 'o'), ('zinha', 'a'), ('inho', 'o'), ('inha', 'a')):
+        if word.endswith(suffix) and len(word) > len(suffix) + 2:
+            return word[:-len(suffix)] + replacement
+
+    # -ito/-ita só é diminutivo em espanhol, e mesmo lá termina muitas palavras
+    # ('bonito', 'visita'): só vale quando a forma base é um símbolo conhecido
+    if lang == 'es':
+        for suffix, replacement in (('ito', 'o'), ('ita', 'a')):
+            if word.endswith(suffix) and len(word) > len(suffix) + 2:
+                base = word[:-len(suffix)] + replacement
+                if get_symbol_dictionary().symbol(base):
+                    return base
+    return word
+
+
+def _candidates(text: str):
+    """
+    Candidatos do texto: {termo: (contagem, forma exibida, é símbolo, posição)}.
+
+    O termo é o radical (ou o símbolo do dicionário, sem acentos); a forma
+    exibida é a grafia do dicionário ou a mais frequente no texto.
+    """
+    raw_words = [word.lower() for word in _TOKEN.findall(text)]
+    folded = [normalize_symbol(word) for word in raw_words]
+    lang = detect_language(folded)
+    stopwords = get_stopwords()
+    all_stopwords = stopwords['pt'] | stopwords['en'] | stopwords['es']
+    symbols = get_symbol_dictionary()
+
+    counts = Counter()
+    surfaces = {}
+    is_symbol = {}
+    first_seen = {}
+
+    for position, (word, fold) in enumerate(zip(raw_words, folded)):
+        if len(fold) < _MIN_LENGTH or fold in all_stopwords:
+            continue
+        symbol = symbols.symbol(fold) or symbols.symbol(stem(fold, lang))
+        term = normalize_symbol(symbol) if symbol else stem(fold, lang)
+        counts[term] += 1
+        surfaces.setdefault(term, Counter())[symbol or word] += 1
+        is_symbol[term] = bool(symbol)
+        first_seen.setdefault(term, position)
+
+    # Símbolos de várias palavras encontrados pelo autômato; as palavras que
+    # eles cobrem ("dente", "caindo") deixam de concorrer sozinhas
+    covered = set()
+    for phrase in symbols.find_symbols(text):
+        term = normalize_symbol(phrase)
+        if ' ' not in term:
+            continue
+        counts[term] += 1
+        surfaces.setdefault(term, Counter())[phrase] += 1
+        is_symbol[term] = True
+        first_seen.setdefault(term, -1)
+        covered.update(stem(word, lang) for word in term.split())
+    for term in covered:
+        counts.pop(term, None)
+
+    return {
+        term: (count, surfaces[term].most_common(1)[0][0], is_symbol[term], first_seen[term])
+        for term, count in counts.items()
+    }
+
+
+def document_terms(text: str) -> set:
+    """Termos distintos de um documento (o que entra na tabela keyword_df)"""
+    return set(_candidates(text or ''))
+
+
+def extract_keywords(text: str, limit: int = 5, frequencies=None) -> list:
+    """
+    Palavras-chave do texto ordenadas por relevância.
+
+    Args:
+        text: Texto do sonho
+        limit: Quantidade máxima de palavras-chave
+        frequencies: (total de documentos, {termo: df}); lido do banco se omitido
+
+    Returns:
+        Lista de palavras-chave (grafia do dicionário ou do texto)
+    """
+    candidates = _candidates(text or '')
+    if not candidates:
+        return []
+
+    if frequencies is None:
+        from models import get_keyword_frequencies
+        frequencies = get_keyword_frequencies(candidates.keys())
+    total_documents, document_frequency = frequencies
+
+    scored = []
+    for term, (count, surface, symbol, position) in candidates.items():
+        idf = math.log((1 + total_documents) / (1 + document_frequency.get(term, 0))) + 1
+        score = count * idf
+        if symbol:
+            score *= _SYMBOL_BOOST * (_PHRASE_BOOST if ' ' in term else 1)
+        scored.append((-score, position, surface))
+
+    scored.sort()
+    return [surface for _, _, surface in scored[:limit]]
@@ -0,0 +1,101 @@
+"""Sonhos curtidos e favoritados por usuário
+
+Em vez de duas subconsultas por linha do feed (uma em likes, outra em
+favorites), cada usuário tem um par de conjuntos ordenados de ids, carregado
+uma vez (cache compartilhado, tag 'memberships:{id}') e memorizado por
+requisição. As rotas de curtir/favoritar invalidam o conjunto depois de
+gravar, e a próxima leitura o recarrega do banco; a validade
+(MEMBERSHIP_TTL) limita qualquer divergência.
+"""
+import logging
+from array import array
+from bisect import bisect_left
+
+from flask import g, has_app_context
+
+from config import Config
+from models import get_db
+from utils.cache import cache_get, cache_set, invalidate
+
+logger = logging.getLogger(__name__)
+
+# Tabelas de origem (o nome do conjunto é o da tabela)
+MEMBERSHIP_TABLES = ('likes', 'favorites')
+
+
+class MembershipSet:
+    """Conjunto compacto e ordenado de ids de sonhos (array de inteiros + busca binária)"""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = ids if isinstance(ids, array) else array('q', sorted(set(ids)))
+
+    def __contains__(self, dream_id) -> bool:
+        ids = self.ids
+        index = bisect_left(ids, dream_id)
+        return index < len(ids) and ids[index] == dream_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getstate__(self):
+        # Tupla: um estado vazio (falso) faria o pickle pular o __setstate__
+        return (self.ids,)
+
+    def __setstate__(self, state):
+        self.ids = state[0]
+
+
+
+def _cache_key(user_id) -> str:
+    return f"memberships:{user_id}"
+
+
+def _load(user_id) -> dict:
+    # Conexão da requisição (um segundo empréstimo do pool pode esgotá-lo)
+    conn = get_db()
+    try:
+        return {
+            table: MembershipSet(array('q', (row[0] for row in conn.execute(
+                f'SELECT dream_id FROM {table} WHERE user_id = ? ORDER BY dream_id', (user_id,)
+            ))))
+            for table in MEMBERSHIP_TABLES
+        }
+    finally:
+        conn.close()
+
+
+def get_memberships(user_id) -> dict:
+    """
+    Conjuntos do usuário: {'likes': MembershipSet, 'favorites': MembershipSet}.
+
+    Uma consulta ao cache por requisição; duas consultas ao banco só quando
+    o cache não tem o usuário.
+    """
+    memo = g.setdefault('_memberships', {}) if has_app_context() else {}
+    memberships = memo.get(user_id)
+    if memberships is None:
+        memberships = cache_get(_cache_key(user_id))
+        if memberships is None:
+            memberships = _load(user_id)
+            cache_set(_cache_key(user_id), memberships, Config.MEMBERSHIP_TTL,
+                      tags=[_cache_key(user_id)])
+        memo[user_id] = memberships
+    return memberships
+
+
+def refresh_memberships(user_id):
+    """
+    Descarta os conjuntos do usuário após curtir/favoritar (ou desfazer).
+
+    O conjunto em cache não é alterado no lugar: dois workers gravando para o
+    mesmo usuário perderiam uma das alterações. A invalidação chega a todos os
+    workers e a próxima leitura recarrega do banco, já com a escrita.
+    """
+    invalidate(_cache_key(user_id))
+    if has_app_context() and '_memberships' in g:
+        g._memberships.pop(user_id, None)
@@ -0,0 +1,315 @@
+"""Dicionário local de símbolos de sonhos
+
+Os símbolos ficam em um arquivo TSV (idioma, símbolo, significado) mapeado em
+memória. Na primeira consulta o arquivo é lido uma única vez para montar:
+
+- um índice hash (idioma, chave normalizada) -> posição do significado no arquivo;
+- um autômato Aho-Corasick que encontra todos os símbolos conhecidos, inclusive
+  os de várias palavras ("dente caindo"), em uma única passada sobre o texto;
+- um índice de trigramas para a busca aproximada, que só compara a consulta
+  com as chaves que compartilham trigramas com ela.
+
+Os significados só são decodificados quando pedidos, então o custo de uma
+consulta não cresce com o tamanho do dicionário.
+"""
+import logging
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+
+from config import Config
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz
+    _HAS_RAPIDFUZZ = True
+except Exception:
+    _HAS_RAPIDFUZZ = False
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+# Busca aproximada: candidatos avaliados e nota mínima (0-100)
+_FUZZY_CANDIDATES = 20
+_FUZZY_THRESHOLD = 65
+
+
+def normalize_symbol(text: str) -> str:
+    """Forma canônica de um símbolo: minúsculas, sem acentos nem pontuação.
+
+    Ex: 'Dente  caindo!' -> 'dente caindo'
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def _trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Automaton:
+    """
+    Aho-Corasick sobre palavras (e não caracteres): as ocorrências já caem em
+    limites de palavra e o número de estados fica perto do número de símbolos.
+    As saídas são pares (id da chave, nº de palavras).
+    """
+
+    __slots__ = ('goto', 'fail', 'output')
+
+    def __init__(self, keys):
+        goto = [{}]
+        output = [()]
+
+        for key_id, key in enumerate(keys):
+            words = key.split()
+            state = 0
+            for word in words:
+                next_state = goto[state].get(word)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][word] = next_state
+                    goto.append({})
+                    output.append(())
+                state = next_state
+            output[state] += ((key_id, len(words)),)
+
+        # Links de falha em largura
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for word, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and word not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(word, 0)
+                fail[next_state] = target if target != next_state else 0
+                if output[fail[next_state]]:
+                    output[next_state] += output[fail[next_state]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+
+    def iter_matches(self, words):
+        """Gera (índice_inicial, índice_final, key_id) para cada ocorrência"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for key_id, length in output[state]:
+                yield position - length + 1, position, key_id
+
+
+class SymbolDictionary:
+    """Dicionário de símbolos carregado sob demanda a partir de um TSV"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mmap = None
+        self._index = {}        # (idioma, chave) -> (início, fim) do significado
+        self._keys = []         # chaves normalizadas únicas
+        self._display = []      # id -> grafia original (primeira ocorrência no arquivo)
+        self._key_ids = {}      # chave -> id
+        self._langs = []        # id -> frozenset de idiomas da chave
+        self._words = {}        # palavra -> ids das chaves de várias palavras que a contêm
+        self._trigrams = {}     # trigrama -> ids
+        self._automaton = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._load()
+            self._loaded = True
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            logger.warning(f"Dicionário de símbolos indisponível ({self.path}): {e}")
+            return
+        if self._mmap is None:
+            return
+
+        langs = {}
+        data = self._mmap
+        offset = 0
+        size = len(data)
+        while offset < size:
+            end = data.find(b'\n', offset)
+            if end == -1:
+                end = size
+            line = data[offset:end]
+            if line and not line.startswith(b'#'):
+                parts = line.split(b'\t', 2)
+                if len(parts) == 3:
+                    lang = parts[0].decode('ascii').strip()
+                    symbol = parts[1].decode('utf-8').strip()
+                    key = normalize_symbol(symbol)
+                    if key:
+                        start = end - len(parts[2])
+                        self._index[(lang, key)] = (start, end - (1 if line.endswith(b'\r') else 0))
+                        key_id = self._key_ids.get(key)
+                        if key_id is None:
+                            key_id = self._key_ids[key] = len(self._keys)
+                            self._keys.append(key)
+                            self._display.append(symbol)
+                        langs.setdefault(key_id, set()).add(lang)
+            offset = end + 1
+
+        self._langs = [frozenset(langs[key_id]) for key_id in range(len(self._keys))]
+        for key_id, key in enumerate(self._keys):
+            words = key.split()
+            if len(words) > 1:
+                for word in words:
+                    self._words.setdefault(word, []).append(key_id)
+            for trigram in _trigrams(key):
+                self._trigrams.setdefault(trigram, []).append(key_id)
+        self._automaton = _Automaton(self._keys)
+        logger.info(f"Dicionário de símbolos carregado: {len(self._index)} entradas, {len(self._keys)} chaves")
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._index)
+
+    def _meaning(self, lang, key):
+        span = self._index.get((lang, key))
+        if span is None:
+            return None
+        return self._mmap[span[0]:span[1]].decode('utf-8')
+
+    def _resolve(self, key, langs):
+        """Significado da chave no primeiro idioma disponível: (significado, idioma)"""
+        for lang in langs:
+            meaning = self._meaning(lang, key)
+            if meaning is not None:
+                return meaning, lang
+        return None, None
+
+    def get(self, word: str, lang: str = 'pt'):
+        """Busca exata pela chave normalizada. Retorna (significado, idioma) ou (None, None)."""
+        self._ensure_loaded()
+        return self._resolve(normalize_symbol(word), _fallback_langs(lang))
+
+    def symbol(self, word: str, lang: str = 'pt'):
+        """Grafia do dicionário para a palavra, se ela for um símbolo conhecido"""
+        self._ensure_loaded()
+        key_id = self._key_ids.get(normalize_symbol(word))
+        if key_id is None or not set(_fallback_langs(lang)) & self._langs[key_id]:
+            return None
+        return self._display[key_id]
+
+    def find_symbols(self, text: str, lang: str = 'pt') -> list:
+        """
+        Todos os símbolos conhecidos presentes no texto, em uma única passada.
+
+        Só conta palavras inteiras; quando símbolos se sobrepõem
+        ("dente caindo" e "dente") fica o mais longo.
+
+        Returns:
+            Lista de símbolos (grafia do dicionário) na ordem em que aparecem no texto
+        """
+        self._ensure_loaded()
+        if self._automaton is None:
+            return []
+        langs = set(_fallback_langs(lang))
+        words = normalize_symbol(text).split()
+
+        matches = [
+            (start, end, key_id)
+            for start, end, key_id in self._automaton.iter_matches(words)
+            if langs & self._langs[key_id]
+        ]
+
+        # Mantém as ocorrências mais longas que não se sobrepõem
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        found = []
+        seen = set()
+        last_end = -1
+        for start, end, key_id in matches:
+            if start <= last_end:
+                continue
+            last_end = end
+            if key_id not in seen:
+                seen.add(key_id)
+                found.append(self._display[key_id])
+        return found
+
+    def containing(self, word: str, lang: str = 'pt') -> list:
+        """Símbolos de várias palavras que contêm a palavra (ex: 'dente' -> 'dente caindo')"""
+        self._ensure_loaded()
+        langs = set(_fallback_langs(lang))
+        return [self._display[key_id] for key_id in self._words.get(normalize_symbol(word), ())
+                if langs & self._langs[key_id]]
+
+    def fuzzy(self, word: str, lang: str = 'pt'):
+        """
+        Busca aproximada pelo índice de trigramas.
+
+        Returns:
+            (símbolo, nota) do melhor símbolo acima do limiar, ou (None, 0)
+        """
+        self._ensure_loaded()
+        query = normalize_symbol(word)
+        if not query:
+            return None, 0
+        langs = set(_fallback_langs(lang))
+
+        shared = {}
+        for trigram in _trigrams(query):
+            for key_id in self._trigrams.get(trigram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:_FUZZY_CANDIDATES]
+
+        best, best_score = None, 0
+        for key_id in candidates:
+            if not langs & self._langs[key_id]:
+                continue
+            score = _similarity(query, self._keys[key_id])
+            if score > best_score:
+                best, best_score = self._display[key_id], score
+        if best_score < _FUZZY_THRESHOLD:
+            return None, 0
+        return best, best_score
+
+
+def _similarity(a: str, b: str) -> float:
+    if _HAS_RAPIDFUZZ:
+        # token_sort_ratio tolera palavras trocadas; ratio, palavras coladas ('dentecaindo')
+        return max(rf_fuzz.ratio(a, b), rf_fuzz.token_sort_ratio(a, b))
+    return SequenceMatcher(None, a, b).ratio() * 100
+
+
+def _fallback_langs(lang: str) -> tuple:
+    # O dicionário base é em português; outros idiomas caem nele (e são traduzidos)
+    return (lang, 'pt') if lang != 'pt' else ('pt',)
+
+
+_dictionary = None
+_dictionary_lock = threading.Lock()
+
+
+def get_symbol_dictionary() -> SymbolDictionary:
+    """Retorna o dicionário de símbolos do processo (carregado na primeira consulta)"""
+    global _dictionary
+    if _dictionary is None:
+        with _dictionary_lock:
+            if _dictionary is None:
+                _dictionary = SymbolDictionary(Config.SYMBOLS_FILE)
+    return _dictionary
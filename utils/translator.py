@@ -1,9 +1,28 @@
 """Serviço de tradução usando Google Translate API (gratuito via google-translate-api)"""
+import hashlib
+import json
 import logging
-from functools import lru_cache
+import os
+import re
+import sys
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from flask import has_request_context, session
+
+from config import Config
+from utils.cache import cache_get, cache_set, CACHE_DURATION, single_flight_many
+from utils.http import UpstreamUnavailable, get_upstream
 
 logger = logging.getLogger(__name__)
 
+try:
+    from google_translate_api import google_translate_api
+except ImportError:
+    google_translate_api = None
+    logger.warning("google-translate-api não instalada. Usando fallback local.")
+
 # Suporte de idiomas (código ISO 639-1)
 SUPPORTED_LANGUAGES = {
     'pt': 'Português (Brasil)',
@@ -16,15 +35,16 @@ SUPPORTED_LANGUAGES = {
     'zh': 'Chinese'
 }
 
-# Cache de traduções para reduzir requisições à API
-_translation_cache = {}
-
 def get_supported_languages():
     """Retorna dicionário de idiomas suportados"""
     return SUPPORTED_LANGUAGES
 
 
-@lru_cache(maxsize=500)
+# Separador entre os textos de um lote (linha própria, preservada pelo tradutor)
+_BATCH_SEPARATOR = '\n|||\n'
+_BATCH_SPLIT = re.compile(r'\s*\|\|\|\s*')
+
+
 def translate_text(text: str, target_language: str, source_language: str = 'pt') -> str:
     """
     Traduz texto usando google-translate-api (gratuito, sem API key).
@@ -37,139 +57,242 @@ def translate_text(text: str, target_language: str, source_language: str = 'pt')
     Returns:
         Texto traduzido ou texto original se falhar
     """
-    if not text or not text.strip():
-        return text
+    return translate_many([text], target_language, source_language)[0]
+
+
+def translate_many(texts, target_language: str, source_language: str = 'pt') -> list:
+    """
+    Traduz vários textos de uma vez, na mesma ordem.
+    
+    Repetições são traduzidas uma vez só. Cada texto passa pelo cache
+    (memória/compartilhado), depois pela tabela translation_memory; só o que
+    faltar vai ao serviço de tradução, em uma única chamada em lote. Textos que
+    outra thread já está traduzindo não são pedidos de novo: a chamada espera
+    o resultado dela (single-flight por chave de cache).
     
+    Args:
+        texts: Textos a traduzir
+        target_language: Idioma alvo (ex: 'en', 'es')
+        source_language: Idioma de origem (padrão: 'pt')
+    
+    Returns:
+        Lista com as traduções (o texto original onde a tradução falhar)
+    """
+    texts = list(texts)
     if target_language == source_language:
-        return text
+        return texts
     
-    # Tenta importar a biblioteca de tradução
-    try:
-        from google_translate_api import google_translate_api
-        
-        # Cache local para não fazer requisições repetidas
-        cache_key = f"{text}_{source_language}_{target_language}"
-        if cache_key in _translation_cache:
-            return _translation_cache[cache_key]
+    unique = list(dict.fromkeys(text for text in texts if text and text.strip()))
+    translations = {}
+    keys = {text: _cache_key(text, target_language, source_language) for text in unique}
+    
+    for text in unique:
+        cached = cache_get(keys[text])
+        if cached is not None:
+            translations[text] = cached
+    
+    missing = [text for text in unique if text not in translations]
+    if missing:
+        def resolve(batch):
+            return _resolve_missing(batch, keys, target_language, source_language)
         
-        # Faz tradução
-        result = google_translate_api.translate(
+        coalesced = single_flight_many({text: keys[text] for text in missing}, resolve)
+        translations.update((text, translated) for text, translated in coalesced.items() if translated)
+    
+    return [translations.get(text, text) for text in texts]
+
+
+def _resolve_missing(texts: list, keys: dict, target_language: str, source_language: str) -> dict:
+    """Traduções dos textos ausentes do cache: translation_memory, depois o serviço em lote"""
+    # Outro líder pode ter gravado a tradução entre o miss e o single-flight
+    translations = {}
+    for text in texts:
+        cached = cache_get(keys[text])
+        if cached is not None:
+            translations[text] = cached
+    
+    missing = [text for text in texts if text not in translations]
+    if missing:
+        stored = _load_memory(missing, target_language, source_language)
+        for text, translated in stored.items():
+            cache_set(keys[text], translated, CACHE_DURATION['translation'])
+        translations.update(stored)
+    
+    missing = [text for text in texts if text not in translations]
+    if missing:
+        fetched = _translate_batch(missing, target_language, source_language)
+        if fetched:
+            _save_memory(fetched, target_language, source_language)
+            for text, translated in fetched.items():
+                cache_set(keys[text], translated, CACHE_DURATION['translation'])
+        translations.update(fetched)
+    return translations
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _cache_key(text: str, target_language: str, source_language: str) -> str:
+    return f"translation:{source_language}:{target_language}:{_text_hash(text)}"
+
+
+def _load_memory(texts: list, target_language: str, source_language: str) -> dict:
+    """Traduções já conhecidas na tabela translation_memory"""
+    from models import get_db
+    
+    by_hash = {_text_hash(text): text for text in texts}
+    placeholders = ','.join('?' * len(by_hash))
+    try:
+        # Conexão da requisição, sem um segundo empréstimo do pool
+        conn = get_db()
+        try:
+            rows = conn.execute(f'''
+                SELECT text_hash, text, translated FROM translation_memory
+                WHERE source = ? AND target = ? AND text_hash IN ({placeholders})
+            ''', (source_language, target_language, *by_hash)).fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Erro ao ler memória de tradução: {e}")
+        return {}
+    # Confere o texto: o hash é só a chave do índice
+    return {row['text']: row['translated'] for row in rows if by_hash.get(row['text_hash']) == row['text']}
+
+
+def _save_memory(translations: dict, target_language: str, source_language: str):
+    from models import run_write
+    
+    rows = [(_text_hash(text), source_language, target_language, text, translated)
+            for text, translated in translations.items()]
+    try:
+        run_write(lambda cur: cur.executemany('''
+            INSERT INTO translation_memory (text_hash, source, target, text, translated)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (text_hash, source, target) DO UPDATE SET
+                text = excluded.text,
+                translated = excluded.translated,
+                created_at = CURRENT_TIMESTAMP
+        ''', rows))
+    except Exception as e:
+        logger.error(f"Erro ao salvar memória de tradução: {e}")
+
+
+def _batches(texts: list):
+    """Agrupa os textos em lotes que cabem no limite de caracteres do serviço"""
+    batch, size = [], 0
+    for text in texts:
+        if batch and size + len(text) + len(_BATCH_SEPARATOR) > Config.TRANSLATION_BATCH_CHARS:
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + len(_BATCH_SEPARATOR)
+    if batch:
+        yield batch
+
+
+def _translate_batch(texts: list, target_language: str, source_language: str) -> dict:
+    """Traduz no serviço externo. Retorna {texto: tradução} só com o que deu certo."""
+    if google_translate_api is None:
+        return {}
+    
+    upstream = get_upstream('translation')
+    
+    def translate(text):
+        result = upstream.call(
+            google_translate_api.translate,
             text,
             target_language=target_language,
             source_language=source_language
         )
-        
-        translated = result.get('translatedText', text)
-        
-        # Armazena em cache
-        _translation_cache[cache_key] = translated
-        
-        return translated
+        return result.get('translatedText') or None
     
-    except ImportError:
-        logger.warning("google-translate-api não instalada. Usando fallback local.")
-        return text
+    translations = {}
+    try:
+        for batch in _batches(texts):
+            translated = translate(_BATCH_SEPARATOR.join(batch))
+            parts = _BATCH_SPLIT.split(translated.strip()) if translated else []
+            if len(parts) == len(batch):
+                translations.update(zip(batch, parts))
+                continue
+            # O serviço não preservou os separadores: traduz um a um
+            logger.warning(f"Lote de tradução desalinhado ({len(parts)}/{len(batch)}); traduzindo individualmente")
+            for text in batch:
+                single = translate(text)
+                if single:
+                    translations[text] = single
+    except UpstreamUnavailable as e:
+        logger.warning(f"Tradução indisponível ({e}). Usando texto original.")
     except Exception as e:
         logger.error(f"Erro ao traduzir texto: {e}")
-        return text
+    return translations
+
+
+# Catálogos de textos da interface (I18N_DIR/<idioma>.json). Idiomas sem
+# catálogo, ou chaves ausentes em um catálogo, caem em inglês e depois em português.
+CATALOG_FALLBACKS = ('en', 'pt')
+
+_catalogs = None
+_catalogs_lock = threading.Lock()
+
+
+def _catalog_dir() -> str:
+    return Config.I18N_DIR
+
+
+def _read_catalog(lang: str) -> dict:
+    path = os.path.join(_catalog_dir(), f'{lang}.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            messages = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Catálogo de textos inválido ({path}): {e}")
+        return {}
+    return {sys.intern(key): sys.intern(value) for key, value in messages.items()}
+
+
+def _fallback_chain(lang: str) -> tuple:
+    return tuple(dict.fromkeys((lang,) + CATALOG_FALLBACKS))
 
 
-def get_translations_dict(lang: str = 'pt') -> dict:
+def _load_catalogs() -> dict:
     """
-    Retorna dicionário de strings traduzidas para o idioma especificado.
-    Usa cache local para evitar requisições repetidas.
+    Lê os catálogos uma vez e monta, para cada idioma suportado, uma tabela
+    já mesclada com a cadeia de fallback: cada consulta é um único dict.get.
     """
-    # Dicionário base em português
-    translations = {
-        'pt': {
-            'feed': 'Feed',
-            'post_dream': 'Postar um sonho',
-            'my_dreams': 'Meus Sonhos',
-            'liked': 'Curtidos',
-            'favorites': 'Favoritos',
-            'history': 'Histórico',
-            'logout': 'Sair',
-            'search': 'Pesquisar',
-            'see_more': 'Ver mais',
-            'dream_meaning': 'Ver significado',
-            'like': 'Curtir',
-            'favorite': 'Favoritar',
-            'comment': 'Comentar',
-            'delete': 'Deletar',
-            'edit': 'Editar',
-            'back': 'Voltar',
-            'send': 'Enviar',
-            'cancel': 'Cancelar',
-            'confirm': 'Confirmar',
-            'error': 'Erro',
-            'success': 'Sucesso',
-            'loading': 'Carregando...',
-            'no_dreams': 'Nenhum sonho encontrado',
-            'no_dreams_with_tag': 'Nenhum sonho encontrado com a tag',
-            'no_dreams_search': 'Nenhum sonho encontrado para',
-        },
-        'en': {
-            'feed': 'Feed',
-            'post_dream': 'Post a dream',
-            'my_dreams': 'My Dreams',
-            'liked': 'Liked',
-            'favorites': 'Favorites',
-            'history': 'History',
-            'logout': 'Logout',
-            'search': 'Search',
-            'see_more': 'See more',
-            'dream_meaning': 'See meaning',
-            'like': 'Like',
-            'favorite': 'Favorite',
-            'comment': 'Comment',
-            'delete': 'Delete',
-            'edit': 'Edit',
-            'back': 'Back',
-            'send': 'Send',
-            'cancel': 'Cancel',
-            'confirm': 'Confirm',
-            'error': 'Error',
-            'success': 'Success',
-            'loading': 'Loading...',
-            'no_dreams': 'No dreams found',
-            'no_dreams_with_tag': 'No dreams found with the tag',
-            'no_dreams_search': 'No dreams found for',
-        },
-        'es': {
-            'feed': 'Feed',
-            'post_dream': 'Publicar un sueño',
-            'my_dreams': 'Mis Sueños',
-            'liked': 'Gustados',
-            'favorites': 'Favoritos',
-            'history': 'Historial',
-            'logout': 'Cerrar sesión',
-            'search': 'Buscar',
-            'see_more': 'Ver más',
-            'dream_meaning': 'Ver significado',
-            'like': 'Gustó',
-            'favorite': 'Favorito',
-            'comment': 'Comentar',
-            'delete': 'Eliminar',
-            'edit': 'Editar',
-            'back': 'Atrás',
-            'send': 'Enviar',
-            'cancel': 'Cancelar',
-            'confirm': 'Confirmar',
-            'error': 'Error',
-            'success': 'Éxito',
-            'loading': 'Cargando...',
-            'no_dreams': 'No se encontraron sueños',
-            'no_dreams_with_tag': 'No se encontraron sueños con la etiqueta',
-            'no_dreams_search': 'No se encontraron sueños para',
-        }
-    }
-    
-    return translations.get(lang, translations['pt'])
+    raw = {lang: _read_catalog(lang) for lang in SUPPORTED_LANGUAGES}
+    catalogs = {}
+    for lang in SUPPORTED_LANGUAGES:
+        merged = {}
+        for fallback in reversed(_fallback_chain(lang)):
+            merged.update(raw.get(fallback, {}))
+        catalogs[lang] = MappingProxyType(merged)
+    return catalogs
+
+
+def _get_catalogs() -> dict:
+    global _catalogs
+    if _catalogs is None:
+        with _catalogs_lock:
+            if _catalogs is None:
+                _catalogs = _load_catalogs()
+    return _catalogs
+
+
+def get_translations_dict(lang: str = 'pt') -> Mapping:
+    """
+    Retorna os textos da interface no idioma especificado (somente leitura).
+    Chaves ausentes no idioma já vêm preenchidas pela cadeia de fallback.
+    """
+    catalogs = _get_catalogs()
+    return catalogs.get(lang) or catalogs['pt']
 
 
 def get_text(key: str, lang: str = 'pt', **kwargs) -> str:
     """
-    Obtém texto traduzido por chave com fallback para português.
+    Obtém texto traduzido por chave com fallback para inglês e português.
     
     Args:
         key: Chave do texto (ex: 'feed', 'like')
@@ -177,10 +300,9 @@ def get_text(key: str, lang: str = 'pt', **kwargs) -> str:
         **kwargs: Valores para interpolação (ex: name='João')
     
     Returns:
-        Texto traduzido
+        Texto traduzido (a própria chave se não existir em nenhum catálogo)
     """
-    translations = get_translations_dict(lang)
-    text = translations.get(key, translations.get(key, key))
+    text = get_translations_dict(lang).get(key, key)
     
     # Interpolação simples
     if kwargs:
@@ -190,3 +312,40 @@ def get_text(key: str, lang: str = 'pt', **kwargs) -> str:
             pass
     
     return text
+
+
+def find_missing_translations() -> dict:
+    """
+    Compara cada catálogo com o português (referência).
+
+    Returns:
+        {idioma: {'missing': [...], 'extra': [...], 'catalog': bool}} — catalog
+        False indica idioma sem arquivo, atendido só pelo fallback
+    """
+    reference = _read_catalog('pt')
+    report = {}
+    for lang in SUPPORTED_LANGUAGES:
+        if lang == 'pt':
+            continue
+        messages = _read_catalog(lang)
+        report[lang] = {
+            'missing': sorted(set(reference) - set(messages)),
+            'extra': sorted(set(messages) - set(reference)),
+            'catalog': bool(messages),
+        }
+    return report
+
+
+def current_language() -> str:
+    """Idioma da sessão atual (pt fora de uma requisição ou se não suportado)"""
+    lang = session.get('lang', 'pt') if has_request_context() else 'pt'
+    return lang if lang in SUPPORTED_LANGUAGES else 'pt'
+
+
+def init_app(app):
+    """Registra `t` nos templates: {{ t('feed') }} ou {{ 'feed'|t }}"""
+    def translate(key, lang=None, **kwargs):
+        return get_text(key, lang or current_language(), **kwargs)
+
+    app.jinja_env.globals['t'] = translate
+    app.jinja_env.filters['t'] = translate